@@ -2,30 +2,103 @@
 import os
 import logging
 from logging.config import dictConfig
+from typing import List
 
 
-NUM_WORKERS: int = 5
 DATE_FORMAT: str = '%Y-%m-%dT%H:%M:%SZ'
 
 
 class MQConfig:
-    TEST_MODE: bool = os.getenv('RELEASE_MODE') == 'TEST'
-    EXCHANGE: str = os.environ['MQ_EXCHANGE']
-    SCRAPE_QUEUE: str = os.environ['MQ_SCRAPE_QUEUE']
-    SCRAPED_QUEUE: str = os.environ['MQ_SCRAPED_QUEUE']
-    _host: str = os.environ['MQ_HOST']
-    _port: str = os.environ['MQ_PORT']
-    _user: str = os.environ['MQ_USER']
-    _password: str = os.environ['MQ_PASSWORD']
+
+    def __init__(self) -> None:
+        self.TEST_MODE: bool = os.getenv('RELEASE_MODE') == 'TEST'
+        self.EXCHANGE: str = os.environ['MQ_EXCHANGE']
+        self.SCRAPE_QUEUE: str = os.environ['MQ_SCRAPE_QUEUE']
+        self.SCRAPED_QUEUE: str = os.environ['MQ_SCRAPED_QUEUE']
+        self._host: str = os.environ['MQ_HOST']
+        self._port: str = os.environ['MQ_PORT']
+        self._user: str = os.environ['MQ_USER']
+        self._password: str = os.environ['MQ_PASSWORD']
+        self.NUM_WORKERS: int = int(os.getenv('MQ_NUM_WORKERS', '5'))
+        self.PREFETCH_COUNT: int = int(
+            os.getenv('MQ_PREFETCH_COUNT', str(self.NUM_WORKERS)))
+        self.ADAPTIVE_PREFETCH: bool = \
+            os.getenv('MQ_ADAPTIVE_PREFETCH', 'false').lower() == 'true'
+        self.MAX_PREFETCH_COUNT: int = int(
+            os.getenv('MQ_MAX_PREFETCH_COUNT', str(4 * self.NUM_WORKERS)))
+        self.PREFETCH_HEADROOM_SECONDS: float = float(
+            os.getenv('MQ_PREFETCH_HEADROOM_SECONDS', '1.0'))
+        self.PUBLISHER_CONFIRMS: bool = \
+            os.getenv('MQ_PUBLISHER_CONFIRMS', 'true').lower() == 'true'
+        self.RECONNECT_MIN_SECONDS: float = float(
+            os.getenv('MQ_RECONNECT_MIN_SECONDS', '1.0'))
+        self.RECONNECT_MAX_SECONDS: float = float(
+            os.getenv('MQ_RECONNECT_MAX_SECONDS', '30.0'))
+        self.DRAIN_SECONDS: float = float(os.getenv('MQ_DRAIN_SECONDS', '20.0'))
+        self.QUEUE_HIGH_WATER: int = int(
+            os.getenv('MQ_QUEUE_HIGH_WATER', str(2 * self.NUM_WORKERS)))
+        self.QUEUE_LOW_WATER: int = int(
+            os.getenv('MQ_QUEUE_LOW_WATER', str(self.NUM_WORKERS)))
+        self.RETRY_DELAYS: List[float] = [
+            float(delay) for delay in
+            os.getenv('MQ_RETRY_DELAYS', '10,60,300').split(',') if delay.strip()]
+        self.DEAD_LETTER_QUEUE: str = os.getenv(
+            'MQ_DEAD_LETTER_QUEUE', f'{self.SCRAPE_QUEUE}.dead')
 
     def URI(self) -> str:
         return f"amqp://{self._user}:{self._password}@{self._host}:{self._port}/"
 
+    def RETRY_QUEUE(self, attempt: int) -> str:
+        return f"{self.SCRAPE_QUEUE}.retry.{attempt}"
+
+
+class ScoringConfig:
+    MODE: str = os.getenv('SCORING_MODE', 'precomputed')
+    MODEL_DIR: str = os.getenv('SCORING_MODEL_DIR', 'scoring-model')
+    WORKERS: int = int(os.getenv('SCORING_WORKERS', '0'))
+    BATCH_SIZE: int = int(os.getenv('SCORING_BATCH_SIZE', '16'))
+    HASH_FEATURES: int = int(os.getenv('SCORING_HASH_FEATURES', str(2 ** 18)))
+    CORPUS: str = os.getenv('SCORING_CORPUS', 'brown')
+    DF_SNAPSHOT_FILE: str = os.getenv('SCORING_DF_SNAPSHOT_FILE', '')
+    DF_SNAPSHOT_INTERVAL: float = float(
+        os.getenv('SCORING_DF_SNAPSHOT_INTERVAL', '300'))
+    DF_MAX_TERMS: int = int(os.getenv('SCORING_DF_MAX_TERMS', '200000'))
+    DF_MAX_TERM_LENGTH: int = int(os.getenv('SCORING_DF_MAX_TERM_LENGTH', '40'))
+
+
+class ScrapingConfig:
+    ASYNC: bool = os.getenv('SCRAPING_ASYNC', 'false').lower() == 'true'
+    MAX_CONNECTIONS: int = int(os.getenv('SCRAPING_MAX_CONNECTIONS', '100'))
+    MAX_CONNECTIONS_PER_HOST: int = int(
+        os.getenv('SCRAPING_MAX_CONNECTIONS_PER_HOST', '4'))
+    KEEPALIVE_SECONDS: float = float(
+        os.getenv('SCRAPING_KEEPALIVE_SECONDS', '30'))
+    TIMEOUT_SECONDS: float = float(os.getenv('SCRAPING_TIMEOUT_SECONDS', '10'))
+    DOMAIN_RATE: float = float(os.getenv('SCRAPING_DOMAIN_RATE', '1.0'))
+    DOMAIN_BURST: float = float(os.getenv('SCRAPING_DOMAIN_BURST', '5'))
+    CACHE_TTL_SECONDS: float = float(
+        os.getenv('SCRAPING_CACHE_TTL_SECONDS', '3600'))
+    CACHE_SIZE: int = int(os.getenv('SCRAPING_CACHE_SIZE', '1000'))
+    CACHE_DIR: str = os.getenv('SCRAPING_CACHE_DIR', '')
+    CACHE_SWEEP_SECONDS: float = float(
+        os.getenv('SCRAPING_CACHE_SWEEP_SECONDS', '600'))
+    KEYWORD_MODE: str = os.getenv('SCRAPING_KEYWORD_MODE', 'newspaper')
+    MAX_KEYWORDS: int = int(os.getenv('SCRAPING_MAX_KEYWORDS', '10'))
+
+
+class MetricsConfig:
+    PORT: int = int(os.getenv('METRICS_PORT', '-1'))
+
 
 class HealthCheckConfig:
-    MQ_HEALTH_TARGET = os.environ["MQ_HEALTH_TARGET"]
-    FILENAME: str = os.environ['HEARTBEAT_FILE']
-    INTERVAL: int = int(os.environ['HEARTBEAT_INTERVAL'])
+
+    def __init__(self) -> None:
+        self.FILENAME: str = os.environ['HEARTBEAT_FILE']
+        self.INTERVAL: int = int(os.environ['HEARTBEAT_INTERVAL'])
+        self.LIVENESS_SECONDS: float = float(
+            os.getenv('HEALTH_LIVENESS_SECONDS', str(3 * self.INTERVAL)))
+        self.STALL_SECONDS: float = float(
+            os.getenv('HEALTH_STALL_SECONDS', '300'))
 
 
 LOGGING_CONIFG = {
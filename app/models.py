@@ -1,20 +1,26 @@
 # Standard library
 import json
 from abc import ABCMeta, abstractmethod, abstractstaticmethod
-from dataclasses import dataclass
+from array import array
+from dataclasses import dataclass, field, fields
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Type, TypeVar, cast
 from uuid import uuid4
 
 # Internal modules
 from app.util import wrap_error_message, date_to_str, str_to_date
 
 
+T = TypeVar('T')
+
+
 class DTO(metaclass=ABCMeta):
     """DTO is the abtract baseclass of classes that can
     turn themselves from an into a dict.
     """
 
+    __slots__ = ()
+
     @abstractmethod
     def asdict(self) -> Dict[str, Any]:
         """Retruns a dictionary representation of an object."""
@@ -24,7 +30,39 @@ class DTO(metaclass=ABCMeta):
         """Turns a dictionary into an object of the DTO implementation."""
 
 
-@dataclass
+def slotted(cls: Type[T]) -> Type[T]:
+    """Recreates a frozen dataclass with __slots__ instead of an instance
+    __dict__, which makes instances smaller and faster to create.
+
+    :param cls: Dataclass to recreate.
+    :return: Slotted dataclass.
+    """
+    field_names = tuple(f.name for f in fields(cast(Any, cls)))
+    namespace = dict(cls.__dict__)
+    for name in field_names:
+        # Defaults are kept by the generated __init__ and would shadow the slots.
+        namespace.pop(name, None)
+    namespace.pop('__dict__', None)
+    namespace.pop('__weakref__', None)
+    namespace['__slots__'] = field_names
+    namespace['__getstate__'] = _getstate
+    namespace['__setstate__'] = _setstate
+    metaclass: Any = type(cls)
+    return metaclass(cls.__name__, cls.__bases__, namespace)
+
+
+def _getstate(self: Any) -> List[Any]:
+    return [getattr(self, f.name) for f in fields(self)]
+
+
+def _setstate(self: Any, state: List[Any]) -> None:
+    # Frozen dataclasses can not be unpickled through __setattr__.
+    for f, value in zip(fields(self), state):
+        object.__setattr__(self, f.name, value)
+
+
+@slotted
+@dataclass(frozen=True)
 class Subject(DTO):
     id: str
     symbol: str
@@ -61,6 +99,7 @@ class Subject(DTO):
             raise wrap_key_error(e)
 
 
+@slotted
 @dataclass(frozen=True)
 class Referer(DTO):
     id: str
@@ -88,6 +127,7 @@ class Referer(DTO):
             raise wrap_key_error(e)
 
 
+@slotted
 @dataclass(frozen=True)
 class Article(DTO):
     id: str
@@ -96,6 +136,9 @@ class Article(DTO):
     body: str
     keywords: List[str]
     date: datetime
+    # Terms of the title and body counted once when scraped, not serialized.
+    term_counts: Optional[Dict[str, int]] = field(
+        default=None, compare=False, repr=False)
 
     def describe(self) -> str:
         """Creates a string describing the article that can be ranked against.
@@ -128,6 +171,7 @@ class Article(DTO):
             raise wrap_key_error(e)
 
 
+@slotted
 @dataclass(frozen=True)
 class ScrapeTarget:
     url: str
@@ -185,26 +229,39 @@ class ScrapeTarget:
             raise wrap_key_error(e)
 
 
+@slotted
 @dataclass(frozen=True)
 class ScrapedArticle:
     article: Article
     subjects: List[Subject]
     referer: Referer
+    # Scores of the subjects by position, stored as an array of doubles.
+    scores: Sequence[float]
+
+    def __post_init__(self) -> None:
+        if len(self.scores) != len(self.subjects):
+            raise new_value_error(
+                f'Got {len(self.scores)} scores for {len(self.subjects)} subjects')
+        if not isinstance(self.scores, array):
+            object.__setattr__(self, 'scores', array('d', self.scores))
 
     def asdict(self) -> Dict[str, Any]:
         return {
             'article': self.article.asdict(),
-            'subjects': [sub.asdict() for sub in self.subjects],
+            'subjects': [{**sub.asdict(), 'score': score}
+                         for sub, score in zip(self.subjects, self.scores)],
             'referer': self.referer.asdict()
         }
 
     @classmethod
     def fromdict(cls, raw: Dict[str, Any]) -> 'ScrapedArticle':
         try:
+            subjects = [Subject.fromdict(sub) for sub in raw['subjects']]
             return cls(
                 article=Article.fromdict(raw['article']),
-                subjects=[Subject.fromdict(sub) for sub in raw['subjects']],
-                referer=Referer.fromdict(raw['referer']))
+                subjects=subjects,
+                referer=Referer.fromdict(raw['referer']),
+                scores=[sub.score for sub in subjects])
         except KeyError as e:
             raise wrap_key_error(e)
 
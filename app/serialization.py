@@ -0,0 +1,107 @@
+# Standard library
+import json
+import math
+from json.encoder import encode_basestring_ascii  # type: ignore
+from typing import Any, Callable, List, Union
+
+# Internal modules
+from app.models import ScrapedArticle, ScrapeTarget, Subject, Referer
+from app.models import wrap_key_error
+from app.util import date_to_str
+
+try:
+    import orjson
+    _loads: Callable[[Union[bytes, str]], Any] = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+
+class DecodeError(ValueError):
+    """Raised when a message can not be decoded."""
+
+
+def decode_scrape_target(body: Union[bytes, str]) -> ScrapeTarget:
+    """Decodes a scrape target message directly into model objects.
+
+    Uses orjson to parse the message if it is installed.
+
+    :param body: JSON encoded scrape target.
+    :return: ScrapeTarget.
+    :raises DecodeError: If the message is not a valid scrape target.
+    """
+    try:
+        raw = _loads(body)
+        referer = raw['referer']
+        return ScrapeTarget(
+            url=raw['url'],
+            subjects=[Subject(
+                id=sub['id'],
+                symbol=sub['symbol'],
+                name=sub['name'],
+                score=sub['score'],
+                article_id=sub['articleId']) for sub in raw['subjects']],
+            referer=Referer(
+                id=referer['id'],
+                external_id=referer['externalId'],
+                follower_count=referer['followerCount'],
+                article_id=referer['articleId']),
+            title=raw['title'],
+            body=raw['body'],
+            article_id=raw['articleId'])
+    except KeyError as e:
+        raise DecodeError(str(wrap_key_error(e)))
+    except (TypeError, ValueError) as e:
+        raise DecodeError(str(e))
+
+
+def encode_scraped_article(scraped_article: ScrapedArticle) -> bytes:
+    """Encodes a scraped article without building the intermediate dicts of
+    asdict. The output is identical to json.dumps(scraped_article.asdict()).
+
+    :param scraped_article: ScrapedArticle to encode.
+    :return: JSON encoded bytes.
+    """
+    article = scraped_article.article
+    referer = scraped_article.referer
+    parts: List[str] = [
+        '{"article": {"id": ', _encode(article.id),
+        ', "url": ', _encode(article.url),
+        ', "title": ', _encode(article.title),
+        ', "body": ', _encode(article.body),
+        ', "keywords": ', _encode(article.keywords),
+        ', "articleDate": ', _encode(date_to_str(article.date)),
+        '}, "subjects": [']
+    subjects = zip(scraped_article.subjects, scraped_article.scores)
+    for i, (subject, score) in enumerate(subjects):
+        parts.extend([
+            ', {"id": ' if i else '{"id": ', _encode(subject.id),
+            ', "symbol": ', _encode(subject.symbol),
+            ', "name": ', _encode(subject.name),
+            ', "score": ', _encode(score),
+            ', "articleId": ', _encode(subject.article_id), '}'])
+    parts.extend([
+        '], "referer": {"id": ', _encode(referer.id),
+        ', "externalId": ', _encode(referer.external_id),
+        ', "followerCount": ', _encode(referer.follower_count),
+        ', "articleId": ', _encode(referer.article_id), '}}'])
+    return ''.join(parts).encode('ascii')
+
+
+def _encode(value: Any) -> str:
+    """Encodes a value the same way json.dumps does with default settings.
+
+    :param value: Value to encode.
+    :return: JSON string.
+    """
+    value_type = type(value)
+    if value_type is str:
+        return encode_basestring_ascii(value)
+    if value is None:
+        return 'null'
+    if value_type is int:
+        return repr(value)
+    if value_type is float and math.isfinite(value):
+        return repr(value)
+    if value_type is list and all(type(item) is str for item in value):
+        return '[' + ', '.join(map(encode_basestring_ascii, value)) + ']'
+    return json.dumps(value)
@@ -1,5 +1,13 @@
 from .scoring_service import ScoringService
+from .corpus import CorpusSource, FileCorpusSource, JsonlCorpusSource
+from .document_frequencies import DocumentFrequencyCounter, save_periodically
+from .scoring_backend import ScoringBackend, new_scoring_backend
 from .scraping_service import ScrapingService
-from .mq_clients import MQClient, MQConsumer, MQConnectionFactory
-from .mq_clients import MessageHandler
-from .heartbeat import emit_heartbeats
+from .fetchers import HtmlFetcher, AsyncHtmlFetcher, FixtureHtmlFetcher
+from .article_cache import ArticleCache, sweep_periodically
+from .keywords import KeywordExtractor
+from .mq_clients import MQClient, MQConsumer, MQConnectionManager
+from .mq_clients import MessageHandler, DeliveryTracker
+from .failures import classify_failure
+from .heartbeat import HealthMonitor, emit_heartbeats
+from .metrics import serve_metrics
@@ -0,0 +1,247 @@
+# Standard library
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import Future
+from threading import Lock, Thread
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+# Internal modules
+from app.models import Article
+from .cache import TTLCache
+from .urls import canonicalize_url
+
+
+class ArticleCache:
+    """Cache of scraped articles keyed by canonical url.
+
+    Articles are kept in memory and optionally in a local directory so that
+    they survive restarts. Expired articles are removed from the directory
+    when they are read and by sweeps, done at startup and by
+    sweep_periodically. Concurrent requests for the same url are coalesced
+    so that only one of them scrapes the article while the others wait.
+    """
+
+    _log = logging.getLogger('ArticleCache')
+
+    def __init__(self,
+                 ttl: float,
+                 maxsize: int,
+                 directory: Optional[str] = None) -> None:
+        self.TTL = ttl
+        self.DIRECTORY = directory
+        self._memory = TTLCache(maxsize, ttl)
+        self._lock = Lock()
+        self._in_flight: Dict[str, Future] = {}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.sweep()
+
+    def get_or_fetch(self, url: str, fetch: Callable[[], Article]) -> Article:
+        """Gets a cached article or scrapes it if no one else is scraping it.
+
+        :param url: Url of the article.
+        :param fetch: Function scraping the article.
+        :return: Cached or scraped article.
+        """
+        key = canonicalize_url(url)
+        future, owner = self._claim(key)
+        if not owner:
+            return future.result()
+        try:
+            article = fetch()
+            self._store(key, article)
+        except Exception as e:
+            self._release(key, future, error=e)
+            raise
+        self._release(key, future, article=article)
+        return article
+
+    async def get_or_fetch_async(self,
+                                 url: str,
+                                 fetch: Callable[[], Awaitable[Article]]) -> Article:
+        """Gets a cached article or scrapes it if no one else is scraping it,
+        without blocking the event loop while waiting for another scrape.
+
+        :param url: Url of the article.
+        :param fetch: Coroutine function scraping the article.
+        :return: Cached or scraped article.
+        """
+        key = canonicalize_url(url)
+        future, owner = self._claim(key)
+        if not owner:
+            return await asyncio.wrap_future(future)
+        try:
+            article = await fetch()
+            self._store(key, article)
+        except Exception as e:
+            self._release(key, future, error=e)
+            raise
+        self._release(key, future, article=article)
+        return article
+
+    def get(self, url: str) -> Optional[Article]:
+        """Gets a cached article that has not yet expired.
+
+        :param url: Url of the article.
+        :return: Article or None if it is not cached.
+        """
+        key = canonicalize_url(url)
+        return self._memory.get(key) or self._read(key)
+
+    def sweep(self) -> int:
+        """Removes expired articles from the local store.
+
+        Files are expired by their modification time, which is when the
+        article was written, so that they do not have to be parsed.
+
+        :return: Number of removed files.
+        """
+        if not self.DIRECTORY:
+            return 0
+        expired_before = time.time() - self.TTL
+        removed = 0
+        try:
+            with os.scandir(self.DIRECTORY) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(('.json', '.tmp')):
+                        continue
+                    try:
+                        if entry.stat().st_mtime < expired_before:
+                            os.remove(entry.path)
+                            removed += 1
+                    except FileNotFoundError:
+                        continue
+        except OSError as e:
+            self._log.warning(f'Could not sweep cached articles: {e}')
+        if removed > 0:
+            self._log.info(f'Removed {removed} expired cached articles')
+        return removed
+
+    def in_flight(self) -> int:
+        """Returns the number of articles currently being scraped.
+
+        :return: Number of scrapes in flight.
+        """
+        with self._lock:
+            return len(self._in_flight)
+
+    def _claim(self, key: str) -> Tuple[Future, bool]:
+        """Looks up an article and claims the scrape of it if it is missing.
+
+        :param key: Canonical url of the article.
+        :return: Tuple of a future of the article and a boolean indicating
+                 that the caller claimed the scrape and must release it.
+        """
+        with self._lock:
+            if key in self._in_flight:
+                return self._in_flight[key], False
+            future: Future = Future()
+            self._in_flight[key] = future
+        article = self._memory.get(key) or self._read(key)
+        if article is None:
+            return future, True
+        self._release(key, future, article=article)
+        return future, False
+
+    def _store(self, key: str, article: Article) -> None:
+        """Caches a scraped article in memory and in the local store.
+
+        :param key: Canonical url of the article.
+        :param article: Scraped article.
+        """
+        self._memory.put(key, article)
+        self._write(key, article)
+
+    def _release(self,
+                 key: str,
+                 future: Future,
+                 article: Optional[Article] = None,
+                 error: Optional[Exception] = None) -> None:
+        """Hands an article, or the error raised while scraping it, to the
+        requests waiting for it.
+
+        :param key: Canonical url of the article.
+        :param future: Future returned by _claim.
+        :param article: Cached or scraped article.
+        :param error: Error raised while scraping.
+        """
+        with self._lock:
+            self._in_flight.pop(key, None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(article)
+
+    def _read(self, key: str) -> Optional[Article]:
+        """Reads an article from the local store.
+
+        :param key: Canonical url of the article.
+        :return: Article or None if it is not stored or has expired.
+        """
+        if not self.DIRECTORY:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                entry: Dict[str, Any] = json.load(f)
+            if time.time() - entry['cachedAt'] > self.TTL:
+                os.remove(path)
+                return None
+            article = Article.fromdict(entry['article'])
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            self._log.warning(f'Could not read cached article {key}: {e}')
+            return None
+        self._memory.put(key, article)
+        return article
+
+    def _write(self, key: str, article: Article) -> None:
+        """Writes an article to the local store.
+
+        :param key: Canonical url of the article.
+        :param article: Article to store.
+        """
+        if not self.DIRECTORY or self.TTL <= 0:
+            return
+        path = self._path(key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({
+                    'cachedAt': time.time(),
+                    'article': article.asdict()
+                }, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self._log.warning(f'Could not store cached article {key}: {e}')
+
+    def _path(self, key: str) -> str:
+        filename = hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json'
+        return os.path.join(str(self.DIRECTORY), filename)
+
+
+def sweep_periodically(cache: ArticleCache, interval: float) -> None:
+    """Sets up and runs sweeps of the local store of a cache in a
+    background thread.
+
+    :param cache: Cache to sweep.
+    :param interval: Seconds between sweeps.
+    """
+    if not cache.DIRECTORY or interval <= 0:
+        return
+    t = Thread(
+        target=_run_sweeps_in_background,
+        args=(cache, interval, ),
+        daemon=True)
+    t.start()
+
+
+def _run_sweeps_in_background(cache: ArticleCache, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        cache.sweep()
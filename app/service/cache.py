@@ -0,0 +1,55 @@
+# Standard library
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    """Thread safe, size bounded cache where entries expire after a fixed time."""
+
+    def __init__(self,
+                 maxsize: int,
+                 ttl: float,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.MAXSIZE = maxsize
+        self.TTL = ttl
+        self._clock = clock
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Gets a value that has not yet expired.
+
+        :param key: Key of the value.
+        :return: Cached value or None if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Caches a value until the time to live has passed.
+
+        :param key: Key of the value.
+        :param value: Value to cache.
+        """
+        if self.MAXSIZE <= 0 or self.TTL <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self._clock() + self.TTL, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.MAXSIZE:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
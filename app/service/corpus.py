@@ -0,0 +1,90 @@
+# Standard library
+import json
+import os
+from abc import ABCMeta, abstractmethod
+from typing import List, Sequence
+
+
+class CorpusSource(metaclass=ABCMeta):
+    """Source of the reference documents that idf weights are fitted on."""
+
+    @abstractmethod
+    def read(self) -> List[str]:
+        """Reads the documents of the corpus.
+
+        :return: List of strings each representing a document.
+        """
+
+    @abstractmethod
+    def fingerprint(self) -> List[str]:
+        """Identifies the corpus, used to version models fitted on it.
+
+        :return: List of strings identifying the corpus.
+        """
+
+
+class FileCorpusSource(CorpusSource):
+    """Reads a text file with one document per line, or a directory where
+    each file is a document.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.PATH = path
+
+    def read(self) -> List[str]:
+        if os.path.isdir(self.PATH):
+            return [_read_text(path).replace('\n', ' ')
+                    for path in self._files()]
+        return [line.strip() for line in _read_text(self.PATH).splitlines()
+                if line.strip()]
+
+    def fingerprint(self) -> List[str]:
+        return [f'file:{path}:{_file_signature(path)}' for path in self._files()]
+
+    def _files(self) -> List[str]:
+        if not os.path.isdir(self.PATH):
+            return [self.PATH]
+        return [os.path.join(self.PATH, name)
+                for name in sorted(os.listdir(self.PATH))
+                if os.path.isfile(os.path.join(self.PATH, name))]
+
+
+class JsonlCorpusSource(CorpusSource):
+    """Reads a file with one JSON object per line, such as serialized articles,
+    joining the text fields of each object into a document.
+    """
+
+    def __init__(self, path: str, fields: Sequence[str] = ('title', 'body')) -> None:
+        self.PATH = path
+        self.FIELDS = list(fields)
+
+    def read(self) -> List[str]:
+        documents: List[str] = []
+        for line in _read_text(self.PATH).splitlines():
+            if not line.strip():
+                continue
+            raw = json.loads(line)
+            document = ' '.join(str(raw[field]) for field in self.FIELDS
+                                if raw.get(field))
+            if document:
+                documents.append(document)
+        return documents
+
+    def fingerprint(self) -> List[str]:
+        fields = ','.join(self.FIELDS)
+        return [f'jsonl:{self.PATH}:{fields}:{_file_signature(self.PATH)}']
+
+
+def _read_text(path: str) -> str:
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _file_signature(path: str) -> str:
+    """Summarizes the size and modification time of a file.
+
+    :param path: Path of the file.
+    :return: Signature string.
+    """
+    stat = os.stat(path)
+    return f'{stat.st_size}:{int(stat.st_mtime)}'
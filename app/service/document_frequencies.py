@@ -0,0 +1,152 @@
+# Standard library
+import json
+import logging
+import os
+import time
+from collections import Counter
+from threading import Lock, Thread
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class DocumentFrequencyCounter:
+    """Streaming count of the number of documents each term occurs in.
+
+    Documents are counted as they are scraped and the counts can be
+    snapshotted to disk, so the reference corpus keeps growing across
+    restarts without the documents themselves being kept.
+
+    The counts can be bounded: terms longer than max_term_length are not
+    counted, and only the max_terms most frequent terms are kept once the
+    number of terms has grown to twice that and whenever counts are saved.
+    """
+
+    _log = logging.getLogger('DocumentFrequencyCounter')
+
+    def __init__(self,
+                 frequencies: Optional[Dict[str, int]] = None,
+                 no_documents: int = 0,
+                 max_terms: int = 0,
+                 max_term_length: int = 0) -> None:
+        self.MAX_TERMS = max_terms
+        self.MAX_TERM_LENGTH = max_term_length
+        self._frequencies: Counter = Counter(frequencies or {})
+        self.no_documents = no_documents
+        self._lock = Lock()
+        self.prune()
+
+    def add(self, terms: Iterable[str]) -> None:
+        """Counts a document.
+
+        :param terms: Terms of the document, repeated terms are counted once.
+        """
+        unique_terms = set(terms)
+        if self.MAX_TERM_LENGTH > 0:
+            unique_terms = {term for term in unique_terms
+                            if len(term) <= self.MAX_TERM_LENGTH}
+        with self._lock:
+            self._frequencies.update(unique_terms)
+            self.no_documents += 1
+            if 0 < self.MAX_TERMS * 2 < len(self._frequencies):
+                self._prune()
+
+    def prune(self) -> None:
+        """Drops terms beyond the length and number of terms to keep."""
+        with self._lock:
+            self._prune()
+
+    def update(self, other: 'DocumentFrequencyCounter') -> None:
+        """Adds the counts of another counter.
+
+        :param other: Counter to add.
+        """
+        frequencies, no_documents = other.snapshot()
+        with self._lock:
+            self._frequencies.update(frequencies)
+            self.no_documents += no_documents
+            if 0 < self.MAX_TERMS * 2 < len(self._frequencies):
+                self._prune()
+
+    def snapshot(self) -> Tuple[Dict[str, int], int]:
+        """Copies the current counts.
+
+        :return: Tuple of document frequencies and number of documents.
+        """
+        with self._lock:
+            return dict(self._frequencies), self.no_documents
+
+    def save(self, path: str) -> None:
+        """Writes the counts to a file, replacing it atomically.
+
+        :param path: File to write.
+        """
+        self.prune()
+        frequencies, no_documents = self.snapshot()
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'noDocuments': no_documents,
+                'documentFrequencies': frequencies
+            }, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls,
+             path: str,
+             max_terms: int = 0,
+             max_term_length: int = 0) -> 'DocumentFrequencyCounter':
+        """Reads counts written by save.
+
+        :param path: File to read.
+        :param max_terms: Number of most frequent terms to keep, all if 0.
+        :param max_term_length: Length of the longest term to count, any if 0.
+        :return: Loaded counter, empty if the file does not exist.
+        """
+        if not os.path.isfile(path):
+            return cls(max_terms=max_terms, max_term_length=max_term_length)
+        with open(path, 'r') as f:
+            raw = json.load(f)
+        cls._log.info(
+            f"Loaded document frequencies of {raw['noDocuments']} documents")
+        return cls(raw['documentFrequencies'], raw['noDocuments'],
+                   max_terms=max_terms, max_term_length=max_term_length)
+
+    def _prune(self) -> None:
+        if self.MAX_TERM_LENGTH > 0:
+            for term in [term for term in self._frequencies
+                         if len(term) > self.MAX_TERM_LENGTH]:
+                del self._frequencies[term]
+        if 0 < self.MAX_TERMS < len(self._frequencies):
+            self._frequencies = Counter(dict(
+                self._frequencies.most_common(self.MAX_TERMS)))
+
+
+def save_periodically(counter: DocumentFrequencyCounter,
+                      path: str,
+                      interval: float) -> None:
+    """Sets up and runs snapshots of a counter in a background thread.
+
+    :param counter: Counter to snapshot.
+    :param path: File to write snapshots to.
+    :param interval: Seconds between snapshots.
+    """
+    t = Thread(
+        target=_run_snapshots_in_background,
+        args=(counter, path, interval, ),
+        daemon=True)
+    t.start()
+
+
+def _run_snapshots_in_background(counter: DocumentFrequencyCounter,
+                                 path: str,
+                                 interval: float) -> None:
+    saved_documents = counter.no_documents
+    while True:
+        time.sleep(interval)
+        if counter.no_documents == saved_documents:
+            continue
+        try:
+            counter.save(path)
+            saved_documents = counter.no_documents
+        except OSError as e:
+            DocumentFrequencyCounter._log.error(
+                f"Could not save document frequencies: {e}")
@@ -0,0 +1,99 @@
+# Standard library
+import asyncio
+import re
+from typing import Any, Optional
+
+# 3rd party modules
+import aiohttp
+import pika
+from newspaper.article import ArticleException
+from pika.amqp_object import Properties as MQProperties
+
+# Internal modules
+from app.serialization import DecodeError
+
+
+TRANSIENT = 'transient'
+PERMANENT = 'permanent'
+PARSE_ERROR = 'parse-error'
+
+ATTEMPT_HEADER = 'x-attempt'
+FAILURE_HEADER = 'x-failure'
+ERROR_HEADER = 'x-error'
+MAX_ERROR_LENGTH = 500
+
+TRANSIENT_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, OSError)
+RETRYABLE_STATUSES = frozenset([408, 425, 429])
+HTTP_ERROR_PATTERN = re.compile(r'\b(\d{3}) (?:Client|Server) Error\b')
+# Messages of the requests connection errors and timeouts newspaper wraps.
+NETWORK_ERROR_PATTERN = re.compile(
+    r'timed out|timeout|connection|max retries exceeded|name or service not known|'
+    r'temporary failure in name resolution', re.IGNORECASE)
+
+
+def classify_failure(error: Exception) -> str:
+    """Classifies an error raised while handling a scrape target.
+
+    Only network errors and timeouts, and http statuses that may change
+    such as 503, are transient and retried a limited number of times before
+    they are dead lettered. Messages that can not be decoded are parse
+    errors and everything else, such as a 404 or a bug in scraping or
+    scoring that would fail the same way again, is permanent.
+
+    :param error: Error to classify.
+    :return: TRANSIENT, PERMANENT or PARSE_ERROR.
+    """
+    if isinstance(error, DecodeError):
+        return PARSE_ERROR
+    if isinstance(error, aiohttp.ClientResponseError):
+        return _classify_status(error.status)
+    if isinstance(error, ArticleException):
+        return _classify_article_error(str(error))
+    if isinstance(error, TRANSIENT_ERRORS):
+        return TRANSIENT
+    return PERMANENT
+
+
+def attempt_of(properties: Optional[MQProperties]) -> int:
+    """Reads the number of times a message has been retried.
+
+    :param properties: Properties of the message.
+    :return: Number of retries, 0 for a first delivery.
+    """
+    headers = getattr(properties, 'headers', None) or {}
+    try:
+        return max(0, int(headers.get(ATTEMPT_HEADER, 0)))
+    except (TypeError, ValueError):
+        return 0
+
+
+def failure_properties(failure: str, error: Any, attempt: int) -> MQProperties:
+    """Creates the properties of a failed message published for a retry or
+    to the dead letter queue.
+
+    :param failure: Classification of the failure.
+    :param error: Error or description of the failure.
+    :param attempt: Number of retries including the one being published.
+    :return: Persistent message properties with the failure headers.
+    """
+    return pika.BasicProperties(
+        delivery_mode=2,
+        headers={
+            ATTEMPT_HEADER: attempt,
+            FAILURE_HEADER: failure,
+            ERROR_HEADER: str(error)[:MAX_ERROR_LENGTH]
+        })
+
+
+def _classify_status(status: int) -> str:
+    if status >= 500 or status in RETRYABLE_STATUSES:
+        return TRANSIENT
+    return PERMANENT
+
+
+def _classify_article_error(message: str) -> str:
+    # newspaper only keeps the message of the requests exception.
+    match = HTTP_ERROR_PATTERN.search(message)
+    if match:
+        return _classify_status(int(match.group(1)))
+    return TRANSIENT if NETWORK_ERROR_PATTERN.search(message) else PERMANENT
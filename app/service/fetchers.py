@@ -0,0 +1,127 @@
+# Standard library
+import asyncio
+import logging
+import os
+from abc import ABCMeta, abstractmethod
+from concurrent.futures import Future
+from threading import Thread
+from typing import Any, Coroutine, Optional
+from urllib.parse import urlsplit
+
+# 3rd party modules
+import aiohttp
+import newspaper
+
+
+class HtmlFetcher(metaclass=ABCMeta):
+    """Fetches the html of articles on an event loop running in a
+    background thread.
+    """
+
+    def __init__(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        self._thread = Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+    @abstractmethod
+    async def fetch_async(self, url: str) -> str:
+        """Fetches the html of a url.
+
+        :param url: Url to fetch.
+        :return: Html string.
+        """
+
+    def fetch(self, url: str) -> str:
+        """Fetches the html of a url and waits for the result.
+
+        :param url: Url to fetch.
+        :return: Html string.
+        """
+        return self.submit(self.fetch_async(url)).result()
+
+    def submit(self, coroutine: Coroutine[Any, Any, Any]) -> Future:
+        """Schedules a coroutine on the event loop of the fetcher.
+
+        :param coroutine: Coroutine to run.
+        :return: Future of the coroutine result.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def close(self) -> None:
+        """Stops the event loop of the fetcher."""
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+class AsyncHtmlFetcher(HtmlFetcher):
+    """Fetches html through a pooled http client that keeps connections
+    alive and limits the number of connections per host.
+    """
+
+    _log = logging.getLogger('AsyncHtmlFetcher')
+
+    def __init__(self,
+                 max_connections: int,
+                 max_connections_per_host: int,
+                 keepalive_seconds: float,
+                 timeout_seconds: float) -> None:
+        super().__init__()
+        self.MAX_CONNECTIONS = max_connections
+        self.MAX_CONNECTIONS_PER_HOST = max_connections_per_host
+        self.KEEPALIVE_SECONDS = keepalive_seconds
+        self.TIMEOUT_SECONDS = timeout_seconds
+        self.HEADERS = {'User-Agent': newspaper.Config().browser_user_agent}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def fetch_async(self, url: str) -> str:
+        session = self._get_session()
+        async with session.get(url, headers=self.HEADERS) as response:
+            response.raise_for_status()
+            return await response.text()
+
+    def close(self) -> None:
+        if self._session is not None:
+            self.submit(self._session.close()).result()
+        super().close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Gets the http session, must be called from the event loop.
+
+        :return: ClientSession.
+        """
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.MAX_CONNECTIONS,
+                limit_per_host=self.MAX_CONNECTIONS_PER_HOST,
+                keepalive_timeout=self.KEEPALIVE_SECONDS)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.TIMEOUT_SECONDS))
+        return self._session
+
+
+class FixtureHtmlFetcher(HtmlFetcher):
+    """Serves html from a local directory instead of the network, using the
+    last path segment of a url as the file name.
+    """
+
+    def __init__(self, directory: str) -> None:
+        super().__init__()
+        self.DIRECTORY = directory
+
+    async def fetch_async(self, url: str) -> str:
+        return self.read(url)
+
+    def read(self, url: str) -> str:
+        """Reads the fixture of a url.
+
+        :param url: Url to read the fixture of.
+        :return: Html string.
+        """
+        name = os.path.basename(urlsplit(url).path.rstrip('/')) or 'index'
+        for filename in [name, f'{name}.html']:
+            path = os.path.join(self.DIRECTORY, filename)
+            if os.path.isfile(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    return f.read()
+        raise FileNotFoundError(f'No html fixture for {url} in {self.DIRECTORY}')
@@ -1,36 +1,130 @@
 # Standard library
+import json
 import logging
+import os
 import time
-from pathlib import Path
 from threading import Thread
+from typing import Any, Callable, Dict, List, Optional
 
 # Internal modules
 from app.config import HealthCheckConfig
-from .mq_clients import MQConnectionChecker
+from .metrics import STAGE_SECONDS
+from .mq_clients import DeliveryTracker, MQConnectionChecker
 
 
 _log = logging.getLogger(__file__)
 
 
-def emit_heartbeats(checker: MQConnectionChecker) -> None:
+class HealthMonitor:
+    """Judges the health of the service from the liveness signals the
+    consumer already keeps: when the connection thread last ran, when
+    deliveries were last received and settled, how saturated the workers
+    are and how long each stage takes. Checking health never talks to the
+    broker.
+
+    The service is live as long as the connection thread runs and the
+    workers are not stuck, and ready when it is live, connected and not
+    shutting down.
+    """
+
+    def __init__(self,
+                 config: HealthCheckConfig,
+                 checker: MQConnectionChecker,
+                 tracker: DeliveryTracker,
+                 workers: int,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.CONFIG = config
+        self._checker = checker
+        self._tracker = tracker
+        self._workers = workers
+        self._clock = clock
+
+    def check(self) -> Dict[str, Any]:
+        """Returns the health status of the service.
+
+        :return: Status with the live and ready flags, the reasons for the
+                 service not being live or ready and the signals they are
+                 based on.
+        """
+        now = self._clock()
+        loop_seconds_ago = _seconds_since(now, self._checker.last_alive_at())
+        settled_seconds_ago = now - self._tracker.last_settled_at()
+        in_flight = self._tracker.in_flight()
+        busy = self._tracker.busy()
+        connected = self._checker.is_connected()
+        stopping = self._checker.is_stopping()
+
+        problems: List[str] = []
+        if loop_seconds_ago is None or loop_seconds_ago > self.CONFIG.LIVENESS_SECONDS:
+            problems.append('connection thread is not responding')
+        if busy >= self._workers and settled_seconds_ago > self.CONFIG.STALL_SECONDS:
+            problems.append('all workers are stuck')
+        live = not problems
+        if not connected:
+            problems.append('not connected to MQ')
+        if stopping:
+            problems.append('shutting down')
+        return {
+            'live': live,
+            'ready': not problems,
+            'problems': problems,
+            'connected': connected,
+            'stopping': stopping,
+            'loopSecondsAgo': loop_seconds_ago,
+            'lastDeliverySecondsAgo': _seconds_since(now, self._tracker.last_delivered_at()),
+            'lastSettledSecondsAgo': settled_seconds_ago,
+            'inFlight': in_flight,
+            'busyWorkers': busy,
+            'workers': self._workers,
+            'queued': in_flight - busy,
+            'stageSeconds': {','.join(labels): mean
+                             for labels, mean in STAGE_SECONDS.means().items()}
+        }
+
+
+def emit_heartbeats(checker: MQConnectionChecker, monitor: HealthMonitor) -> None:
     """Sets up and runs heartbeat emissions in a background tread."""
     config = HealthCheckConfig()
     t = Thread(
         target=_run_heartbeats_in_background,
-        args=(config, checker, ))
+        args=(config, checker, monitor, ))
     t.setDaemon(True)
     t.start()
 
 
-def _run_heartbeats_in_background(config: HealthCheckConfig, checker: MQConnectionChecker) -> None:
-    """Touch a file to inform healthcheckers that the service is running.
+def _run_heartbeats_in_background(config: HealthCheckConfig,
+                                  checker: MQConnectionChecker,
+                                  monitor: HealthMonitor) -> None:
+    """Writes the health status to a file while the service is live, to
+    inform healthcheckers that check the age of the file.
 
-    :param filepath: Full path to the file to touch.
-    :param interval_seconds: Interval of emiting lifesigns in seconds.
+    :param config: HealthCheckConfig with the file and interval to use.
+    :param checker: MQConnectionChecker to ping every interval.
+    :param monitor: HealthMonitor to check.
     """
     while True:
-        if checker.is_connected(config.MQ_HEALTH_TARGET):
-            Path(config.FILENAME).touch()
-        else:
-            _log.warn("MQ is not connected")
+        checker.ping()
+        emit_heartbeat(config.FILENAME, monitor.check())
         time.sleep(config.INTERVAL)
+
+
+def emit_heartbeat(filename: str, status: Dict[str, Any]) -> None:
+    """Replaces the heartbeat file with the health status if the service
+    is live, so that healthcheckers never read a partly written file.
+
+    :param filename: Full path to the heartbeat file.
+    :param status: Health status from HealthMonitor.check.
+    """
+    if not status['live']:
+        _log.warning(f"Not live: {', '.join(status['problems'])}")
+        return
+    if not status['ready']:
+        _log.info(f"Not ready: {', '.join(status['problems'])}")
+    tmp_filename = f'{filename}.tmp'
+    with open(tmp_filename, 'w') as f:
+        json.dump(status, f)
+    os.replace(tmp_filename, filename)
+
+
+def _seconds_since(now: float, timestamp: Optional[float]) -> Optional[float]:
+    return None if timestamp is None else now - timestamp
@@ -0,0 +1,38 @@
+# Standard library
+from typing import List
+
+# 3rd party modules
+import numpy as np
+
+# Internal modules
+from .scoring_model import CorpusModel, TermCounts
+
+
+class KeywordExtractor:
+    """Extracts the terms of an article with the highest tfidf weight
+    against the scoring corpus.
+
+    Works on the term counts the scoring model produces for the article,
+    which is much cheaper than newspaper's nlp step since no sentence
+    tokenization or summarization is done.
+    """
+
+    def __init__(self, model: CorpusModel, max_keywords: int = 10) -> None:
+        self._model = model
+        self.MAX_KEYWORDS = max_keywords
+
+    def extract(self, term_counts: TermCounts) -> List[str]:
+        """Extracts keywords from the counted terms of an article.
+
+        :param term_counts: Term counts of the article, see CorpusModel.term_counts.
+        :return: Keywords ordered by descending weight.
+        """
+        if not term_counts:
+            return []
+        terms = list(term_counts)
+        counts = np.array([term_counts[term] for term in terms], dtype=np.float64)
+        corpus_df = self._model.corpus_frequencies(terms)
+        no_documents = self._model.NO_DOCUMENTS + 1
+        idf = np.log((1 + no_documents) / (2 + corpus_df)) + 1
+        order = np.lexsort((np.array(terms), -counts * idf))
+        return [terms[i] for i in order[:self.MAX_KEYWORDS]]
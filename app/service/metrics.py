@@ -0,0 +1,389 @@
+# Standard library
+import bisect
+import json
+import logging
+import time
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from threading import Lock, Thread
+from typing import Any, Callable, ContextManager, Dict, Iterator, List
+from typing import Optional, Sequence, Tuple, TypeVar
+
+
+_log = logging.getLogger('Metrics')
+
+LabelValues = Tuple[str, ...]
+HealthCheck = Callable[[], Dict[str, Any]]
+MetricType = TypeVar('MetricType', bound='Metric')
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NOT_TIMED: ContextManager[None] = nullcontext()
+
+
+class Metric:
+    """Base class of metrics rendered in the Prometheus text format.
+
+    Disabled metrics ignore updates without taking their lock.
+    """
+
+    TYPE = 'untyped'
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 labels: Sequence[str] = ()) -> None:
+        self.NAME = name
+        self.DESCRIPTION = description
+        self.LABELS = tuple(labels)
+        self.enabled = True
+        self._lock = Lock()
+
+    def render(self) -> List[str]:
+        """Renders the metric.
+
+        :return: Lines in the Prometheus text format.
+        """
+        return [f'# HELP {self.NAME} {self.DESCRIPTION}',
+                f'# TYPE {self.NAME} {self.TYPE}'] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError()
+
+    def _format_labels(self, values: LabelValues, *extra: Tuple[str, str]) -> str:
+        pairs = list(zip(self.LABELS, values)) + list(extra)
+        if not pairs:
+            return ''
+        labels = ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+        return '{' + labels + '}'
+
+
+class Counter(Metric):
+
+    TYPE = 'counter'
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 labels: Sequence[str] = ()) -> None:
+        super().__init__(name, description, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        """Increments the counter of a set of label values.
+
+        :param label_values: Values of the labels of the counter.
+        :param amount: Amount to increment by.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f'{self.NAME}{self._format_labels(labels)} {_format_number(value)}'
+                for labels, value in values]
+
+
+class Histogram(Metric):
+
+    TYPE = 'histogram'
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, description, labels)
+        self.BUCKETS = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        """Records an observation.
+
+        :param value: Observed value.
+        :param label_values: Values of the labels of the histogram.
+        """
+        if not self.enabled:
+            return
+        index = bisect.bisect_left(self.BUCKETS, value)
+        with self._lock:
+            counts = self._counts.get(label_values)
+            if counts is None:
+                counts = self._counts[label_values] = [0] * (len(self.BUCKETS) + 1)
+                self._sums[label_values] = 0.0
+            counts[index] += 1
+            self._sums[label_values] += value
+
+    @contextmanager
+    def time(self, *label_values: str) -> Iterator[None]:
+        """Observes the time spent in a block of code in seconds.
+
+        :param label_values: Values of the labels of the histogram.
+        """
+        if not self.enabled:
+            yield
+            return
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, *label_values)
+
+    def count(self, *label_values: str) -> int:
+        with self._lock:
+            return sum(self._counts.get(label_values, []))
+
+    def means(self) -> Dict[LabelValues, float]:
+        """Returns the mean of the observations of each set of label values.
+
+        :return: Mean observation by label values.
+        """
+        with self._lock:
+            return {labels: self._sums[labels] / sum(counts)
+                    for labels, counts in self._counts.items()}
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((labels, list(counts), self._sums[labels])
+                            for labels, counts in self._counts.items())
+        lines: List[str] = []
+        for labels, counts, total in series:
+            cumulative = 0
+            bounds = [_format_number(b) for b in self.BUCKETS] + ['+Inf']
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                lines.append(f'{self.NAME}_bucket'
+                             f'{self._format_labels(labels, ("le", bound))} {cumulative}')
+            lines.append(f'{self.NAME}_sum{self._format_labels(labels)} '
+                         f'{_format_number(total)}')
+            lines.append(f'{self.NAME}_count{self._format_labels(labels)} {cumulative}')
+        return lines
+
+
+class Gauge(Metric):
+    """Gauge whose value is read from a function when rendered."""
+
+    TYPE = 'gauge'
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 read: Callable[[], float]) -> None:
+        super().__init__(name, description)
+        self._read = read
+
+    def _samples(self) -> List[str]:
+        try:
+            return [f'{self.NAME} {_format_number(self._read())}']
+        except Exception as e:
+            _log.warning(f'Could not read gauge {self.NAME}: {e}')
+            return []
+
+
+class LabeledGauge(Metric):
+    """Gauge whose values by label values are read from a function when
+    rendered.
+    """
+
+    TYPE = 'gauge'
+
+    def __init__(self,
+                 name: str,
+                 description: str,
+                 labels: Sequence[str],
+                 read: Callable[[], Dict[LabelValues, float]]) -> None:
+        super().__init__(name, description, labels)
+        self._read = read
+
+    def _samples(self) -> List[str]:
+        try:
+            values = sorted(self._read().items())
+        except Exception as e:
+            _log.warning(f'Could not read gauge {self.NAME}: {e}')
+            return []
+        return [f'{self.NAME}{self._format_labels(labels)} {_format_number(value)}'
+                for labels, value in values]
+
+
+class Registry:
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = Lock()
+        self.enabled = True
+
+    def register(self, metric: MetricType) -> MetricType:
+        """Adds a metric, replacing any metric with the same name.
+
+        :param metric: Metric to add.
+        :return: The added metric.
+        """
+        with self._lock:
+            metric.enabled = self.enabled
+            self._metrics[metric.NAME] = metric
+        return metric
+
+    def disable(self) -> None:
+        """Disables updates of registered metrics and of metrics registered
+        later, for when the metrics are not served.
+        """
+        with self._lock:
+            self.enabled = False
+            for metric in self._metrics.values():
+                metric.enabled = False
+
+    def render(self) -> str:
+        """Renders all metrics in the Prometheus text format.
+
+        :return: Metrics text.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'newsscraper_stage_duration_seconds',
+    'Time spent in each stage of handling a scrape target.',
+    labels=['stage']))
+REJECTED_MESSAGES = REGISTRY.register(Counter(
+    'newsscraper_rejected_messages_total',
+    'Number of scrape target messages rejected.'))
+FAILED_MESSAGES = REGISTRY.register(Counter(
+    'newsscraper_failed_messages_total',
+    'Number of scrape targets that failed by kind of failure and route taken.',
+    labels=['failure', 'route']))
+EXCEPTIONS = REGISTRY.register(Counter(
+    'newsscraper_exceptions_total',
+    'Number of exceptions raised while handling scrape targets by type.',
+    labels=['type']))
+
+
+def time_stage(stage: str) -> ContextManager[None]:
+    """Observes the time spent in a stage of handling a scrape target.
+
+    :param stage: Name of the stage.
+    """
+    if not STAGE_SECONDS.enabled:
+        return _NOT_TIMED
+    return STAGE_SECONDS.time(stage)
+
+
+def count_exception(error: Exception) -> None:
+    """Counts an exception by its type.
+
+    :param error: Exception to count.
+    """
+    EXCEPTIONS.inc(type(error).__name__)
+
+
+def register_gauge(name: str,
+                   description: str,
+                   read: Callable[[], float]) -> None:
+    """Registers a gauge read from a function whenever metrics are rendered.
+
+    :param name: Name of the gauge.
+    :param description: Description of the gauge.
+    :param read: Function returning the current value.
+    """
+    REGISTRY.register(Gauge(name, description, read))
+
+
+def register_labeled_gauge(name: str,
+                           description: str,
+                           labels: Sequence[str],
+                           read: Callable[[], Dict[LabelValues, float]]) -> None:
+    """Registers a gauge with labels read from a function whenever metrics
+    are rendered.
+
+    :param name: Name of the gauge.
+    :param description: Description of the gauge.
+    :param labels: Names of the labels of the gauge.
+    :param read: Function returning the current values by label values.
+    """
+    REGISTRY.register(LabeledGauge(name, description, labels, read))
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves metrics on /metrics and, if the server has a health check,
+    liveness on /healthz and readiness on /readyz.
+    """
+
+    registry: Registry = REGISTRY
+
+    def do_GET(self) -> None:
+        path = self.path.split('?')[0]
+        if path == '/metrics':
+            self._send(200, self.registry.render(),
+                       'text/plain; version=0.0.4; charset=utf-8')
+            return
+        health_check: Optional[HealthCheck] = getattr(self.server, 'health_check', None)
+        if health_check is None or path not in ('/healthz', '/readyz'):
+            self.send_error(404)
+            return
+        status = health_check()
+        healthy = status['live'] if path == '/healthz' else status['ready']
+        self._send(200 if healthy else 503, json.dumps(status), 'application/json')
+
+    def _send(self, code: int, text: str, content_type: str) -> None:
+        body = text.encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class MetricsServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    health_check: Optional[HealthCheck] = None
+
+
+def serve_metrics(port: int,
+                  host: str = '',
+                  health_check: Optional[HealthCheck] = None) -> Optional[MetricsServer]:
+    """Serves the metrics on /metrics in a background thread.
+
+    :param port: Port to listen on, metrics are not served, and updates of
+                 them are disabled, if negative.
+    :param host: Interface to listen on, all interfaces by default.
+    :param health_check: Function returning the health status served on
+                         /healthz and /readyz, not served if None.
+    :return: MetricsServer or None if metrics are not served.
+    """
+    if port < 0:
+        MetricsHandler.registry.disable()
+        _log.info('Metrics are disabled')
+        return None
+    server = MetricsServer((host, port), MetricsHandler)
+    server.health_check = health_check
+    Thread(target=server.serve_forever, daemon=True).start()
+    _log.info(f'Serving metrics on port {server.server_port}')
+    return server
+
+
+def _format_number(value: float) -> str:
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
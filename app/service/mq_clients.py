@@ -1,18 +1,36 @@
 # Standard library
-import json
+import itertools
 import logging
+import math
+import random
+import time
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from queue import Queue, Empty
+from threading import Lock, Semaphore, Thread
+from typing import Any, Callable, Dict, Optional, Tuple
 
 # 3rd party modules
 import pika
+from pika.adapters.blocking_connection import BlockingChannel, BlockingConnection
 from pika.channel import Channel
+from pika.exceptions import AMQPError, ConsumerCancelled
 from pika.spec import Basic as MQ
 from pika.amqp_object import Properties as MQProperties
 
 # Internal modules
-from app.config import MQConfig, NUM_WORKERS
+from app.config import MQConfig, ScrapingConfig
 from app.models import ScrapedArticle, ScrapeTarget
+from app.serialization import decode_scrape_target, encode_scraped_article
+from app.util import wrap_error_message
+from .failures import PARSE_ERROR, TRANSIENT, attempt_of, classify_failure
+from .failures import failure_properties
+from .metrics import FAILED_MESSAGES, REJECTED_MESSAGES, STAGE_SECONDS
+from .metrics import count_exception
+from .metrics import register_gauge, register_labeled_gauge, time_stage
+from .scheduler import DomainScheduler, domain_of
 
 
 class MessageHandler(metaclass=ABCMeta):
@@ -30,110 +48,964 @@ class MessageHandler(metaclass=ABCMeta):
         """
 
 
+class DeliveryTracker:
+    """Keeps track of deliveries that are consumed but not yet acked or
+    rejected and of how long it takes to process them. The body and retry
+    attempt of a delivery are kept with it, so that it can be published
+    again for a retry or to the dead letter queue if it fails.
+
+    Deliveries are identified by their channel and delivery tag, since
+    the channel of a new connection numbers its deliveries from 1 again.
+    Operations on deliveries of a previous channel are ignored.
+    """
+
+    LATENCY_WEIGHT = 0.2
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._delivered: Dict[Tuple[Channel, int], Optional[float]] = {}
+        self._messages: Dict[Tuple[Channel, int], Tuple[bytes, int]] = {}
+        self._average_latency: Optional[float] = None
+        self._last_delivered_at: Optional[float] = None
+        self._last_settled_at = time.monotonic()
+
+    def delivered(self,
+                  channel: Channel,
+                  delivery_tag: int,
+                  body: Optional[bytes] = None,
+                  attempt: int = 0) -> None:
+        with self._lock:
+            self._delivered[(channel, delivery_tag)] = None
+            if body is not None:
+                self._messages[(channel, delivery_tag)] = (body, attempt)
+            self._last_delivered_at = time.monotonic()
+
+    def started(self, channel: Channel, delivery_tag: int) -> None:
+        with self._lock:
+            if (channel, delivery_tag) in self._delivered:
+                self._delivered[(channel, delivery_tag)] = time.monotonic()
+
+    def settled(self, channel: Channel, delivery_tag: int) -> None:
+        with self._lock:
+            started_at = self._delivered.pop((channel, delivery_tag), None)
+            self._messages.pop((channel, delivery_tag), None)
+            if started_at is None:
+                return
+            self._last_settled_at = time.monotonic()
+            latency = self._last_settled_at - started_at
+            if self._average_latency is None:
+                self._average_latency = latency
+            else:
+                self._average_latency += \
+                    self.LATENCY_WEIGHT * (latency - self._average_latency)
+
+    def reset(self) -> None:
+        """Forgets all deliveries, which are redelivered by the broker once
+        the channel they were delivered on is closed.
+        """
+        with self._lock:
+            self._delivered.clear()
+            self._messages.clear()
+
+    def in_flight(self) -> int:
+        """Returns the number of deliveries not yet acked or rejected.
+
+        :return: Number of deliveries in flight.
+        """
+        with self._lock:
+            return len(self._delivered)
+
+    def message(self,
+                channel: Channel,
+                delivery_tag: int) -> Optional[Tuple[bytes, int]]:
+        """Returns the body and retry attempt of a delivery in flight.
+
+        :param channel: Channel the delivery was consumed from.
+        :param delivery_tag: Tag of the delivery.
+        :return: Tuple of body and attempt, None if the delivery is unknown.
+        """
+        with self._lock:
+            return self._messages.get((channel, delivery_tag))
+
+    def busy(self) -> int:
+        """Returns the number of deliveries being handled by a worker.
+
+        :return: Number of deliveries started but not yet settled.
+        """
+        with self._lock:
+            return sum(1 for started_at in self._delivered.values()
+                       if started_at is not None)
+
+    def last_delivered_at(self) -> Optional[float]:
+        """Returns when the latest delivery was received.
+
+        :return: Monotonic time, None if nothing is delivered yet.
+        """
+        with self._lock:
+            return self._last_delivered_at
+
+    def last_settled_at(self) -> float:
+        """Returns when a handled delivery was last settled, or when the
+        tracker was created if none is settled yet.
+
+        :return: Monotonic time.
+        """
+        with self._lock:
+            return self._last_settled_at
+
+    def average_latency(self) -> Optional[float]:
+        """Returns the moving average of the processing time of a delivery.
+
+        :return: Average latency in seconds, None if nothing is processed yet.
+        """
+        with self._lock:
+            return self._average_latency
+
+
+class PrefetchController:
+    """Sizes the prefetch window to keep the worker pool busy.
+
+    Besides one delivery per worker the window holds enough deliveries to
+    keep the pool busy for the configured headroom, based on the observed
+    processing latency.
+    """
+
+    def __init__(self, config: MQConfig) -> None:
+        self.NUM_WORKERS = config.NUM_WORKERS
+        self.MIN_PREFETCH = min(config.NUM_WORKERS, config.MAX_PREFETCH_COUNT)
+        self.MAX_PREFETCH = config.MAX_PREFETCH_COUNT
+        self.HEADROOM_SECONDS = config.PREFETCH_HEADROOM_SECONDS
+        self.prefetch_count = config.PREFETCH_COUNT
+
+    def adapt(self, average_latency: Optional[float]) -> Optional[int]:
+        """Computes a new prefetch count from the observed latency.
+
+        :param average_latency: Average processing latency in seconds.
+        :return: New prefetch count or None if the window should be kept.
+        """
+        if not average_latency:
+            return None
+        buffered = self.NUM_WORKERS * self.HEADROOM_SECONDS / average_latency
+        wanted = self.NUM_WORKERS + math.ceil(buffered)
+        wanted = max(self.MIN_PREFETCH, min(self.MAX_PREFETCH, wanted))
+        if abs(wanted - self.prefetch_count) < max(1, self.prefetch_count // 5):
+            return None
+        self.prefetch_count = wanted
+        return wanted
+
+
+class FlowController:
+    """Bounds the number of deliveries waiting for a worker.
+
+    Consumption is paused once the queue reaches the high water mark and
+    resumed once it has dropped to the low water mark. A high water mark
+    of zero or less never pauses.
+    """
+
+    def __init__(self, config: MQConfig) -> None:
+        self.HIGH_WATER = config.QUEUE_HIGH_WATER
+        self.LOW_WATER = max(0, min(config.QUEUE_LOW_WATER, self.HIGH_WATER - 1))
+        self.paused = False
+
+    def should_pause(self, queued: int) -> bool:
+        """Checks if consumption should be paused.
+
+        :param queued: Number of deliveries waiting for a worker.
+        :return: True if consumption is running and should be paused.
+        """
+        if self.paused or self.HIGH_WATER <= 0 or queued < self.HIGH_WATER:
+            return False
+        self.paused = True
+        return True
+
+    def should_resume(self, queued: int) -> bool:
+        """Checks if consumption should be resumed.
+
+        :param queued: Number of deliveries waiting for a worker.
+        :return: True if consumption is paused and should be resumed.
+        """
+        if not self.paused or queued > self.LOW_WATER:
+            return False
+        self.paused = False
+        return True
+
+
+# Versions of pika whose BlockingChannel wraps the asynchronous channel it
+# uses as _impl, which MQClient publishes on when confirms are enabled.
+PIPELINED_CONFIRMS_PIKA_VERSIONS = ('0.12.', '0.13.')
+
+
 class MQClient:
+    """Publishes, acks and rejects messages on behalf of worker threads.
+
+    Channels may only be used from the thread running the connection, so
+    operations are queued and executed in batches in the connection thread.
+    Operations are executed in the order they were requested, which keeps
+    the publish of an article ahead of the ack of its scrape target.
+
+    With publisher confirms the scrape target is instead acked once the
+    broker has confirmed the publish of its article. Publishes are
+    pipelined and confirms, which may cover several publishes at once,
+    are handled as they arrive.
+
+    The client is bound to the publish channel of a connection and rebound
+    when the connection is replaced, publishes still queued are then made
+    on the new channel.
+
+    Scrape targets that fail are routed by the kind of failure. Transient
+    failures are published to the retry queue of their next attempt, whose
+    TTL dead letters them back to the scrape queue, so a retry waits in
+    the broker rather than in a worker. Other failures, and transient ones
+    out of attempts, are published to the dead letter queue to be replayed
+    once the cause is fixed. Either way the scrape target is acked like it
+    is when its article is published.
+    """
 
     _log = logging.getLogger("MQClient")
 
-    def __init__(self, config: MQConfig, channel: Channel) -> None:
+    def __init__(self,
+                 config: MQConfig,
+                 channel: Optional[Channel] = None,
+                 connection: Optional[BlockingConnection] = None,
+                 tracker: Optional[DeliveryTracker] = None) -> None:
         self.CONFIG = config
+        self._tracker = tracker
+        self._pending: Queue = Queue()
+        self._lock = Lock()
+        self._flush_scheduled = False
+        self._channel: Channel = None
+        self._connection: Optional[BlockingConnection] = None
+        self._publisher: Optional[Channel] = None
+        self._published = 0
+        self._unconfirmed: 'OrderedDict[int, Tuple[Channel, MQ.Deliver, float]]' = \
+            OrderedDict()
+        if config.PUBLISHER_CONFIRMS and \
+                not pika.__version__.startswith(PIPELINED_CONFIRMS_PIKA_VERSIONS):
+            raise RuntimeError(
+                f'Publisher confirms are not supported with pika {pika.__version__}')
+        register_gauge(
+            'newsscraper_unconfirmed_publishes',
+            'Number of published articles not yet confirmed by the broker.',
+            self.unconfirmed)
+        self.bind(channel, connection)
+
+    def bind(self,
+             channel: Optional[Channel],
+             connection: Optional[BlockingConnection] = None) -> None:
+        """Switches to the publish channel of a connection, must be called
+        from the connection thread.
+
+        :param channel: Channel to publish on.
+        :param connection: Connection to run channel operations in, operations
+                           are run directly in the calling thread if None.
+        """
+        if self._unconfirmed:
+            self._log.warning(
+                f"Dropping {len(self._unconfirmed)} unconfirmed publishes, "
+                "their scrape targets are redelivered by the broker")
+            self._unconfirmed.clear()
         self._channel = channel
+        self._connection = connection
+        self._publisher = None
+        if connection is not None:
+            self._declare_failure_queues()
+        if connection is not None and self.CONFIG.PUBLISHER_CONFIRMS:
+            self._enable_confirms()
+        with self._lock:
+            self._flush_scheduled = False
+        if connection is not None and not self._pending.empty():
+            self._submit(_noop)
 
-    def send(self, scraped_article: ScrapedArticle) -> None:
-        self._channel.basic_publish(
-            exchange=self.CONFIG.EXCHANGE,
-            routing_key=self.CONFIG.SCRAPED_QUEUE,
-            body=json.dumps(scraped_article.asdict())
-        )
+    def send(self,
+             scraped_article: ScrapedArticle,
+             channel: Channel,
+             method: MQ.Deliver) -> None:
+        """Publishes a scraped article and acks the scrape target it was
+        made from, once the publish is confirmed if confirms are enabled.
+
+        :param scraped_article: ScrapedArticle to publish.
+        :param channel: MQ channel the scrape target was consumed from.
+        :param method: MQ metadata about the scrape target message.
+        """
+        body = encode_scraped_article(scraped_article)
+        self._submit(partial(
+            self._publish, self.CONFIG.EXCHANGE, self.CONFIG.SCRAPED_QUEUE,
+            body, None, channel, method))
 
     def ack(self, channel: Channel, method: MQ.Deliver) -> None:
-        channel.basic_ack(delivery_tag=method.delivery_tag)
+        self._submit(partial(self._settle, channel, method, 'ack', partial(
+            channel.basic_ack,
+            delivery_tag=method.delivery_tag)))
 
     def reject(self, channel: Channel, method: MQ.Deliver) -> None:
-        channel.basic_reject(
+        REJECTED_MESSAGES.inc()
+        self._submit(partial(self._settle, channel, method, 'reject', partial(
+            channel.basic_reject,
             delivery_tag=method.delivery_tag,
-            requeue=False)
+            requeue=False)))
+
+    def fail(self, channel: Channel, method: MQ.Deliver, error: Exception) -> None:
+        """Publishes a scrape target that failed for a retry or to the dead
+        letter queue, depending on the kind of failure and the attempts made,
+        and acks it once the publish is confirmed if confirms are enabled.
+
+        Scrape targets whose body is not tracked are rejected.
+
+        :param channel: MQ channel the scrape target was consumed from.
+        :param method: MQ metadata about the scrape target message.
+        :param error: Error the scrape target failed with.
+        """
+        failure = classify_failure(error)
+        message = None if self._tracker is None \
+            else self._tracker.message(channel, method.delivery_tag)
+        if message is None:
+            FAILED_MESSAGES.inc(failure, 'reject')
+            self.reject(channel, method)
+            return
+        body, attempt = message
+        if failure == TRANSIENT and attempt < len(self.CONFIG.RETRY_DELAYS):
+            attempt += 1
+            route, queue = 'retry', self.CONFIG.RETRY_QUEUE(attempt)
+        else:
+            route, queue = 'dead-letter', self.CONFIG.DEAD_LETTER_QUEUE
+        FAILED_MESSAGES.inc(failure, route)
+        self._log.info(f"Routing {failure} failure of delivery "
+                       f"{method.delivery_tag} to {queue}")
+        self._submit(partial(
+            self._publish, '', queue, body,
+            failure_properties(failure, error, attempt), channel, method))
+
+    def unconfirmed(self) -> int:
+        """Returns the number of publishes not yet confirmed by the broker.
+
+        :return: Number of unconfirmed publishes.
+        """
+        return len(self._unconfirmed)
+
+    def is_idle(self) -> bool:
+        """Checks that no operations are queued and no publishes unconfirmed.
+
+        :return: Boolean indicating that the client has nothing left to do.
+        """
+        return self._pending.empty() and not self._unconfirmed
+
+    def _declare_failure_queues(self) -> None:
+        """Declares the retry queues and the dead letter queue, must be
+        called from the connection thread. A message in the retry queue of
+        an attempt is dead lettered back to the scrape queue once it has
+        waited for the retry delay of the attempt.
+        """
+        for attempt, delay in enumerate(self.CONFIG.RETRY_DELAYS, start=1):
+            self._channel.queue_declare(
+                queue=self.CONFIG.RETRY_QUEUE(attempt),
+                durable=True,
+                arguments={
+                    'x-message-ttl': int(delay * 1000),
+                    'x-dead-letter-exchange': '',
+                    'x-dead-letter-routing-key': self.CONFIG.SCRAPE_QUEUE
+                })
+        self._channel.queue_declare(
+            queue=self.CONFIG.DEAD_LETTER_QUEUE, durable=True)
+
+    def _enable_confirms(self) -> None:
+        """Puts the channel in confirm mode, must be called from the
+        connection thread.
+        """
+        self._published = 0
+        publisher = self._channel
+        if isinstance(publisher, BlockingChannel):
+            # BlockingChannel waits for the confirm of every publish before
+            # returning and pika has no public API to pipeline confirms on a
+            # blocking connection. The pika versions checked when the client
+            # is created wrap an asynchronous channel as _impl, which publishes
+            # without waiting and passes confirms to a callback.
+            publisher = publisher._impl
+        publisher.confirm_delivery(self._on_confirm)
+        self._publisher = publisher
+        self._log.info("Enabled publisher confirms")
+
+    def _publish(self,
+                 exchange: str,
+                 routing_key: str,
+                 body: bytes,
+                 properties: Optional[MQProperties],
+                 channel: Channel,
+                 method: MQ.Deliver) -> None:
+        """Publishes a message on the current publish channel on behalf of
+        a scrape target, must be called from the connection thread.
+
+        :param exchange: Exchange to publish to.
+        :param routing_key: Routing key to publish with.
+        :param body: Message body.
+        :param properties: Message properties or None.
+        :param channel: MQ channel the scrape target was consumed from.
+        :param method: MQ metadata about the scrape target message.
+        """
+        if self._publisher is None:
+            _timed('publish', partial(
+                self._channel.basic_publish,
+                exchange=exchange,
+                routing_key=routing_key,
+                body=body,
+                properties=properties))
+            self._settle(channel, method, 'ack', partial(
+                channel.basic_ack,
+                delivery_tag=method.delivery_tag))
+            return
+        self._publish_confirmed(
+            self._publisher, exchange, routing_key, body, properties, channel, method)
+
+    def _publish_confirmed(self,
+                           publisher: Channel,
+                           exchange: str,
+                           routing_key: str,
+                           body: bytes,
+                           properties: Optional[MQProperties],
+                           channel: Channel,
+                           method: MQ.Deliver) -> None:
+        """Publishes a message in confirm mode and remembers the scrape target
+        to ack when the publish is confirmed.
+
+        :param publisher: Channel in confirm mode to publish on.
+        :param exchange: Exchange to publish to.
+        :param routing_key: Routing key to publish with.
+        :param body: Message body.
+        :param properties: Message properties or None.
+        :param channel: MQ channel the scrape target was consumed from.
+        :param method: MQ metadata about the scrape target message.
+        """
+        with time_stage('publish'):
+            publisher.basic_publish(
+                exchange=exchange,
+                routing_key=routing_key,
+                body=body,
+                properties=properties)
+        # The broker numbers the publishes of a channel in confirm mode from 1.
+        self._published += 1
+        self._unconfirmed[self._published] = (channel, method, time.perf_counter())
+
+    def _on_confirm(self, frame: Any) -> None:
+        """Acks the scrape targets of confirmed publishes and requeues those
+        of publishes the broker failed to handle. Called in the connection
+        thread for every Basic.Ack and Basic.Nack.
+
+        :param frame: Method frame of the confirm.
+        """
+        confirm = frame.method
+        if confirm.multiple:
+            tags = list(itertools.takewhile(
+                lambda tag: tag <= confirm.delivery_tag, self._unconfirmed))
+        else:
+            tags = [confirm.delivery_tag]
+        confirmed_at = time.perf_counter()
+        for tag in tags:
+            entry = self._unconfirmed.pop(tag, None)
+            if entry is None:
+                continue
+            channel, method, published_at = entry
+            STAGE_SECONDS.observe(confirmed_at - published_at, 'confirm')
+            if isinstance(confirm, MQ.Ack):
+                self.ack(channel, method)
+                continue
+            self._log.warning(
+                f"Publish nacked by broker, requeueing delivery {method.delivery_tag}")
+            self._submit(partial(self._settle, channel, method, 'reject', partial(
+                channel.basic_reject,
+                delivery_tag=method.delivery_tag,
+                requeue=True)))
+
+    def _settle(self,
+                channel: Channel,
+                method: MQ.Deliver,
+                stage: str,
+                operation: Callable[[], None]) -> None:
+        """Acks or rejects a delivery and marks it as no longer in flight.
+
+        Deliveries of a closed channel fail to settle and are left to be
+        forgotten by the tracker, which is reset when the channel is
+        replaced.
+
+        :param channel: MQ channel the message was consumed from.
+        :param method: MQ metadata about the message.
+        :param stage: Name of the stage to time the operation as.
+        :param operation: Ack or reject operation.
+        """
+        _timed(stage, operation)
+        if self._tracker is not None:
+            self._tracker.settled(channel, method.delivery_tag)
+
+    def _submit(self, operation: Callable[[], None]) -> None:
+        """Queues a channel operation for execution in the connection thread.
+
+        :param operation: Channel operation to execute.
+        """
+        if self._connection is None:
+            operation()
+            return
+        self._pending.put(operation)
+        with self._lock:
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self._connection.add_callback_threadsafe(self._flush)
+
+    def _flush(self) -> None:
+        """Executes all queued channel operations, must be called from the
+        connection thread.
+        """
+        with self._lock:
+            self._flush_scheduled = False
+        while True:
+            try:
+                operation = self._pending.get_nowait()
+            except Empty:
+                return
+            try:
+                operation()
+            except Exception as e:
+                count_exception(e)
+                self._log.error(wrap_error_message(e))
+
+
+def _timed(stage: str, operation: Callable[[], None]) -> None:
+    with time_stage(stage):
+        operation()
+
+
+def _noop() -> None:
+    """Does nothing, submitted to flush operations queued before a rebind."""
 
 
 class MQConsumer:
+    """Consumes scrape targets and hands them to a pool of worker threads.
+
+    The consumer is bound to the consume channel of a connection and
+    rebound when the connection is replaced. Workers keep handling the
+    deliveries of the old channel, but those can no longer be acked and
+    are redelivered on the new channel by the broker.
+
+    Messages that can not be decoded are handed to the MQClient, which must
+    share the DeliveryTracker of the consumer, to be dead lettered.
+
+    Deliveries are queued per domain and a dispatching thread hands them to
+    idle workers once their domain is no longer throttled, so workers never
+    wait for a throttled domain.
+
+    When too many deliveries wait for a worker the consumer is cancelled,
+    which leaves further messages in the broker, and declared again once
+    the workers have caught up. This bounds memory use whatever the
+    prefetch count and the backlog.
+    """
+
+    RESUME_CHECK_SECONDS = 0.1
+    DISPATCH_CHECK_SECONDS = 0.1
 
     _log = logging.getLogger("MQConsumer")
 
     def __init__(self,
                  config: MQConfig,
-                 channel: Channel,
-                 handler: MessageHandler) -> None:
+                 channel: Optional[Channel],
+                 handler: MessageHandler,
+                 tracker: Optional[DeliveryTracker] = None,
+                 scheduler: Optional[DomainScheduler] = None,
+                 client: Optional[MQClient] = None) -> None:
         self.CONFIG = config
-        self._channel = channel
+        self._channel: Channel = channel
         self._handler = handler
-        self._executor = ThreadPoolExecutor(max_workers=NUM_WORKERS)
+        self._client = client
+        self._tracker = tracker or DeliveryTracker()
+        self._scheduler = scheduler or DomainScheduler(
+            ScrapingConfig.DOMAIN_RATE, ScrapingConfig.DOMAIN_BURST)
+        self._prefetch = PrefetchController(config)
+        self._flow = FlowController(config)
+        self._executor = ThreadPoolExecutor(max_workers=config.NUM_WORKERS)
+        self._idle_workers = Semaphore(config.NUM_WORKERS)
+        self._consumer_tag: Optional[str] = None
+        self._stopping = False
+        self._dispatcher = Thread(target=self._dispatch_jobs, daemon=True)
+        self._dispatcher.start()
+        register_gauge(
+            'newsscraper_queued_messages',
+            'Number of consumed messages waiting for a worker.',
+            self._scheduler.qsize)
+        register_labeled_gauge(
+            'newsscraper_domain_queued_messages',
+            'Number of consumed messages waiting for a worker by domain.',
+            ['domain'],
+            lambda: {(domain,): depth
+                     for domain, depth in self.queue_depths().items()})
+        register_gauge(
+            'newsscraper_in_flight_messages',
+            'Number of consumed messages not yet acked or rejected.',
+            self.in_flight)
+        register_gauge(
+            'newsscraper_consumption_paused',
+            'Whether consumption is paused until queued messages are handled.',
+            lambda: float(self._flow.paused))
+
+    def bind(self, channel: Channel) -> None:
+        """Switches to the consume channel of a new connection.
+
+        :param channel: Channel to consume on.
+        """
+        self._channel = channel
+        self._tracker.reset()
 
     def start(self) -> None:
-        self._channel.basic_qos(prefetch_count=1)
-        self._channel.basic_consume(
-            self._handle_message,
-            self.CONFIG.SCRAPE_QUEUE)
-        self._channel.start_consuming()
+        """Declares the consumer and consumes until the channel stops consuming
+        or fails, must be called from the connection thread.
+        """
+        if self._stopping:
+            return
+        self._flow.paused = False
+        self._channel.basic_qos(
+            prefetch_count=self._prefetch.prefetch_count, all_channels=True)
+        while not self._stopping:
+            self._consumer_tag = self._channel.basic_consume(
+                self._handle_message,
+                self.CONFIG.SCRAPE_QUEUE)
+            self._channel.start_consuming()
+            if not self._flow.paused:
+                return
+            self._wait_for_workers()
+
+    def stop(self) -> None:
+        """Stops consuming new deliveries, must be called from the connection
+        thread. Deliveries being handled are finished, those still waiting
+        for a worker are left unacked to be redelivered once the channel
+        is closed.
+        """
+        self._stopping = True
+        if self._channel is not None:
+            self._channel.stop_consuming()
+        # Settles the deliveries waiting for a throttled domain right away.
+        for job in self._scheduler.drain():
+            job()
+
+    def shutdown(self) -> None:
+        """Waits for the dispatching and worker threads to exit."""
+        self._stopping = True
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def in_flight(self) -> int:
+        """Returns the number of consumed messages not yet acked or rejected.
+
+        :return: Number of messages in flight.
+        """
+        return self._tracker.in_flight()
 
     def _handle_message(self,
                         channel: Channel,
                         method: MQ.Deliver,
                         properties: MQProperties,
                         body: bytes) -> None:
+        if self._stopping:
+            return
+        self._tracker.delivered(channel, method.delivery_tag, body, attempt_of(properties))
         try:
-            scrape_target = ScrapeTarget.fromdict(json.loads(body))
+            with time_stage('decode'):
+                scrape_target = decode_scrape_target(body)
             self._log.info(
                 f"Incomming ScrapeTarget articleId=[{scrape_target.article_id}]")
-            self._executor.submit(
-                self._handler.handle_scrape_target,
-                scrape_target, channel, method)
+            domain = None if scrape_target.is_scraped() \
+                else domain_of(scrape_target.url)
+            self._scheduler.submit(domain, partial(
+                self._handle_scrape_target, scrape_target, channel, method))
         except ValueError as e:
             self._log.info(str(e))
-            self._reject_message(method)
+            self._dead_letter_message(channel, method, e)
+        if self.CONFIG.ADAPTIVE_PREFETCH:
+            self._adapt_prefetch()
+        if self._flow.should_pause(self._scheduler.qsize()):
+            self._pause()
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Returns the number of messages waiting for a worker per domain.
+
+        :return: Dict of domains and queue depths.
+        """
+        return self._scheduler.queue_depths()
+
+    def _dispatch_jobs(self) -> None:
+        """Hands jobs of domains that are not throttled to idle workers until
+        the consumer is stopped. Only this thread waits for a throttled
+        domain to be allowed again, the workers only get jobs that are ready.
+        """
+        while not self._stopping:
+            if not self._idle_workers.acquire(timeout=self.DISPATCH_CHECK_SECONDS):
+                continue
+            job = self._scheduler.next_job(timeout=self.DISPATCH_CHECK_SECONDS)
+            if job is None:
+                self._idle_workers.release()
+                continue
+            self._executor.submit(self._run_job, job)
 
-    def _reject_message(self, method: MQ.Deliver) -> None:
-        self._channel.basic_reject(delivery_tag=method.delivery_tag)
+    def _run_job(self, job: Callable[[], None]) -> None:
+        try:
+            job()
+        finally:
+            self._idle_workers.release()
+
+    def _handle_scrape_target(self,
+                              target: ScrapeTarget,
+                              channel: Channel,
+                              method: MQ.Deliver) -> None:
+        if self._stopping:
+            # Left for redelivery, so no longer counted as in flight.
+            self._tracker.settled(channel, method.delivery_tag)
+            return
+        self._tracker.started(channel, method.delivery_tag)
+        self._handler.handle_scrape_target(target, channel, method)
+
+    def _pause(self) -> None:
+        """Cancels the consumer, which makes start_consuming return, must be
+        called from the connection thread. Deliveries received but not yet
+        dispatched are requeued by the channel.
+        """
+        self._log.info(f"Pausing consumption with {self._scheduler.qsize()} "
+                       f"deliveries waiting for a worker")
+        self._channel.basic_cancel(self._consumer_tag)
+
+    def _wait_for_workers(self) -> None:
+        """Processes connection events while paused, until the queue has
+        dropped to the low water mark or the consumer is stopped.
+        """
+        connection = self._channel.connection
+        while not self._stopping:
+            if self._flow.should_resume(self._scheduler.qsize()):
+                self._log.info("Resuming consumption")
+                return
+            connection.process_data_events(time_limit=self.RESUME_CHECK_SECONDS)
+
+    def _adapt_prefetch(self) -> None:
+        """Resizes the prefetch window based on observed processing latency,
+        must be called from the connection thread.
+
+        The window is set for the whole channel, the global flag of basic.qos
+        which pika calls all_channels, since RabbitMQ only applies a per
+        consumer prefetch count to consumers declared after it is set.
+        """
+        prefetch_count = self._prefetch.adapt(self._tracker.average_latency())
+        if prefetch_count is not None:
+            self._log.info(f"Adjusting prefetch count to {prefetch_count}")
+            self._channel.basic_qos(prefetch_count=prefetch_count, all_channels=True)
+
+    def _dead_letter_message(self,
+                             channel: Channel,
+                             method: MQ.Deliver,
+                             error: Exception) -> None:
+        """Moves a message that can not be decoded to the dead letter queue
+        through the MQClient, which acks it once the publish is confirmed.
+        Without a client the message is rejected.
+        """
+        if self._client is None:
+            FAILED_MESSAGES.inc(PARSE_ERROR, 'reject')
+            REJECTED_MESSAGES.inc()
+            channel.basic_reject(delivery_tag=method.delivery_tag, requeue=False)
+            self._tracker.settled(channel, method.delivery_tag)
+            return
+        self._client.fail(channel, method, error)
 
 
 class MQConnectionChecker(metaclass=ABCMeta):
 
-    def is_connected(self, health_target: str) -> bool:
+    def is_connected(self) -> bool:
         """Returns a boolean inidcating if the underlying MQ connenction is open.
 
-        :param health_target: MQ target to use for health checking.
         :return: Boolean
         """
         raise NotImplementedError()
 
+    def is_stopping(self) -> bool:
+        """Returns a boolean indicating if the consumer is shutting down.
+
+        :return: Boolean
+        """
+        raise NotImplementedError()
+
+    def ping(self) -> None:
+        """Asks the thread running the connection to mark itself alive,
+        may be called from any thread.
+        """
+        raise NotImplementedError()
+
+    def last_alive_at(self) -> Optional[float]:
+        """Returns when the thread running the connection last marked itself
+        alive.
 
-class MQConnectionFactory(MQConnectionChecker):
+        :return: Monotonic time, None if it has not run yet.
+        """
+        raise NotImplementedError()
 
-    _log = logging.getLogger("MQConnectionFactory")
 
-    def __init__(self, config: MQConfig) -> None:
+class MQConnectionManager(MQConnectionChecker):
+    """Connects to the broker and consumes with a channel for consuming and
+    another for publishing, so that publishes held back by the broker do
+    not hold back deliveries. Lost connections are reopened with
+    exponential backoff and the consumer is declared again.
+
+    When stopped, consuming stops and the deliveries being handled are
+    drained, their publishes confirmed and acks sent, before the connection
+    is closed. A stop request only sets a flag, which the connection thread
+    checks on a timer, so that stopping takes no locks and is safe from
+    signal handlers running in the connection thread.
+    """
+
+    STOP_CHECK_SECONDS = 0.1
+
+    _log = logging.getLogger("MQConnectionManager")
+
+    def __init__(self,
+                 config: MQConfig,
+                 connect: Optional[Callable[[], BlockingConnection]] = None,
+                 sleep: Optional[Callable[[float], Any]] = None) -> None:
+        self.CONFIG = config
         self.TEST_MODE = config.TEST_MODE
-        if not self.TEST_MODE:
-            connection_params = pika.URLParameters(config.URI())
-            self._conn = pika.BlockingConnection(connection_params)
-            self._channel = self._conn.channel()
-            self._channel.basic_qos(prefetch_count=NUM_WORKERS)
-        else:
-            self._conn = None
-            self._channel = None
+        self._connect = connect or partial(
+            pika.BlockingConnection, pika.URLParameters(config.URI()))
+        self._stop_requested = False
+        self._sleep = sleep or self._sleep_unless_stopped
+        self._connection: Optional[BlockingConnection] = None
+        self._alive_at: Optional[float] = None
 
-    def __del__(self) -> None:
-        if not self.TEST_MODE:
-            self._channel.close()
-            self._conn.close()
+    def run(self, consumer: 'MQConsumer', client: MQClient) -> None:
+        """Consumes until stopped, reconnecting whenever the connection or
+        one of its channels is lost.
 
-    def get_channel(self) -> Channel:
-        return self._channel
+        :param consumer: MQConsumer to bind to the consume channel.
+        :param client: MQClient to bind to the publish channel.
+        """
+        if self.TEST_MODE:
+            self._log.info("Not connecting to MQ in test mode")
+            return
+        attempt = 0
+        while not self._stop_requested:
+            self._mark_alive()
+            try:
+                self._connection = self._connect()
+                consume_channel = self._connection.channel()
+                client.bind(self._connection.channel(), self._connection)
+                consumer.bind(consume_channel)
+                attempt = 0
+                self._log.info("Connected to MQ")
+                # Stops right away if the stop was requested while connecting.
+                self._check_stop(self._connection, consumer)
+                consumer.start()
+                self._log.info("Stopped consuming")
+                self._drain(self._connection, consumer, client)
+                if self._stop_requested:
+                    return
+                raise ConsumerCancelled('Consumer cancelled by the broker')
+            except (AMQPError, OSError) as e:
+                count_exception(e)
+                delay = self.backoff(attempt)
+                attempt += 1
+                self._log.error(f"MQ connection lost: {repr(e)}, "
+                                f"reconnecting in {delay:.1f} seconds")
+            finally:
+                self._close()
+            self._sleep(delay)
 
-    def is_connected(self, health_target: str) -> bool:
+    def stop(self) -> None:
+        """Requests consuming to stop and the connection to be closed once
+        in flight deliveries are drained, may be called from any thread and
+        from signal handlers.
+        """
+        self._stop_requested = True
+
+    def backoff(self, attempt: int) -> float:
+        """Computes the delay before a reconnect, doubling with each failed
+        attempt and jittered so that workers do not reconnect in lockstep.
+
+        :param attempt: Number of failed attempts since the last connection.
+        :return: Delay in seconds.
+        """
+        delay = min(self.CONFIG.RECONNECT_MAX_SECONDS,
+                    self.CONFIG.RECONNECT_MIN_SECONDS * 2 ** attempt)
+        return delay * random.uniform(0.5, 1.0)
+
+    def is_connected(self) -> bool:
         if self.TEST_MODE:
             return True
+        connection = self._connection
+        return connection is not None and connection.is_open
+
+    def is_stopping(self) -> bool:
+        return self._stop_requested
+
+    def ping(self) -> None:
+        connection = self._connection
+        if connection is None or connection.is_closed:
+            return
         try:
-            self._channel.queue_declare(queue=health_target, passive=True)
-            return True
+            connection.add_callback_threadsafe(self._mark_alive)
+        except AMQPError as e:
+            self._log.warning(f"Could not ping MQ connection: {repr(e)}")
+
+    def last_alive_at(self) -> Optional[float]:
+        if self.TEST_MODE:
+            return time.monotonic()
+        return self._alive_at
+
+    def _check_stop(self,
+                    connection: BlockingConnection,
+                    consumer: 'MQConsumer') -> None:
+        """Stops the consumer if a stop was requested and checks again after
+        a while otherwise, must be called from the connection thread.
+
+        :param connection: Connection to schedule the next check on.
+        :param consumer: MQConsumer to stop.
+        """
+        if self._stop_requested:
+            consumer.stop()
+            return
+        connection.add_timeout(
+            self.STOP_CHECK_SECONDS, partial(self._check_stop, connection, consumer))
+
+    def _sleep_unless_stopped(self, seconds: float) -> None:
+        """Sleeps until the time has passed or a stop is requested.
+
+        :param seconds: Seconds to sleep.
+        """
+        deadline = time.monotonic() + seconds
+        while not self._stop_requested:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, self.STOP_CHECK_SECONDS))
+
+    def _mark_alive(self) -> None:
+        self._alive_at = time.monotonic()
+
+    def _drain(self,
+               connection: BlockingConnection,
+               consumer: 'MQConsumer',
+               client: MQClient) -> None:
+        """Processes connection events until the deliveries in flight are
+        settled or the drain deadline has passed.
+
+        :param connection: Connection to process events of.
+        :param consumer: Stopped MQConsumer.
+        :param client: MQClient publishing and acking for the consumer.
+        """
+        deadline = time.monotonic() + self.CONFIG.DRAIN_SECONDS
+        self._log.info(f"Draining {consumer.in_flight()} deliveries in flight")
+        while consumer.in_flight() > 0 or not client.is_idle():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._log.warning(
+                    f"Closing with {consumer.in_flight()} deliveries in flight "
+                    f"and {client.unconfirmed()} unconfirmed publishes")
+                return
+            connection.process_data_events(time_limit=min(remaining, 0.1))
+        self._log.info("Drained deliveries in flight")
+
+    def _close(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is None or connection.is_closed:
+            return
+        try:
+            connection.close()
         except Exception as e:
-            self._log.error(e)
-            return False
+            self._log.warning(f"Could not close MQ connection: {repr(e)}")
@@ -0,0 +1,186 @@
+# Standard library
+import time
+from collections import deque
+from threading import Condition
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+Job = Callable[[], None]
+Clock = Callable[[], float]
+
+
+class TokenBucket:
+    """Allows a burst of requests and then a steady rate of requests."""
+
+    def __init__(self, rate: float, burst: float, now: float) -> None:
+        self.RATE = rate
+        self.BURST = burst
+        self._tokens = burst
+        self._updated_at = now
+
+    def delay(self, now: float) -> float:
+        """Computes the time until a token is available.
+
+        :param now: Current time in seconds.
+        :return: Seconds to wait, 0 if a token is available.
+        """
+        self._refill(now)
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) / self.RATE
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self._tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self._tokens >= self.BURST
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated_at)
+        self._tokens = min(self.BURST, self._tokens + elapsed * self.RATE)
+        self._updated_at = now
+
+
+class DomainScheduler:
+    """Fair queue of jobs across domains with a token bucket per domain.
+
+    Jobs are handed out round robin over the domains that have a token
+    available, so a throttled domain does not hold up the other domains.
+    Jobs without a domain are never throttled.
+    """
+
+    MAX_IDLE_BUCKETS = 1000
+
+    def __init__(self,
+                 rate: float,
+                 burst: float,
+                 clock: Clock = time.monotonic) -> None:
+        self.RATE = rate
+        self.BURST = max(1.0, burst)
+        self._clock = clock
+        self._condition = Condition()
+        self._queues: Dict[Optional[str], Deque[Job]] = {}
+        self._order: Deque[Optional[str]] = deque()
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def submit(self, domain: Optional[str], job: Job) -> None:
+        """Queues a job for a domain.
+
+        :param domain: Domain the job will make requests to or None.
+        :param job: Job to run.
+        """
+        with self._condition:
+            if domain not in self._queues:
+                self._queues[domain] = deque()
+                self._order.append(domain)
+            self._queues[domain].append(job)
+            self._condition.notify()
+
+    def next_job(self, timeout: Optional[float] = None) -> Optional[Job]:
+        """Waits for a job of a domain that is not throttled.
+
+        :param timeout: Maximum seconds to wait, waits forever if None.
+        :return: Job or None if no job became ready before the timeout.
+        """
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._condition:
+            while True:
+                now = self._clock()
+                job, delay = self._pop_ready_job(now)
+                if job is not None:
+                    return job
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        return None
+                    delay = remaining if delay is None else min(delay, remaining)
+                self._condition.wait(delay)
+
+    def drain(self) -> List[Job]:
+        """Takes all queued jobs, whether their domain is throttled or not.
+
+        :return: List of jobs.
+        """
+        with self._condition:
+            jobs = [job for domain in self._order for job in self._queues[domain]]
+            self._queues.clear()
+            self._order.clear()
+            return jobs
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Returns the number of queued jobs per domain.
+
+        :return: Dict of domains and queue depths.
+        """
+        with self._condition:
+            return {str(domain or ''): len(jobs)
+                    for domain, jobs in self._queues.items()}
+
+    def qsize(self) -> int:
+        """Returns the total number of queued jobs.
+
+        :return: Number of queued jobs.
+        """
+        with self._condition:
+            return sum(len(jobs) for jobs in self._queues.values())
+
+    def _pop_ready_job(self, now: float) -> Tuple[Optional[Job], Optional[float]]:
+        """Takes the next job round robin from a domain with a token available.
+
+        :param now: Current time in seconds.
+        :return: Tuple of job or None and seconds until a job may be ready.
+        """
+        min_delay: Optional[float] = None
+        for _ in range(len(self._order)):
+            domain = self._order[0]
+            self._order.rotate(-1)
+            delay = self._delay(domain, now)
+            if delay > 0:
+                min_delay = delay if min_delay is None else min(min_delay, delay)
+                continue
+            if domain is not None and self.RATE > 0:
+                self._buckets[domain].take(now)
+            jobs = self._queues[domain]
+            job = jobs.popleft()
+            if not jobs:
+                del self._queues[domain]
+                self._order.remove(domain)
+            return job, None
+        return None, min_delay
+
+    def _delay(self, domain: Optional[str], now: float) -> float:
+        """Computes the time until a domain may be requested again.
+
+        :param domain: Domain to check.
+        :param now: Current time in seconds.
+        :return: Seconds to wait, 0 if the domain is not throttled.
+        """
+        if domain is None or self.RATE <= 0:
+            return 0.0
+        if domain not in self._buckets:
+            self._prune_buckets(now)
+            self._buckets[domain] = TokenBucket(self.RATE, self.BURST, now)
+        return self._buckets[domain].delay(now)
+
+    def _prune_buckets(self, now: float) -> None:
+        """Drops buckets of idle domains that are refilled.
+
+        :param now: Current time in seconds.
+        """
+        if len(self._buckets) < self.MAX_IDLE_BUCKETS:
+            return
+        for domain in list(self._buckets):
+            if domain not in self._queues and self._buckets[domain].is_full(now):
+                del self._buckets[domain]
+
+
+def domain_of(url: str) -> str:
+    """Gets the domain of a url.
+
+    :param url: Url to get the domain of.
+    :return: Lower case host name.
+    """
+    return (urlsplit(url).hostname or '').lower()
@@ -0,0 +1,241 @@
+# Standard library
+import logging
+import multiprocessing
+from abc import ABCMeta, abstractmethod
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from queue import Queue
+from threading import Lock, Semaphore, Thread
+from typing import List, Optional, Tuple
+
+# Internal modules
+from app.models import Article, Subject
+from .scoring_service import ScoringService
+
+
+# Scorer inherited by forked scoring processes.
+_process_scorer: Optional[ScoringService] = None
+
+ScoringPair = Tuple[Article, List[Subject]]
+QueuedScoring = Tuple[Article, List[Subject], Future]
+
+
+class ScoringBackend(metaclass=ABCMeta):
+
+    @abstractmethod
+    def score(self, article: Article, subjects: List[Subject]) -> List[float]:
+        """Scores subjects against an article.
+
+        :param article: Article to score against.
+        :param subjects: List of subjects to score.
+        :return: List of scores in the order of the subjects.
+        """
+
+    def score_batch(self, pairs: List[ScoringPair]) -> List[List[float]]:
+        """Scores several articles against their subjects.
+
+        :param pairs: List of articles and the subjects to score against them.
+        :return: List of scores for each pair.
+        """
+        return [self.score(article, subjects) for article, subjects in pairs]
+
+    def submit_batch(self, pairs: List[ScoringPair]) -> Future:
+        """Starts scoring several articles against their subjects.
+
+        :param pairs: List of articles and the subjects to score against them.
+        :return: Future of the list of scores for each pair.
+        """
+        future: Future = Future()
+        try:
+            future.set_result(self.score_batch(pairs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self) -> None:
+        """Releases resources held by the backend."""
+
+
+class InlineScoringBackend(ScoringBackend):
+    """Scores in the calling thread."""
+
+    def __init__(self, scorer: ScoringService) -> None:
+        self._scorer = scorer
+
+    def score(self, article: Article, subjects: List[Subject]) -> List[float]:
+        return self._scorer.score(article, subjects)
+
+    def score_batch(self, pairs: List[ScoringPair]) -> List[List[float]]:
+        return [scores.tolist() for scores in self._scorer.score_batch(pairs)]
+
+
+class ProcessPoolScoringBackend(ScoringBackend):
+    """Scores in a pool of processes so that scoring is not bound by the GIL.
+
+    The processes are forked once the scorer is loaded, which lets them
+    share the loaded corpus model with the parent instead of loading it again.
+    """
+
+    _log = logging.getLogger('ProcessPoolScoringBackend')
+
+    def __init__(self, scorer: ScoringService, workers: int) -> None:
+        global _process_scorer
+        _process_scorer = scorer
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('fork'))
+        # Fork all processes now, before the caller starts any threads.
+        for future in [self._executor.submit(_ping) for _ in range(workers)]:
+            future.result()
+        self._log.info(f"Started {workers} scoring processes")
+
+    def score(self, article: Article, subjects: List[Subject]) -> List[float]:
+        return self.score_batch([(article, subjects)])[0]
+
+    def score_batch(self, pairs: List[ScoringPair]) -> List[List[float]]:
+        return self.submit_batch(pairs).result()
+
+    def submit_batch(self, pairs: List[ScoringPair]) -> Future:
+        return self._executor.submit(_score_batch_in_process, pairs)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+class BatchingScoringBackend(ScoringBackend):
+    """Scores the articles of concurrent callers together.
+
+    Callers queue their article and wait while a dispatching thread submits
+    everything queued since its last batch to the backend, keeping up to
+    max_in_flight batches scoring at once. An idle scorer scores an article
+    as soon as it is queued, while under backlog the articles queued while
+    all batches are in flight are scored in the next one.
+    """
+
+    _log = logging.getLogger('BatchingScoringBackend')
+
+    def __init__(self,
+                 backend: ScoringBackend,
+                 max_batch_size: int,
+                 max_in_flight: int = 1) -> None:
+        self._backend = backend
+        self._max_batch_size = max_batch_size
+        self._queue: Queue = Queue()
+        self._slots = Semaphore(max_in_flight)
+        self._lock = Lock()
+        self._stopped = False
+        self._thread = Thread(target=self._dispatch_queued, daemon=True)
+        self._thread.start()
+        self._log.info(f"Scoring up to {max_in_flight} batches "
+                       f"of up to {max_batch_size} articles at once")
+
+    def score(self, article: Article, subjects: List[Subject]) -> List[float]:
+        future: Future = Future()
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError('Scoring backend is shut down')
+            self._queue.put((article, subjects, future))
+        return future.result()
+
+    def score_batch(self, pairs: List[ScoringPair]) -> List[List[float]]:
+        return self._backend.score_batch(pairs)
+
+    def submit_batch(self, pairs: List[ScoringPair]) -> Future:
+        return self._backend.submit_batch(pairs)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._stopped = True
+            self._queue.put(None)
+        self._thread.join()
+        self._backend.shutdown()
+
+    def _dispatch_queued(self) -> None:
+        """Submits queued articles in batches until the backend is shut down."""
+        stopped = False
+        while not stopped:
+            self._slots.acquire()
+            batch: List[QueuedScoring] = []
+            try:
+                batch.append(self._queue.get())
+                while len(batch) < self._max_batch_size and not self._queue.empty():
+                    batch.append(self._queue.get())
+                if None in batch:
+                    stopped = True
+                    batch = [item for item in batch if item is not None]
+                if not batch:
+                    self._slots.release()
+                    continue
+                self._backend.submit_batch(
+                    [(article, subjects) for article, subjects, _ in batch]
+                ).add_done_callback(partial(self._resolve, batch))
+            except Exception as e:
+                self._log.error(f"Could not submit batch: {e}")
+                self._slots.release()
+                _fail(batch, e)
+
+    def _resolve(self, batch: List[QueuedScoring], future: Future) -> None:
+        """Hands out the scores of a batch to the waiting callers.
+
+        :param batch: List of articles, their subjects and the futures of
+                      the waiting callers.
+        :param future: Future of the scores of the batch.
+        """
+        self._slots.release()
+        try:
+            scores = future.result()
+            if len(scores) != len(batch):
+                raise RuntimeError(
+                    f'Got {len(scores)} scores for {len(batch)} articles')
+        except Exception as e:
+            _fail(batch, e)
+            return
+        for (_, _, caller), article_scores in zip(batch, scores):
+            caller.set_result(article_scores)
+
+
+def new_scoring_backend(scorer: ScoringService,
+                        workers: int,
+                        max_batch_size: int = 1) -> ScoringBackend:
+    """Creates a scoring backend.
+
+    :param scorer: Loaded ScoringService.
+    :param workers: Number of scoring processes, scores inline if 0.
+    :param max_batch_size: Largest number of articles to score together,
+                           scores each article on its own if 1.
+    :return: ScoringBackend.
+    """
+    backend: ScoringBackend = InlineScoringBackend(scorer)
+    if workers > 0:
+        backend = ProcessPoolScoringBackend(scorer, workers)
+    if max_batch_size > 1:
+        return BatchingScoringBackend(
+            backend, max_batch_size, max_in_flight=max(workers, 1))
+    return backend
+
+
+def _fail(batch: List[QueuedScoring], error: Exception) -> None:
+    """Fails the callers waiting for the scores of a batch.
+
+    :param batch: List of articles, their subjects and the futures of
+                  the waiting callers.
+    :param error: Error to raise to the callers.
+    """
+    for _, _, caller in batch:
+        if not caller.done():
+            caller.set_exception(error)
+
+
+def _score_batch_in_process(pairs: List[ScoringPair]) -> List[List[float]]:
+    """Scores several articles in a scoring process.
+
+    :param pairs: List of articles and the subjects to score against them.
+    :return: List of scores for each pair.
+    """
+    if _process_scorer is None:
+        raise RuntimeError('Scoring process started without a scorer')
+    return [scores.tolist() for scores in _process_scorer.score_batch(pairs)]
+
+
+def _ping() -> None:
+    """Does nothing, used to start scoring processes."""
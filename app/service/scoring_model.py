@@ -0,0 +1,482 @@
+# Standard library
+import hashlib
+import json
+import logging
+import os
+import re
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+# 3rd party modules
+import numpy as np
+from scipy.sparse import csr_matrix as ScipyMatrix
+from sklearn.feature_extraction import FeatureHasher
+
+# Internal modules
+from .document_frequencies import DocumentFrequencyCounter
+
+
+Analyzer = Callable[[str], List[str]]
+TermCounts = Dict[str, int]
+
+MODEL_FORMAT_VERSION = 2
+META_FILE = 'meta.json'
+CORPUS_FILE = 'corpus.txt'
+TERMS_FILE = 'terms.npy'
+DOCUMENT_FREQUENCIES_FILE = 'document_frequencies.npy'
+HASHING_DOCUMENT_FREQUENCIES_FILE = 'hashing_document_frequencies.npy'
+
+# Same tokens as the default token_pattern of sklearn's vectorizers.
+TOKEN_PATTERN = re.compile(r'(?u)\b\w\w+\b')
+
+
+class CorpusModel:
+    """Vocabulary and document frequencies of the base corpus.
+
+    The model is fitted once so that scoring an article only has to
+    tokenize the article and its subjects instead of the whole corpus.
+    Terms are kept as a sorted array so that a model loaded from disk can
+    be memory-mapped and shared between processes. Document frequencies
+    counted from scraped articles are kept in a dict of their own, so that
+    adding them does not copy the shared arrays.
+    """
+
+    _log = logging.getLogger('CorpusModel')
+
+    def __init__(self,
+                 terms: np.ndarray,
+                 document_frequencies: np.ndarray,
+                 no_documents: int,
+                 stopwords: List[str],
+                 version: str) -> None:
+        self.TERMS = terms
+        self.DOCUMENT_FREQUENCIES = document_frequencies
+        self.NO_DOCUMENTS = no_documents
+        self.STOPWORDS = stopwords
+        self.VERSION = version
+        self.SCRAPED_FREQUENCIES: Dict[str, int] = {}
+        self._stopwords = frozenset(stopwords)
+        self._analyzer = build_analyzer(stopwords)
+
+    @classmethod
+    def fit(cls,
+            corpus: List[str],
+            stopwords: List[str],
+            version: str) -> 'CorpusModel':
+        """Fits vocabulary and document frequencies on a corpus.
+
+        :param corpus: List of documents.
+        :param stopwords: Stopwords to filter out.
+        :param version: Version of the corpus and stopwords used.
+        :return: Fitted CorpusModel.
+        """
+        analyzer = build_analyzer(stopwords)
+        counter = DocumentFrequencyCounter()
+        for document in corpus:
+            counter.add(analyzer(document))
+        return cls.from_counter(counter, stopwords, version)
+
+    @classmethod
+    def from_counter(cls,
+                     counter: DocumentFrequencyCounter,
+                     stopwords: List[str],
+                     version: str) -> 'CorpusModel':
+        """Builds a model from counted document frequencies.
+
+        :param counter: Document frequencies to build the model from.
+        :param stopwords: Stopwords filtered out of the counted documents.
+        :param version: Version of the corpus and stopwords used.
+        :return: CorpusModel.
+        """
+        frequencies, no_documents = counter.snapshot()
+        terms = sorted(frequencies)
+        cls._log.info(f"Fitted corpus model with {len(terms)} terms")
+        return CorpusModel(
+            terms=np.array(terms, dtype=np.str_),
+            document_frequencies=np.array(
+                [frequencies[term] for term in terms], dtype=np.int64),
+            no_documents=no_documents,
+            stopwords=stopwords,
+            version=version)
+
+    def with_frequencies(self, counter: DocumentFrequencyCounter) -> 'CorpusModel':
+        """Creates a model that also counts the documents of a counter.
+
+        The new model shares the term and frequency arrays of this model
+        and keeps the counted frequencies separately.
+
+        :param counter: Document frequencies to add.
+        :return: CorpusModel.
+        """
+        scraped = DocumentFrequencyCounter(self.SCRAPED_FREQUENCIES)
+        scraped.update(counter)
+        frequencies, no_documents = scraped.snapshot()
+        model = CorpusModel(
+            terms=self.TERMS,
+            document_frequencies=self.DOCUMENT_FREQUENCIES,
+            no_documents=self.NO_DOCUMENTS + no_documents,
+            stopwords=self.STOPWORDS,
+            version=self.VERSION)
+        model.SCRAPED_FREQUENCIES = frequencies
+        return model
+
+    def document_frequency_counter(self) -> DocumentFrequencyCounter:
+        """Copies the document frequencies of the model into a counter.
+
+        :return: DocumentFrequencyCounter.
+        """
+        counter = DocumentFrequencyCounter(
+            dict(zip(self.TERMS.tolist(), self.DOCUMENT_FREQUENCIES.tolist())))
+        counter.update(DocumentFrequencyCounter(self.SCRAPED_FREQUENCIES))
+        counter.no_documents = self.NO_DOCUMENTS
+        return counter
+
+    def analyze(self, text: str) -> List[str]:
+        """Tokenizes a text the same way the corpus was tokenized.
+
+        :param text: Text to tokenize.
+        :return: List of terms.
+        """
+        return self._analyzer(text)
+
+    def corpus_frequencies(self, terms: List[str]) -> np.ndarray:
+        """Looks up corpus document frequencies of terms.
+
+        :param terms: Terms to look up.
+        :return: Array of document frequencies, 0 for unknown terms.
+        """
+        frequencies = np.zeros(len(terms), dtype=np.int64)
+        if len(terms) > 0 and len(self.TERMS) > 0:
+            wanted = np.array(terms, dtype=np.str_)
+            indices = np.searchsorted(self.TERMS, wanted)
+            candidates = np.minimum(indices, len(self.TERMS) - 1)
+            known = self.TERMS[candidates] == wanted
+            frequencies[known] = self.DOCUMENT_FREQUENCIES[candidates[known]]
+        if self.SCRAPED_FREQUENCIES:
+            frequencies += np.fromiter(
+                (self.SCRAPED_FREQUENCIES.get(term, 0) for term in terms),
+                dtype=np.int64, count=len(terms))
+        return frequencies
+
+    def term_counts(self, *texts: str) -> TermCounts:
+        """Counts the occurences of each term in one or more texts.
+
+        Counting several texts gives the same counts as counting them joined
+        by spaces, without building the joined string.
+
+        :param texts: Texts to tokenize.
+        :return: Dict of terms and their counts.
+        """
+        counts: Counter = Counter()
+        for text in texts:
+            counts.update(TOKEN_PATTERN.findall(text.lower()))
+        for stopword in self._stopwords.intersection(counts):
+            del counts[stopword]
+        return counts
+
+    def tfidf_matrix(self,
+                     documents: List[str],
+                     groups: Optional[List[int]] = None) -> ScipyMatrix:
+        """Builds an l2 normalized tfidf matrix for groups of documents.
+
+        :param documents: Documents to weigh.
+        :param groups: Group number of each document, all in one group if None.
+        :return: Tfidf matrix with one row per document.
+        """
+        term_counts = [self.term_counts(doc) for doc in documents]
+        return self.weigh_term_counts(term_counts, groups)
+
+    def weigh_term_counts(self,
+                          term_counts: List[TermCounts],
+                          groups: Optional[List[int]] = None) -> ScipyMatrix:
+        """Builds an l2 normalized tfidf matrix for groups of counted documents.
+
+        The weights of each group are identical to fitting a TfidfVectorizer
+        on the group's documents together with the corpus: the documents are
+        counted into the document frequencies and terms missing from the
+        corpus vocabulary are weighted by their frequency in the group alone.
+
+        :param term_counts: Term counts of the documents to weigh.
+        :param groups: Group number of each document, all in one group if None.
+        :return: Tfidf matrix with one row per document.
+        """
+        count_matrix, corpus_df = self.count_matrix(term_counts)
+        return weigh_counts(count_matrix, corpus_df, self.NO_DOCUMENTS, groups)
+
+    def count_matrix(self,
+                     term_counts: List[TermCounts]) -> Tuple[ScipyMatrix, np.ndarray]:
+        """Builds a matrix of term counts with one column per distinct term.
+
+        :param term_counts: Term counts of the documents.
+        :return: Count matrix and the corpus document frequency of each column.
+        """
+        columns: Dict[str, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        counts: List[int] = []
+        for row, doc_counts in enumerate(term_counts):
+            for term, count in doc_counts.items():
+                rows.append(row)
+                cols.append(columns.setdefault(term, len(columns)))
+                counts.append(count)
+        matrix = ScipyMatrix(
+            (np.array(counts, dtype=np.float64), (rows, cols)),
+            shape=(len(term_counts), len(columns)))
+        return matrix, self.corpus_frequencies(list(columns))
+
+
+class HashingCorpusModel(CorpusModel):
+    """Corpus model that hashes terms into a fixed number of columns.
+
+    Only the document frequency of each column is kept, so the memory used
+    by the model and by the matrices built for scoring does not grow with
+    the vocabulary. Terms that hash to the same column share their counts
+    and document frequencies, which makes scores approximate.
+    """
+
+    def __init__(self,
+                 document_frequencies: np.ndarray,
+                 no_documents: int,
+                 stopwords: List[str],
+                 version: str) -> None:
+        super().__init__(
+            terms=np.array([], dtype=np.str_),
+            document_frequencies=document_frequencies,
+            no_documents=no_documents,
+            stopwords=stopwords,
+            version=version)
+        self.NO_FEATURES = len(document_frequencies)
+        self._hasher = FeatureHasher(
+            n_features=self.NO_FEATURES, input_type='dict', alternate_sign=False)
+
+    @classmethod
+    def fit(cls,
+            corpus: List[str],
+            stopwords: List[str],
+            version: str,
+            no_features: int = 2 ** 18) -> 'HashingCorpusModel':
+        """Fits the document frequency of each hashed column on a corpus.
+
+        :param corpus: List of documents.
+        :param stopwords: Stopwords to filter out.
+        :param version: Version of the corpus and stopwords used.
+        :param no_features: Number of columns to hash terms into.
+        :return: Fitted HashingCorpusModel.
+        """
+        analyzer = build_analyzer(stopwords)
+        hasher = FeatureHasher(
+            n_features=no_features, input_type='dict', alternate_sign=False)
+        matrix = hasher.transform(
+            dict.fromkeys(analyzer(document), 1) for document in corpus)
+        document_frequencies = np.bincount(
+            matrix.indices, minlength=no_features).astype(np.int64)
+        cls._log.info(f"Fitted hashing corpus model with {no_features} columns")
+        return cls(
+            document_frequencies=document_frequencies,
+            no_documents=len(corpus),
+            stopwords=stopwords,
+            version=version)
+
+    def corpus_frequencies(self, terms: List[str]) -> np.ndarray:
+        if len(terms) == 0:
+            return np.zeros(0, dtype=np.int64)
+        columns = self._hasher.transform({term: 1} for term in terms).indices
+        return self.DOCUMENT_FREQUENCIES[columns]
+
+    def count_matrix(self,
+                     term_counts: List[TermCounts]) -> Tuple[ScipyMatrix, np.ndarray]:
+        return self._hasher.transform(term_counts), self.DOCUMENT_FREQUENCIES
+
+
+def model_version(fingerprint: List[str], stopwords: List[str]) -> str:
+    """Computes the version of a model built from a corpus and stopwords.
+
+    :param fingerprint: Fingerprint of the corpus source the model is built
+                        from, see CorpusSource.fingerprint.
+    :param stopwords: Stopwords filtered out of the corpus.
+    :return: Version string.
+    """
+    description = json.dumps({
+        'formatVersion': MODEL_FORMAT_VERSION,
+        'corpus': sorted(fingerprint),
+        'stopwords': sorted(stopwords)
+    })
+    return hashlib.sha1(description.encode('utf-8')).hexdigest()[:12]
+
+
+def save_model(model: CorpusModel,
+               corpus: List[str],
+               directory: str,
+               hashing_model: Optional[HashingCorpusModel] = None) -> None:
+    """Writes a model and the corpus it was fitted on to a directory.
+
+    :param model: CorpusModel to save.
+    :param corpus: Prepared corpus documents.
+    :param directory: Directory to write the artifact to.
+    :param hashing_model: HashingCorpusModel fitted on the same corpus, if any.
+    """
+    os.makedirs(directory, exist_ok=True)
+    meta_path = os.path.join(directory, META_FILE)
+    if os.path.isfile(meta_path):
+        os.remove(meta_path)
+    np.save(os.path.join(directory, TERMS_FILE), model.TERMS)
+    np.save(os.path.join(directory, DOCUMENT_FREQUENCIES_FILE),
+            model.DOCUMENT_FREQUENCIES)
+    hash_features = None
+    if hashing_model is not None:
+        np.save(os.path.join(directory, HASHING_DOCUMENT_FREQUENCIES_FILE),
+                hashing_model.DOCUMENT_FREQUENCIES)
+        hash_features = hashing_model.NO_FEATURES
+    with open(os.path.join(directory, CORPUS_FILE), 'w') as f:
+        for document in corpus:
+            f.write(document.replace('\n', ' ') + '\n')
+    # The meta file is written last so an interrupted build is seen as missing.
+    with open(meta_path, 'w') as f:
+        json.dump({
+            'formatVersion': MODEL_FORMAT_VERSION,
+            'version': model.VERSION,
+            'noDocuments': model.NO_DOCUMENTS,
+            'stopwords': model.STOPWORDS,
+            'hashFeatures': hash_features
+        }, f)
+
+
+def load_model(directory: str, version: str) -> Optional[CorpusModel]:
+    """Loads a model artifact with memory-mapped term and frequency arrays.
+
+    :param directory: Directory the artifact was written to.
+    :param version: Expected model version.
+    :return: CorpusModel or None if the artifact is missing or stale.
+    """
+    meta = _read_meta(directory, version)
+    if meta is None:
+        return None
+    return CorpusModel(
+        terms=np.load(os.path.join(directory, TERMS_FILE), mmap_mode='r'),
+        document_frequencies=np.load(
+            os.path.join(directory, DOCUMENT_FREQUENCIES_FILE), mmap_mode='r'),
+        no_documents=meta['noDocuments'],
+        stopwords=meta['stopwords'],
+        version=version)
+
+
+def load_hashing_model(directory: str,
+                       version: str,
+                       no_features: int) -> Optional[HashingCorpusModel]:
+    """Loads the hashing model of an artifact with memory-mapped frequencies.
+
+    :param directory: Directory the artifact was written to.
+    :param version: Expected model version.
+    :param no_features: Expected number of hashed columns.
+    :return: HashingCorpusModel or None if the artifact is missing, stale
+             or was built with another number of columns.
+    """
+    meta = _read_meta(directory, version)
+    if meta is None or meta.get('hashFeatures') != no_features:
+        return None
+    return HashingCorpusModel(
+        document_frequencies=np.load(
+            os.path.join(directory, HASHING_DOCUMENT_FREQUENCIES_FILE),
+            mmap_mode='r'),
+        no_documents=meta['noDocuments'],
+        stopwords=meta['stopwords'],
+        version=version)
+
+
+def load_corpus(directory: str, version: str) -> Optional[List[str]]:
+    """Loads the prepared corpus stored in a model artifact.
+
+    :param directory: Directory the artifact was written to.
+    :param version: Expected model version.
+    :return: List of documents or None if the artifact is missing or stale.
+    """
+    if _read_meta(directory, version) is None:
+        return None
+    with open(os.path.join(directory, CORPUS_FILE), 'r') as f:
+        return [line.rstrip('\n') for line in f]
+
+
+def _read_meta(directory: str, version: str) -> Optional[Dict]:
+    """Reads artifact metadata and checks that the artifact is up to date.
+
+    :param directory: Directory the artifact was written to.
+    :param version: Expected model version.
+    :return: Metadata or None if the artifact is missing or stale.
+    """
+    path = os.path.join(directory, META_FILE)
+    if not os.path.isfile(path):
+        return None
+    with open(path, 'r') as f:
+        meta = json.load(f)
+    if meta.get('formatVersion') != MODEL_FORMAT_VERSION or \
+            meta.get('version') != version:
+        CorpusModel._log.warning(
+            f"Stale scoring model in {directory}, version={meta.get('version')}")
+        return None
+    return meta
+
+
+def build_analyzer(stopwords: List[str]) -> Analyzer:
+    """Builds the tokenizer used for both the corpus and scored texts.
+
+    Produces the same terms as the analyzer of a CountVectorizer with
+    default settings, without its chain of configurable steps.
+
+    :param stopwords: Stopwords to filter out.
+    :return: Analyzer function.
+    """
+    stopword_set = frozenset(stopwords)
+    find_tokens = TOKEN_PATTERN.findall
+
+    def analyze(text: str) -> List[str]:
+        return [token for token in find_tokens(text.lower())
+                if token not in stopword_set]
+
+    return analyze
+
+
+def weigh_counts(count_matrix: ScipyMatrix,
+                 corpus_df: np.ndarray,
+                 no_corpus_documents: int,
+                 groups: Optional[List[int]] = None) -> ScipyMatrix:
+    """Weighs a count matrix with smoothed idf weights and normalizes the rows.
+
+    :param count_matrix: Term counts with one row per document.
+    :param corpus_df: Corpus document frequency of each column.
+    :param no_corpus_documents: Number of documents in the corpus.
+    :param groups: Group number of each document, all in one group if None.
+    :return: Tfidf matrix with one row per document.
+    """
+    no_rows = count_matrix.shape[0]
+    if groups is None:
+        groups = [0] * no_rows
+    entries = count_matrix.tocoo()
+    row_index = entries.row.astype(np.int64)
+    col_index = entries.col.astype(np.int64)
+    document_groups = np.array(groups, dtype=np.int64)
+    entry_groups = document_groups[row_index]
+    group_keys = entry_groups * count_matrix.shape[1] + col_index
+    _, key_index, key_counts = np.unique(
+        group_keys, return_inverse=True, return_counts=True)
+    local_df = key_counts[key_index.ravel()]
+    group_sizes = np.bincount(document_groups)
+    no_documents = no_corpus_documents + group_sizes[entry_groups]
+    idf = np.log((1 + no_documents) / (1 + corpus_df[col_index] + local_df)) + 1
+
+    matrix = ScipyMatrix(
+        (entries.data * idf, (row_index, col_index)),
+        shape=count_matrix.shape)
+    return normalize_rows(matrix)
+
+
+def normalize_rows(matrix: ScipyMatrix) -> ScipyMatrix:
+    """Scales each row of a sparse matrix to unit length.
+
+    :param matrix: Matrix to normalize.
+    :return: Normalized matrix, rows without terms are left as zeros.
+    """
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    scaled = matrix.tocsr(copy=True)
+    scaled.data /= np.repeat(norms, np.diff(scaled.indptr))
+    return scaled
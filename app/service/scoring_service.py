@@ -2,9 +2,10 @@
 import itertools
 import logging
 import os
-from typing import List, Any
+from typing import List, Any, Optional, Tuple
 
 # 3rd party modules
+import numpy as np
 import stop_words
 from nltk.corpus import brown
 from scipy.sparse.csr import csr_matrix as ScipyMatrix
@@ -12,7 +13,19 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
 # Internal modules
+from app.config import ScoringConfig
 from app.models import Article, Subject
+from .corpus import CorpusSource, FileCorpusSource, JsonlCorpusSource
+from .document_frequencies import DocumentFrequencyCounter
+from .scoring_model import CorpusModel, HashingCorpusModel, TermCounts
+from .scoring_model import load_corpus, load_hashing_model, load_model
+from .scoring_model import model_version
+
+
+REFIT_MODE = 'refit'
+PRECOMPUTED_MODE = 'precomputed'
+HASHING_MODE = 'hashing'
+SCORING_MODES = [REFIT_MODE, PRECOMPUTED_MODE, HASHING_MODE]
 
 
 class ScoringService:
@@ -20,23 +33,177 @@ class ScoringService:
 
     _log = logging.getLogger('ScoringService')
 
-    def __init__(self) -> None:
-        _corpus_reader = CorpusReader()
-        self.CORPUS = _corpus_reader.read()
-        self.STOPWORDS = _corpus_reader.get_stopwords()
+    def __init__(self,
+                 mode: str = ScoringConfig.MODE,
+                 model_dir: str = ScoringConfig.MODEL_DIR,
+                 hash_features: int = ScoringConfig.HASH_FEATURES,
+                 corpus: Optional[CorpusSource] = None,
+                 scraped_frequencies: Optional[DocumentFrequencyCounter] = None) -> None:
+        if mode not in SCORING_MODES:
+            raise ValueError(f'Unknown scoring mode: {mode}')
+        self.MODE = mode
+        source = corpus or new_corpus_source(ScoringConfig.CORPUS)
+        self.STOPWORDS = CorpusReader().get_stopwords()
+        self.VERSION = model_version(source.fingerprint(), self.STOPWORDS)
+        self._model: Optional[CorpusModel] = None
+        if self.MODE == PRECOMPUTED_MODE:
+            self._model = self._load_model(source, model_dir, self.VERSION)
+            if scraped_frequencies is not None:
+                self._model = self._add_frequencies(
+                    self._model, scraped_frequencies)
+        elif self.MODE == HASHING_MODE:
+            self._model = self._load_hashing_model(
+                source, model_dir, self.VERSION, hash_features)
+        else:
+            self.CORPUS = self._load_corpus(source, model_dir, self.VERSION)
         self._log.info("Corpus and stopwords successfully loaded.")
 
-    def score(self, article: Article, subjects: List[Subject]) -> List[Subject]:
+    def _load_model(self,
+                    reader: CorpusSource,
+                    model_dir: str,
+                    version: str) -> CorpusModel:
+        """Loads the prebuilt corpus model or fits it if it is missing or stale.
+
+        :param reader: CorpusSource to fall back on.
+        :param model_dir: Directory of the prebuilt model artifact.
+        :param version: Expected model version.
+        :return: CorpusModel.
+        """
+        model = load_model(model_dir, version)
+        if model is not None:
+            self._log.info(f"Loaded scoring model version={version}")
+            return model
+        return CorpusModel.fit(reader.read(), self.STOPWORDS, version)
+
+    def _load_hashing_model(self,
+                            reader: CorpusSource,
+                            model_dir: str,
+                            version: str,
+                            no_features: int) -> HashingCorpusModel:
+        """Loads the prebuilt hashing model or fits it if it is missing or stale.
+
+        :param reader: CorpusSource to fall back on.
+        :param model_dir: Directory of the prebuilt model artifact.
+        :param version: Expected model version.
+        :param no_features: Number of columns to hash terms into.
+        :return: HashingCorpusModel.
+        """
+        model = load_hashing_model(model_dir, version, no_features)
+        if model is not None:
+            self._log.info(f"Loaded hashing scoring model version={version}")
+            return model
+        corpus = self._load_corpus(reader, model_dir, version)
+        return HashingCorpusModel.fit(corpus, self.STOPWORDS, version, no_features)
+
+    def _load_corpus(self,
+                     reader: CorpusSource,
+                     model_dir: str,
+                     version: str) -> List[str]:
+        """Loads the prepared corpus or parses it if it is missing or stale.
+
+        :param reader: CorpusSource to fall back on.
+        :param model_dir: Directory of the prebuilt model artifact.
+        :param version: Expected model version.
+        :return: List of corpus documents.
+        """
+        corpus = load_corpus(model_dir, version)
+        if corpus is not None:
+            return corpus
+        return reader.read()
+
+    def _add_frequencies(self,
+                         model: CorpusModel,
+                         frequencies: DocumentFrequencyCounter) -> CorpusModel:
+        """Adds document frequencies counted from scraped articles to a model,
+        keeping the model arrays memory-mapped.
+
+        :param model: CorpusModel of the reference corpus.
+        :param frequencies: Document frequencies of scraped articles.
+        :return: CorpusModel of both.
+        """
+        if frequencies.no_documents == 0:
+            return model
+        self._log.info(
+            f"Added {frequencies.no_documents} scraped articles to the corpus")
+        return model.with_frequencies(frequencies)
+
+    def get_model(self) -> CorpusModel:
+        """Gets the corpus model, fitting it on the corpus in refit mode.
+
+        :return: CorpusModel.
+        """
+        if self._model is None:
+            self._model = CorpusModel.fit(
+                self.CORPUS, self.STOPWORDS, self.VERSION)
+        return self._model
+
+    def score(self, article: Article, subjects: List[Subject]) -> List[float]:
         """Scores subjects against an article by comparing how simliar they are.
 
         :param article: Article to score against.
         :param subjects: List of subjects to score.
-        :return: List of subjects with scores.
+        :return: List of scores in the order of the subjects.
         """
-        scores = self._calc_scores(article, subjects)
-        for i, score in enumerate(scores):
-            subjects[i].score = score
-        return subjects
+        return self._calc_scores(article, subjects)
+
+    def score_batch(self,
+                    pairs: List[Tuple[Article, List[Subject]]]) -> List[np.ndarray]:
+        """Computes scores for several articles and their subjects at once.
+
+        All texts are weighted in one pass and every subject is compared
+        with its own article through one row wise sparse product, so that
+        only the pairs that are scored are ever computed.
+
+        :param pairs: List of articles and the subjects to score against them.
+        :return: Array of subject scores for each pair.
+        """
+        if self.MODE == REFIT_MODE:
+            return [np.array(self._calc_scores(article, subjects))
+                    if subjects else np.zeros(0)
+                    for article, subjects in pairs]
+        model = self.get_model()
+        documents: List[TermCounts] = []
+        groups: List[int] = []
+        subject_rows: List[int] = []
+        article_rows: List[int] = []
+        for group, (article, subjects) in enumerate(pairs):
+            for subject in subjects:
+                subject_rows.append(len(documents))
+                documents.append(self._subject_term_counts(subject))
+                groups.append(group)
+            article_rows.append(len(documents))
+            documents.append(self._article_term_counts(article))
+            groups.append(group)
+        if not subject_rows:
+            return [np.zeros(0) for _ in pairs]
+
+        tfidf_matrix = model.weigh_term_counts(documents, groups)
+        subject_groups = np.array(groups)[subject_rows]
+        subject_vectors = tfidf_matrix[subject_rows]
+        article_vectors = tfidf_matrix[np.array(article_rows)[subject_groups]]
+        scores = np.asarray(
+            subject_vectors.multiply(article_vectors).sum(axis=1)).ravel()
+        offsets = np.cumsum([len(subjects) for _, subjects in pairs])
+        return np.split(scores, offsets[:-1])
+
+    def _article_term_counts(self, article: Article) -> TermCounts:
+        """Gets the term counts of an article, reusing the counts made when
+        the article was scraped.
+
+        :param article: Article to count terms of.
+        :return: Term counts of the article title and body.
+        """
+        if article.term_counts is not None:
+            return article.term_counts
+        return self.get_model().term_counts(article.title, article.body)
+
+    def _subject_term_counts(self, subject: Subject) -> TermCounts:
+        """Counts the terms of a subject description.
+
+        :param subject: Subject to count terms of.
+        :return: Term counts of the subject description.
+        """
+        return self.get_model().term_counts(subject.describe())
 
     def _calc_scores(self, article: Article, subjects: List[Subject]) -> List[float]:
         """Computes scores by calculating tfidf weighted cosine similarity.
@@ -45,12 +212,14 @@ class ScoringService:
         :param subjects: List of subjects to score.
         :return: List of scores.
         """
+        if self.MODE != REFIT_MODE:
+            return self.score_batch([(article, subjects)])[0].tolist()
         tfidf_matrix = self._build_tfidf_matrix(article, subjects)
         no_subjects = len(subjects)
         subject_vectors = tfidf_matrix[0:no_subjects]
         article_vector = tfidf_matrix[no_subjects:no_subjects+1]
         similarities = cosine_similarity(subject_vectors, article_vector)
-        return [float(s) for s in similarities]
+        return [float(s) for s in similarities[:, 0]]
 
     def _build_tfidf_matrix(self, article: Article, subjects: List[Subject]) -> ScipyMatrix:
         """Builds a tfidf matrix based on the article, the subjects and the base corpus.
@@ -67,11 +236,14 @@ class ScoringService:
         return vectorizer.fit_transform(documents)
 
 
-class CorpusReader:
+class CorpusReader(CorpusSource):
     """Utility class for reading of text corpus used for ranking."""
 
     CATEGORIES = ['news', 'editorial']
 
+    def fingerprint(self) -> List[str]:
+        return self.CATEGORIES
+
     def read(self) -> List[str]:
         """Parses and formats text corpus.
 
@@ -107,6 +279,22 @@ class CorpusReader:
         return brown.fileids(categories=self.CATEGORIES)
 
 
+def new_corpus_source(spec: str) -> CorpusSource:
+    """Creates a corpus source from a specification.
+
+    :param spec: 'brown', 'file:<path>' or 'jsonl:<path>'.
+    :return: CorpusSource.
+    """
+    kind, _, path = spec.partition(':')
+    if kind == 'brown' and not path:
+        return CorpusReader()
+    if kind == 'file' and path:
+        return FileCorpusSource(path)
+    if kind == 'jsonl' and path:
+        return JsonlCorpusSource(path)
+    raise ValueError(f'Unknown corpus source: {spec}')
+
+
 def flatten_lists(base_list: List[List]) -> List:
     """Flattens a list of list to a list.
 
@@ -1,25 +1,132 @@
 # Standard library
+import asyncio
 import logging
+from concurrent.futures import Future
+from dataclasses import replace
 from datetime import datetime
+from typing import Any, Coroutine, List, Optional
 
 # 3rd party modules
 import newspaper
 
 # Internal modules
+from app.config import ScrapingConfig
 from app.models import ScrapeTarget, Article
+from .article_cache import ArticleCache
+from .fetchers import HtmlFetcher
+from .document_frequencies import DocumentFrequencyCounter
+from .keywords import KeywordExtractor
+from .metrics import time_stage
+from .scoring_model import CorpusModel, TermCounts
+
+
+KEYWORDS_OFF = 'off'
+KEYWORDS_NEWSPAPER = 'newspaper'
+KEYWORDS_TFIDF = 'tfidf'
+KEYWORD_MODES = [KEYWORDS_OFF, KEYWORDS_NEWSPAPER, KEYWORDS_TFIDF]
 
 
 class ScrapingService:
 
     _log = logging.getLogger('ScrapingService')
 
+    def __init__(self,
+                 fetcher: Optional[HtmlFetcher] = None,
+                 cache: Optional[ArticleCache] = None,
+                 keyword_mode: str = ScrapingConfig.KEYWORD_MODE,
+                 corpus_model: Optional[CorpusModel] = None,
+                 max_keywords: int = ScrapingConfig.MAX_KEYWORDS,
+                 scraped_frequencies: Optional[DocumentFrequencyCounter] = None) -> None:
+        if keyword_mode not in KEYWORD_MODES:
+            raise ValueError(f'Unknown keyword mode: {keyword_mode}')
+        if keyword_mode == KEYWORDS_TFIDF and corpus_model is None:
+            raise ValueError('Keyword mode tfidf requires a CorpusModel')
+        self._fetcher = fetcher
+        self._cache = cache
+        self.KEYWORD_MODE = keyword_mode
+        self._corpus_model = corpus_model
+        self._keyword_extractor = KeywordExtractor(corpus_model, max_keywords) \
+            if corpus_model is not None else None
+        self._scraped_frequencies = scraped_frequencies
+
+    def is_async(self) -> bool:
+        """Checks if articles can be scraped with get_article_async.
+
+        :return: Boolean indicating that an async fetcher is used.
+        """
+        return self._fetcher is not None
+
     def get_article(self, target: ScrapeTarget) -> Article:
         if target.is_scraped():
             return target.article()
+        if self._cache is None:
+            return self._scrape(target)
+        article = self._cache.get_or_fetch(
+            target.url, lambda: self._scrape(target))
+        return _article_for_target(article, target)
+
+    async def get_article_async(self, target: ScrapeTarget) -> Article:
+        """Downloads an article without blocking a thread and parses it
+        in the default executor of the event loop.
+
+        :param target: ScrapeTarget to scrape.
+        :return: Scraped article.
+        """
+        if target.is_scraped():
+            return target.article()
+        if self._cache is None:
+            return await self._scrape_async(target)
+        article = await self._cache.get_or_fetch_async(
+            target.url, lambda: self._scrape_async(target))
+        return _article_for_target(article, target)
+
+    def run_async(self, coroutine: Coroutine[Any, Any, Any]) -> Future:
+        """Schedules a coroutine on the event loop of the fetcher.
+
+        :param coroutine: Coroutine to run.
+        :return: Future of the coroutine result.
+        """
+        if self._fetcher is None:
+            raise RuntimeError('Async scraping requires an HtmlFetcher')
+        return self._fetcher.submit(coroutine)
+
+    def _scrape(self, target: ScrapeTarget) -> Article:
+        html = None
+        if self._fetcher is not None:
+            with time_stage('download'):
+                html = self._fetcher.fetch(target.url)
+        return self._parse_article(target, html)
+
+    async def _scrape_async(self, target: ScrapeTarget) -> Article:
+        if self._fetcher is None:
+            raise RuntimeError('Async scraping requires an HtmlFetcher')
+        with time_stage('download'):
+            html = await self._fetcher.fetch_async(target.url)
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None, self._parse_article, target, html)
+
+    def _parse_article(self, target: ScrapeTarget, html: Optional[str]) -> Article:
+        """Parses an article, downloading it first if no html is given.
+
+        :param target: ScrapeTarget to parse.
+        :param html: Downloaded html or None.
+        :return: Parsed article.
+        """
         article = newspaper.Article(target.url)
-        article.download()
-        article.parse()
-        article.nlp()
+        if html is None:
+            with time_stage('download'):
+                article.download()
+        else:
+            article.download(input_html=html)
+        with time_stage('parse'):
+            article.parse()
+            term_counts = self._corpus_model.term_counts(article.title, article.text) \
+                if self._corpus_model is not None else None
+        if term_counts and self._scraped_frequencies is not None:
+            self._scraped_frequencies.add(term_counts)
+        with time_stage('nlp'):
+            keywords = self._extract_keywords(article, term_counts)
 
         article_date = article.publish_date or datetime.utcnow()
         return Article(
@@ -27,5 +134,34 @@ class ScrapingService:
             url=target.url,
             title=article.title,
             body=article.text,
-            keywords=article.keywords,
-            date=article_date)
+            keywords=keywords,
+            date=article_date,
+            term_counts=term_counts)
+
+    def _extract_keywords(self,
+                          article: newspaper.Article,
+                          term_counts: Optional[TermCounts]) -> List[str]:
+        """Extracts keywords from a parsed article according to the keyword mode.
+
+        :param article: Parsed newspaper article.
+        :param term_counts: Term counts of the article title and text.
+        :return: List of keywords.
+        """
+        if self.KEYWORD_MODE == KEYWORDS_NEWSPAPER:
+            article.nlp()
+            return article.keywords
+        if self.KEYWORD_MODE == KEYWORDS_TFIDF and self._keyword_extractor:
+            return self._keyword_extractor.extract(term_counts or {})
+        return []
+
+
+def _article_for_target(article: Article, target: ScrapeTarget) -> Article:
+    """Assigns an article scraped or cached for another target to a target.
+
+    :param article: Scraped article.
+    :param target: ScrapeTarget the article was requested for.
+    :return: Article with the id and url of the target.
+    """
+    if article.id == target.article_id and article.url == target.url:
+        return article
+    return replace(article, id=target.article_id, url=target.url)
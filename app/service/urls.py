@@ -0,0 +1,47 @@
+# Standard library
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+TRACKING_PARAMS = frozenset([
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'mc_cid', 'mc_eid',
+    'igshid', 'ref', 'ref_src', 'cmpid', 'ncid', 'ocid', 'sr_share',
+    'amp', 'outputtype'
+])
+MOBILE_HOST_PREFIXES = ('m.', 'mobile.', 'amp.')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+AMP_PATH_PATTERN = re.compile(r'(/amp(?=/|$)|\.amp(?=$|\.html$))', re.IGNORECASE)
+
+
+def canonicalize_url(url: str) -> str:
+    """Reduces the variants of an article url to one canonical url.
+
+    Drops fragments, tracking query parameters, default ports and mobile
+    or AMP variants of the host and path. Remaining query parameters are
+    sorted since their order does not change the article.
+
+    :param url: Url to canonicalize.
+    :return: Canonical url.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    for prefix in MOBILE_HOST_PREFIXES:
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+            break
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+
+    path = AMP_PATH_PATTERN.sub('', parts.path)
+    if len(path) > 1:
+        path = path.rstrip('/')
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _is_tracking_param(key)))
+    return urlunsplit((scheme, host, path or '/', query, ''))
+
+
+def _is_tracking_param(key: str) -> bool:
+    key = key.lower()
+    return key.startswith('utm_') or key in TRACKING_PARAMS
@@ -1,6 +1,7 @@
 # Standard library
 import json
-from datetime import datetime
+import re
+from datetime import datetime, timezone
 from uuid import uuid4
 from typing import Optional
 
@@ -8,6 +9,11 @@ from typing import Optional
 from app.config import DATE_FORMAT
 
 
+# Matches dates in DATE_FORMAT, which the date functions below are fixed to.
+DATE_PATTERN = re.compile(
+    r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})Z', re.ASCII)
+
+
 def wrap_error_message(error: Exception, id: Optional[str] = None) -> str:
     """Wraps an exceptions error message into 
     a json formated string with a unique error id.
@@ -24,18 +30,29 @@ def wrap_error_message(error: Exception, id: Optional[str] = None) -> str:
 
 
 def date_to_str(date: datetime) -> str:
-    """Formats a date as a string.
+    """Formats a date as a string in UTC.
+
+    Naive dates are assumed to already be in UTC and
+    timezone aware dates are converted to UTC.
 
     :param date: Datetime to format.
     :return: String
     """
-    return date.strftime(DATE_FORMAT)
+    if date.utcoffset():
+        date = date.astimezone(timezone.utc)
+    return '%04d-%02d-%02dT%02d:%02d:%02dZ' % (
+        date.year, date.month, date.day, date.hour, date.minute, date.second)
 
 
 def str_to_date(date_str: str) -> datetime:
     """Parses the date value from a string.
 
     :param date_str: String representation of a date.
-    :return: Parsed datetime.
+    :return: Parsed naive datetime in UTC.
     """
-    return datetime.strptime(date_str, DATE_FORMAT)
+    match = DATE_PATTERN.fullmatch(date_str)
+    if match is None:
+        raise ValueError(
+            f"time data {date_str!r} does not match format '{DATE_FORMAT}'")
+    year, month, day, hour, minute, second = map(int, match.groups())
+    return datetime(year, month, day, hour, minute, second)
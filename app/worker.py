@@ -1,7 +1,9 @@
 # Standard library
+import asyncio
 import json
 import logging
 from concurrent.futures import ThreadPoolExecutor
+from typing import List
 from uuid import uuid4
 
 # 3rd party modules
@@ -9,9 +11,10 @@ from pika.channel import Channel
 from pika.spec import Basic as MQ
 
 # Internal modules
-from app.models import ScrapeTarget, ScrapedArticle
+from app.models import Article, ScrapeTarget, ScrapedArticle, Subject
 from app.service import MQClient, MessageHandler
-from app.service import ScrapingService, ScoringService
+from app.service import ScrapingService, ScoringBackend
+from app.service.metrics import count_exception, time_stage
 from app.util import wrap_error_message
 
 
@@ -21,7 +24,7 @@ class Worker(MessageHandler):
 
     def __init__(self,
                  scraper: ScrapingService,
-                 scorer: ScoringService,
+                 scorer: ScoringBackend,
                  mq_client: MQClient) -> None:
         self._scraper = scraper
         self._scorer = scorer
@@ -31,20 +34,58 @@ class Worker(MessageHandler):
                              target: ScrapeTarget,
                              channel: Channel,
                              mq_method: MQ.Deliver) -> None:
+        if self._scraper.is_async():
+            self._scraper.run_async(self._handle_scrape_target_async(
+                target, channel, mq_method))
+            return
         try:
             scraped_article = self._scrape_and_rank(target)
-            self._log.info(
-                f"Scraped and scored article id=[{scraped_article.article.id}]")
-            self._mq_client.send(scraped_article)
-            self._mq_client.ack(channel, mq_method)
+            self._send(scraped_article, channel, mq_method)
         except Exception as e:
+            count_exception(e)
             self._log.error(wrap_error_message(e))
-            self._mq_client.reject(channel, mq_method)
+            self._mq_client.fail(channel, mq_method, e)
+
+    async def _handle_scrape_target_async(self,
+                                          target: ScrapeTarget,
+                                          channel: Channel,
+                                          mq_method: MQ.Deliver) -> None:
+        """Scrapes without holding a thread while the article downloads and
+        scores in the default executor of the event loop.
+        """
+        try:
+            article = await self._scraper.get_article_async(target)
+            loop = asyncio.get_event_loop()
+            scores = await loop.run_in_executor(
+                None, self._score, article, target.subjects)
+            scraped_article = ScrapedArticle(
+                article=article,
+                subjects=target.subjects,
+                referer=target.referer,
+                scores=scores)
+            self._send(scraped_article, channel, mq_method)
+        except Exception as e:
+            count_exception(e)
+            self._log.error(wrap_error_message(e))
+            self._mq_client.fail(channel, mq_method, e)
+
+    def _send(self,
+              scraped_article: ScrapedArticle,
+              channel: Channel,
+              mq_method: MQ.Deliver) -> None:
+        self._log.info(
+            f"Scraped and scored article id=[{scraped_article.article.id}]")
+        self._mq_client.send(scraped_article, channel, mq_method)
+
+    def _score(self, article: Article, subjects: List[Subject]) -> List[float]:
+        with time_stage('score'):
+            return self._scorer.score(article, subjects)
 
     def _scrape_and_rank(self, target: ScrapeTarget) -> ScrapedArticle:
         article = self._scraper.get_article(target)
-        subjects = self._scorer.score(article, target.subjects)
+        scores = self._score(article, target.subjects)
         return ScrapedArticle(
             article=article,
-            subjects=subjects,
-            referer=target.referer)
+            subjects=target.subjects,
+            referer=target.referer,
+            scores=scores)
@@ -0,0 +1,37 @@
+"""Compares formatting and parsing of article dates with strftime and strptime.
+
+Usage: python -m benchmarks.dates [iterations]
+"""
+
+# Standard library
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Internal modules
+from app.config import DATE_FORMAT
+from app.util import date_to_str, str_to_date
+from benchmarks.serialization import compare
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    date = datetime(2018, 7, 1, 12, 30, 15)
+    aware_date = datetime(2018, 7, 1, 14, 30, 15, tzinfo=timezone(timedelta(hours=2)))
+    date_str = date_to_str(date)
+
+    compare('format',
+            lambda: date.strftime(DATE_FORMAT),
+            lambda: date_to_str(date),
+            iterations)
+    compare('format aware',
+            lambda: aware_date.astimezone(timezone.utc).strftime(DATE_FORMAT),
+            lambda: date_to_str(aware_date),
+            iterations)
+    compare('parse',
+            lambda: datetime.strptime(date_str, DATE_FORMAT),
+            lambda: str_to_date(date_str),
+            iterations)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Measures the time to parse an article with each keyword mode.
+
+Usage: python -m benchmarks.keyword_extraction [html file] [iterations]
+
+The newspaper mode needs the nltk punkt tokenizer, punkt_tab on nltk 3.9
+and later, and fails with a LookupError without it.
+"""
+
+# Standard library
+import sys
+import time
+from typing import Callable
+
+# Internal modules
+from app.models import ScrapeTarget, Referer
+from app.service import ScoringService, ScrapingService
+from app.service.scraping_service import KEYWORD_MODES
+
+
+def main() -> None:
+    filename = sys.argv[1] if len(sys.argv) > 1 else 'testdata/article.html'
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    with open(filename, 'r') as f:
+        html = f.read()
+    target = ScrapeTarget(
+        url='http://localhost/article',
+        subjects=[],
+        referer=Referer(id='r', external_id='e', follower_count=0, article_id='a'),
+        title=None,
+        body=None,
+        article_id='a')
+    model = ScoringService().get_model()
+
+    baseline = None
+    for mode in KEYWORD_MODES:
+        scraper = ScrapingService(keyword_mode=mode, corpus_model=model)
+        ms = measure(lambda: scraper._parse_article(target, html), iterations)
+        baseline = baseline or ms
+        print(f'{mode:>10}: {ms:8.2f} ms/article ({ms - baseline:+.2f} ms vs off)')
+
+
+def measure(func: Callable[[], object], iterations: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) * 1000 / iterations
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Compares memory use and construction time of scrape targets with many
+subjects between the slotted models and plain dataclasses with an instance
+__dict__, which is how the models used to be defined.
+
+Usage: python -m benchmarks.models [subjects] [iterations]
+"""
+
+# Standard library
+import sys
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple
+
+# Internal modules
+from app.models import Referer, ScrapeTarget, Subject
+
+
+@dataclass
+class PlainSubject:
+    id: str
+    symbol: str
+    name: str
+    score: float
+    article_id: str
+
+
+@dataclass(frozen=True)
+class PlainReferer:
+    id: str
+    external_id: str
+    follower_count: int
+    article_id: str
+
+
+@dataclass(frozen=True)
+class PlainScrapeTarget:
+    url: str
+    subjects: List[PlainSubject]
+    referer: PlainReferer
+    title: Optional[str]
+    body: Optional[str]
+    article_id: str
+
+
+def main() -> None:
+    no_subjects = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    # Field values are shared so that only the model objects are measured.
+    names = [(f's-{i}', f'S{i}', f'Subject {i}') for i in range(no_subjects)]
+
+    def new_target(target_type, subject_type, referer_type) -> Callable[[], Any]:
+        def create() -> Any:
+            return target_type(
+                url='https://example.com/a',
+                subjects=[subject_type(id=id, symbol=symbol, name=name,
+                                       score=0.0, article_id='a-id')
+                          for id, symbol, name in names],
+                referer=referer_type(id='r', external_id='e',
+                                     follower_count=100, article_id='a-id'),
+                title=None,
+                body=None,
+                article_id='a-id')
+        return create
+
+    plain = new_target(PlainScrapeTarget, PlainSubject, PlainReferer)
+    slotted = new_target(ScrapeTarget, Subject, Referer)
+    print(f'scrape target with {no_subjects} subjects')
+    (before, before_blocks), (after, after_blocks) = allocated(plain), allocated(slotted)
+    print(f'  memory: {before:10d} B  -> {after:10d} B  ({before / after:.2f}x)')
+    print(f'  blocks: {before_blocks:10d}    -> {after_blocks:10d}    '
+          f'({before_blocks / after_blocks:.2f}x)')
+    before = timeit.timeit(plain, number=iterations) / iterations * 1e6
+    after = timeit.timeit(slotted, number=iterations) / iterations * 1e6
+    print(f'  create: {before:10.1f} us -> {after:10.1f} us ({before / after:.2f}x)')
+
+
+def allocated(create: Callable[[], Any]) -> Tuple[int, int]:
+    """Measures the bytes and number of memory blocks held by a created object."""
+    create()
+    tracemalloc.start()
+    try:
+        target = create()
+        statistics = tracemalloc.take_snapshot().statistics('filename')
+    finally:
+        tracemalloc.stop()
+    del target
+    return (sum(stat.size for stat in statistics),
+            sum(stat.count for stat in statistics))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""Compares encoding and decoding of MQ messages with large article bodies.
+
+Usage: python -m benchmarks.serialization [iterations]
+"""
+
+# Standard library
+import json
+import sys
+import timeit
+from datetime import datetime
+
+# Internal modules
+from app.models import Article, Referer, ScrapedArticle, ScrapeTarget, Subject
+from app.serialization import decode_scrape_target, encode_scraped_article
+
+
+BODY_SIZES = [10 * 1024, 100 * 1024, 1024 * 1024]
+
+
+def main() -> None:
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with open('testdata/article_body.txt', 'r') as f:
+        text = f.read()
+    subjects = [Subject(id=f's-{i}', symbol=f'S{i}', name=f'Subject {i}',
+                        score=0.0, article_id='a-id') for i in range(10)]
+    referer = Referer(id='r', external_id='e', follower_count=100, article_id='a-id')
+    for size in BODY_SIZES:
+        body = (text * (size // len(text) + 1))[:size]
+        scraped = ScrapedArticle(
+            article=Article(id='a-id', url='https://example.com/a', title='Title',
+                            body=body, keywords=['a', 'b'], date=datetime.utcnow()),
+            subjects=subjects,
+            referer=referer,
+            scores=[i / 7 for i in range(len(subjects))])
+        message = json.dumps(ScrapeTarget(
+            url='https://example.com/a', subjects=subjects, referer=referer,
+            title='Title', body=body, article_id='a-id').asdict()).encode('utf-8')
+
+        print(f'body {size // 1024} KB')
+        compare('encode',
+                lambda: json.dumps(scraped.asdict()).encode('utf-8'),
+                lambda: encode_scraped_article(scraped),
+                iterations)
+        compare('decode',
+                lambda: ScrapeTarget.fromdict(json.loads(message)),
+                lambda: decode_scrape_target(message),
+                iterations)
+
+
+def compare(name: str, baseline, candidate, iterations: int) -> None:
+    before = timeit.timeit(baseline, number=iterations) / iterations * 1e6
+    after = timeit.timeit(candidate, number=iterations) / iterations * 1e6
+    print(f'  {name}: {before:10.1f} us -> {after:10.1f} us ({before / after:.2f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Prepares the corpus, stopwords and fitted corpus model used for scoring
+and writes them to a versioned artifact that workers load at startup.
+Requires the corpora from download_newspaper_corpora.py.
+"""
+import sys
+
+from app.config import ScoringConfig
+from app.service.scoring_model import CorpusModel, HashingCorpusModel
+from app.service.scoring_model import model_version, save_model
+from app.service.scoring_service import CorpusReader, new_corpus_source
+
+
+def main():
+    model_dir = sys.argv[1] if len(sys.argv) > 1 else ScoringConfig.MODEL_DIR
+    source = new_corpus_source(ScoringConfig.CORPUS)
+    corpus = source.read()
+    stopwords = CorpusReader().get_stopwords()
+    version = model_version(source.fingerprint(), stopwords)
+    model = CorpusModel.fit(corpus, stopwords, version)
+    hashing_model = HashingCorpusModel.fit(
+        corpus, stopwords, version, ScoringConfig.HASH_FEATURES)
+    save_model(model, corpus, model_dir, hashing_model)
+    print(('Wrote scoring model version "{0}" to {1}'.format(version, model_dir)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,95 @@
 # Standard library
 import logging
+import signal
+from typing import Optional
 
 # Internal modules
-from app import app
-from app import connection_factory
-from app.service import emit_heartbeats
+from app.config import MQConfig  # Import first to setup logging config.
+from app.config import HealthCheckConfig, MetricsConfig, ScoringConfig
+from app.config import ScrapingConfig
+from app.worker import Worker
+from app.service import ScrapingService, ScoringService, new_scoring_backend
+from app.service import AsyncHtmlFetcher, ArticleCache, sweep_periodically
+from app.service import DocumentFrequencyCounter, save_periodically
+from app.service import MQConsumer, MQClient, MQConnectionManager
+from app.service import DeliveryTracker
+from app.service import HealthMonitor, emit_heartbeats, serve_metrics
 
 
 log = logging.getLogger(__file__)
 
 
 def main() -> None:
+    scraped_frequencies = load_scraped_frequencies()
+    scoring_service = ScoringService(scraped_frequencies=scraped_frequencies)
+    scorer = new_scoring_backend(
+        scoring_service, ScoringConfig.WORKERS, ScoringConfig.BATCH_SIZE)
+    # Scoring processes are forked first, no threads may run before this.
+    save_scraped_frequencies(scraped_frequencies)
+    scraper = ScrapingService(
+        new_fetcher(),
+        new_article_cache(),
+        corpus_model=scoring_service.get_model(),
+        scraped_frequencies=scraped_frequencies)
+
+    config = MQConfig()
+    connection_manager = MQConnectionManager(config)
+    tracker = DeliveryTracker()
+    mq_client = MQClient(config, tracker=tracker)
+
+    worker = Worker(scraper, scorer, mq_client)
+    app = MQConsumer(config, None, worker, tracker, client=mq_client)
+    monitor = HealthMonitor(
+        HealthCheckConfig(), connection_manager, tracker, config.NUM_WORKERS)
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda signum, frame: connection_manager.stop())
     try:
-        emit_heartbeats(connection_factory)
-        app.start()
+        emit_heartbeats(connection_manager, monitor)
+        serve_metrics(MetricsConfig.PORT, health_check=monitor.check)
+        connection_manager.run(app, mq_client)
     except Exception as e:
         log.error(f'Application stopped: {str(e)}')
+    finally:
+        app.shutdown()
+        scorer.shutdown()
+
+
+def new_fetcher() -> Optional[AsyncHtmlFetcher]:
+    if not ScrapingConfig.ASYNC:
+        return None
+    return AsyncHtmlFetcher(
+        max_connections=ScrapingConfig.MAX_CONNECTIONS,
+        max_connections_per_host=ScrapingConfig.MAX_CONNECTIONS_PER_HOST,
+        keepalive_seconds=ScrapingConfig.KEEPALIVE_SECONDS,
+        timeout_seconds=ScrapingConfig.TIMEOUT_SECONDS)
+
+
+def new_article_cache() -> Optional[ArticleCache]:
+    if ScrapingConfig.CACHE_TTL_SECONDS <= 0:
+        return None
+    cache = ArticleCache(
+        ttl=ScrapingConfig.CACHE_TTL_SECONDS,
+        maxsize=ScrapingConfig.CACHE_SIZE,
+        directory=ScrapingConfig.CACHE_DIR or None)
+    sweep_periodically(cache, ScrapingConfig.CACHE_SWEEP_SECONDS)
+    return cache
+
+
+def load_scraped_frequencies() -> Optional[DocumentFrequencyCounter]:
+    path = ScoringConfig.DF_SNAPSHOT_FILE
+    if not path:
+        return None
+    return DocumentFrequencyCounter.load(
+        path,
+        max_terms=ScoringConfig.DF_MAX_TERMS,
+        max_term_length=ScoringConfig.DF_MAX_TERM_LENGTH)
+
+
+def save_scraped_frequencies(counter: Optional[DocumentFrequencyCounter]) -> None:
+    if counter is None:
+        return
+    save_periodically(
+        counter, ScoringConfig.DF_SNAPSHOT_FILE, ScoringConfig.DF_SNAPSHOT_INTERVAL)
 
 
 if __name__ == '__main__':
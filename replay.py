@@ -0,0 +1,224 @@
+# -*- coding: utf-8 -*-
+"""
+Replays scrape target messages from a JSONL file through the worker
+pipeline without RabbitMQ or the network, serving article html from a
+local fixture directory, and reports throughput, latency per stage and
+peak memory.
+
+Usage: python replay.py [targets.jsonl] [--html-dir DIR] [--repeat N]
+"""
+import argparse
+import itertools
+import os
+import resource
+import sys
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Deque, Dict, Iterator, List, Tuple
+
+import numpy as np
+from pika.channel import Channel
+from pika.spec import Basic as MQ
+
+from app.config import MQConfig, ScoringConfig
+from app.models import Article, ScrapeTarget, ScrapedArticle, Subject
+from app.serialization import decode_scrape_target, encode_scraped_article
+from app.service import FixtureHtmlFetcher, MQClient, ScoringBackend
+from app.service import ScoringService, ScrapingService, new_scoring_backend
+from app.worker import Worker
+
+
+STAGES = ['decode', 'scrape', 'score', 'encode', 'total']
+# Placeholders for the MQ settings that MQConfig requires, nothing connects.
+REPLAY_MQ_ENV = {
+    'MQ_EXCHANGE': 'x-replay',
+    'MQ_SCRAPE_QUEUE': 'q-replay-targets',
+    'MQ_SCRAPED_QUEUE': 'q-replay-articles',
+    'MQ_HOST': 'localhost',
+    'MQ_PORT': '5672',
+    'MQ_USER': 'replay',
+    'MQ_PASSWORD': 'replay'
+}
+
+
+class StageTimer:
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+
+    def record(self, stage: str, started_at: float) -> None:
+        with self._lock:
+            self.latencies[stage].append(time.perf_counter() - started_at)
+
+
+class TimedScrapingService(ScrapingService):
+
+    def __init__(self, timer: StageTimer, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self._timer = timer
+
+    def get_article(self, target: ScrapeTarget) -> Article:
+        started_at = time.perf_counter()
+        try:
+            return super().get_article(target)
+        finally:
+            self._timer.record('scrape', started_at)
+
+    async def get_article_async(self, target: ScrapeTarget) -> Article:
+        started_at = time.perf_counter()
+        try:
+            return await super().get_article_async(target)
+        finally:
+            self._timer.record('scrape', started_at)
+
+
+class TimedScoringBackend(ScoringBackend):
+
+    def __init__(self, timer: StageTimer, backend: ScoringBackend) -> None:
+        self._timer = timer
+        self._backend = backend
+
+    def score(self, article: Article, subjects: List[Subject]) -> List[float]:
+        started_at = time.perf_counter()
+        try:
+            return self._backend.score(article, subjects)
+        finally:
+            self._timer.record('score', started_at)
+
+    def shutdown(self) -> None:
+        self._backend.shutdown()
+
+
+class RecordingMQClient(MQClient):
+    """Encodes scraped articles like MQClient but hands them, or the error
+    a scrape target failed with, to the replay of the message instead of
+    publishing them.
+    """
+
+    def __init__(self, timer: StageTimer) -> None:
+        for name, value in REPLAY_MQ_ENV.items():
+            os.environ.setdefault(name, value)
+        config = MQConfig()
+        config.PUBLISHER_CONFIRMS = False
+        super().__init__(config)
+        self._timer = timer
+        self._lock = Lock()
+        self._tags = itertools.count(1)
+        self._replays: Dict[int, Future] = {}
+
+    def expect(self) -> Tuple[MQ.Deliver, Future]:
+        """Creates the delivery of a replayed message.
+
+        :return: Delivery and a future of the encoded article.
+        """
+        replayed: Future = Future()
+        with self._lock:
+            tag = next(self._tags)
+            self._replays[tag] = replayed
+        return MQ.Deliver(delivery_tag=tag), replayed
+
+    def send(self,
+             scraped_article: ScrapedArticle,
+             channel: Channel,
+             method: MQ.Deliver) -> None:
+        started_at = time.perf_counter()
+        body = encode_scraped_article(scraped_article)
+        self._timer.record('encode', started_at)
+        self._replayed(method).set_result(body)
+
+    def fail(self, channel: Channel, method: MQ.Deliver, error: Exception) -> None:
+        self._replayed(method).set_exception(error)
+
+    def _replayed(self, method: MQ.Deliver) -> Future:
+        with self._lock:
+            return self._replays.pop(method.delivery_tag)
+
+
+def read_messages(filename: str, repeat: int) -> Iterator[bytes]:
+    """Streams the lines of a JSONL file, repeating the file if asked to."""
+    for _ in range(repeat):
+        with open(filename, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield line
+
+
+def replay_message(worker: Worker,
+                   mq_client: RecordingMQClient,
+                   timer: StageTimer,
+                   body: bytes) -> None:
+    started_at = time.perf_counter()
+    target = decode_scrape_target(body)
+    timer.record('decode', started_at)
+    method, replayed = mq_client.expect()
+    worker.handle_scrape_target(target, None, method)
+    replayed.result()
+    timer.record('total', started_at)
+
+
+def wait_for(future: Future) -> int:
+    """Waits for a replayed message and returns 1 if it failed."""
+    try:
+        future.result()
+        return 0
+    except Exception as e:
+        print(f'Replay failed: {e}', file=sys.stderr)
+        return 1
+
+
+def report(timer: StageTimer, elapsed: float, errors: int) -> None:
+    messages = len(timer.latencies['total'])
+    print(f'messages:   {messages} ({errors} failed)')
+    print(f'throughput: {messages / elapsed:.1f} messages/s')
+    print(f'{"stage":>10} {"p50 ms":>10} {"p95 ms":>10} {"p99 ms":>10}')
+    for stage in STAGES:
+        if not timer.latencies[stage]:
+            continue
+        p50, p95, p99 = np.percentile(
+            np.array(timer.latencies[stage]) * 1000, [50, 95, 99])
+        print(f'{stage:>10} {p50:10.2f} {p95:10.2f} {p99:10.2f}')
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(f'peak rss:   {own / 1024:.1f} MB (children {children / 1024:.1f} MB)')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('targets', nargs='?', default='testdata/replay_targets.jsonl')
+    parser.add_argument('--html-dir', default='testdata')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    timer = StageTimer()
+    fetcher = FixtureHtmlFetcher(args.html_dir)
+    scoring_service = ScoringService()
+    scraper = TimedScrapingService(
+        timer, fetcher=fetcher, corpus_model=scoring_service.get_model())
+    scorer = TimedScoringBackend(
+        timer, new_scoring_backend(scoring_service, ScoringConfig.WORKERS))
+    mq_client = RecordingMQClient(timer)
+    worker = Worker(scraper, scorer, mq_client)
+
+    errors = 0
+    pending: Deque[Future] = deque()
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        for body in read_messages(args.targets, args.repeat):
+            pending.append(executor.submit(
+                replay_message, worker, mq_client, timer, body))
+            while pending and (pending[0].done() or len(pending) > 2 * args.workers):
+                errors += wait_for(pending.popleft())
+        while pending:
+            errors += wait_for(pending.popleft())
+    elapsed = time.perf_counter() - started_at
+    scorer.shutdown()
+    fetcher.close()
+    report(timer, elapsed, errors)
+
+
+if __name__ == '__main__':
+    main()
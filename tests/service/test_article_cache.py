@@ -0,0 +1,104 @@
+# Standard library
+import threading
+import time
+from datetime import datetime
+
+# 3rd party modules
+import pytest
+
+# Internal modules
+from app.models import Article
+from app.service.article_cache import ArticleCache
+
+
+def new_article(url: str) -> Article:
+    return Article(
+        id='a-id',
+        url=url,
+        title='Title',
+        body='Body',
+        keywords=['keyword'],
+        date=datetime(2018, 7, 1, 12, 0, 0))
+
+
+def test_article_cache_coalesces_fetches():
+    cache = ArticleCache(ttl=60, maxsize=10)
+    url = 'https://example.com/story'
+    started = threading.Event()
+    release = threading.Event()
+    fetches = []
+
+    def fetch() -> Article:
+        fetches.append(url)
+        started.set()
+        release.wait(5)
+        return new_article(url)
+
+    results = []
+    leader = threading.Thread(
+        target=lambda: results.append(cache.get_or_fetch(url, fetch)))
+    leader.start()
+    started.wait(5)
+    followers = [
+        threading.Thread(target=lambda: results.append(
+            cache.get_or_fetch(f'{url}?utm_source=feed', fetch)))
+        for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    time.sleep(0.05)
+    assert cache.in_flight() == 1
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert len(fetches) == 1
+    assert len(results) == 4
+    assert all(article.title == 'Title' for article in results)
+    assert cache.get('https://m.example.com/story#top') is not None
+    assert cache.in_flight() == 0
+
+
+def test_article_cache_propagates_errors():
+    cache = ArticleCache(ttl=60, maxsize=10)
+
+    def fail() -> Article:
+        raise ValueError('download failed')
+
+    with pytest.raises(ValueError):
+        cache.get_or_fetch('https://example.com/story', fail)
+    assert cache.get('https://example.com/story') is None
+    assert cache.in_flight() == 0
+
+
+def test_article_cache_local_store(tmpdir):
+    url = 'https://example.com/story'
+    cache = ArticleCache(ttl=60, maxsize=10, directory=str(tmpdir))
+    article = cache.get_or_fetch(url, lambda: new_article(url))
+
+    restarted = ArticleCache(ttl=60, maxsize=10, directory=str(tmpdir))
+    cached = restarted.get_or_fetch(url, lambda: pytest.fail('Not cached'))
+    assert cached == article
+
+    expired = ArticleCache(ttl=-1, maxsize=10, directory=str(tmpdir))
+    assert expired.get(url) is None
+    assert len(tmpdir.listdir()) == 0
+
+
+def test_article_cache_sweeps_expired_articles(tmpdir):
+    cache = ArticleCache(ttl=60, maxsize=10, directory=str(tmpdir))
+    for i in range(3):
+        url = f'https://example.com/story-{i}'
+        cache.get_or_fetch(url, lambda: new_article(url))
+    tmpdir.join('left-over.json.1.tmp').write('{')
+    stale = tmpdir.listdir()[:2]
+    for path in stale:
+        path.setmtime(time.time() - 120)
+
+    assert cache.sweep() == 2
+    assert len(tmpdir.listdir()) == 2
+    assert all(not path.exists() for path in stale)
+
+    for path in tmpdir.listdir():
+        path.setmtime(time.time() - 120)
+    ArticleCache(ttl=60, maxsize=10, directory=str(tmpdir))
+    assert len(tmpdir.listdir()) == 0
@@ -0,0 +1,20 @@
+# Internal modules
+from app.service.cache import TTLCache
+
+
+def test_ttl_cache():
+    now = [0.0]
+    cache = TTLCache(2, ttl=10, clock=lambda: now[0])
+    assert cache.get('a') is None
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert len(cache) == 2
+
+    now[0] = 10.0
+    assert cache.get('a') is None
+    assert cache.get('c') is None
+    assert cache.hits == 1
+    assert cache.misses == 4
@@ -0,0 +1,52 @@
+# Standard library
+import json
+
+# 3rd party modules
+import pytest
+
+# Internal modules
+from app.service.corpus import FileCorpusSource, JsonlCorpusSource
+from app.service.scoring_service import CorpusReader, new_corpus_source
+
+
+def test_file_corpus_source(tmp_path):
+    corpus_file = tmp_path / 'corpus.txt'
+    corpus_file.write_text('First document\n\n  Second document  \n')
+    source = FileCorpusSource(str(corpus_file))
+    assert source.read() == ['First document', 'Second document']
+    fingerprint = source.fingerprint()
+    assert len(fingerprint) == 1
+
+    corpus_file.write_text('First document\nSecond document\nThird document\n')
+    assert source.fingerprint() != fingerprint
+
+    corpus_dir = tmp_path / 'documents'
+    corpus_dir.mkdir()
+    (corpus_dir / 'b.txt').write_text('Second\ndocument')
+    (corpus_dir / 'a.txt').write_text('First document')
+    assert FileCorpusSource(str(corpus_dir)).read() == \
+        ['First document', 'Second document']
+
+
+def test_jsonl_corpus_source(tmp_path):
+    corpus_file = tmp_path / 'articles.jsonl'
+    lines = [
+        json.dumps({'title': 'Apple news', 'body': 'Apple released a phone'}),
+        '',
+        json.dumps({'title': 'No body', 'body': None}),
+        json.dumps({'title': '', 'body': ''})
+    ]
+    corpus_file.write_text('\n'.join(lines))
+    source = JsonlCorpusSource(str(corpus_file))
+    assert source.read() == ['Apple news Apple released a phone', 'No body']
+    assert JsonlCorpusSource(str(corpus_file), fields=['body']).read() == \
+        ['Apple released a phone']
+
+
+def test_new_corpus_source():
+    assert isinstance(new_corpus_source('brown'), CorpusReader)
+    assert isinstance(new_corpus_source('file:/tmp/corpus.txt'), FileCorpusSource)
+    assert isinstance(new_corpus_source('jsonl:/tmp/a.jsonl'), JsonlCorpusSource)
+    for spec in ['', 'file:', 'brown:news', 'web:http://example.com']:
+        with pytest.raises(ValueError):
+            new_corpus_source(spec)
@@ -0,0 +1,121 @@
+# Standard library
+from datetime import datetime
+
+# 3rd party modules
+import numpy as np
+
+# Internal modules
+from app.models import Article, Subject
+from app.service import ScoringService
+from app.service.corpus import FileCorpusSource
+from app.service.document_frequencies import DocumentFrequencyCounter
+from app.service.scoring_model import CorpusModel, load_model, save_model
+from app.service.scoring_service import PRECOMPUTED_MODE
+
+
+CORPUS = [
+    'Apple reports record revenue for the quarter',
+    'Shares of Alphabet fell after the report',
+    'The central bank kept rates unchanged'
+]
+SCRAPED = [
+    'Apple is building a social network',
+    'Facebook shares fell after the report on social network growth'
+]
+STOPWORDS = ['the', 'of', 'for', 'after', 'is', 'a', 'on']
+
+
+def test_document_frequency_counter(tmp_path):
+    counter = DocumentFrequencyCounter()
+    counter.add(['apple', 'apple', 'shares'])
+    counter.add(['apple'])
+    assert counter.snapshot() == ({'apple': 2, 'shares': 1}, 2)
+
+    path = str(tmp_path / 'frequencies.json')
+    counter.save(path)
+    loaded = DocumentFrequencyCounter.load(path)
+    assert loaded.snapshot() == counter.snapshot()
+    assert DocumentFrequencyCounter.load(str(tmp_path / 'missing')).no_documents == 0
+
+    loaded.update(counter)
+    assert loaded.snapshot() == ({'apple': 4, 'shares': 2}, 4)
+
+
+def test_bounded_document_frequency_counter(tmp_path):
+    counter = DocumentFrequencyCounter(max_terms=2, max_term_length=6)
+    counter.add(['apple', 'shares', 'x' * 1000])
+    counter.add(['apple', 'shares', 'report'])
+    counter.add(['apple', 'network'])
+    counter.add(['apple', 'fell', 'growth'])
+    frequencies, no_documents = counter.snapshot()
+    assert no_documents == 4
+    assert 'x' * 1000 not in frequencies
+    assert len(frequencies) <= 4
+    assert frequencies['apple'] == 4
+
+    path = str(tmp_path / 'frequencies.json')
+    counter.save(path)
+    assert counter.snapshot() == ({'apple': 4, 'shares': 2}, 4)
+    loaded = DocumentFrequencyCounter.load(path, max_terms=1)
+    assert loaded.snapshot() == ({'apple': 4}, 4)
+
+
+def test_incremental_frequencies_match_refit():
+    base = CorpusModel.fit(CORPUS, STOPWORDS, 'v1')
+    scraped = DocumentFrequencyCounter()
+    for document in SCRAPED:
+        scraped.add(base.term_counts(document))
+
+    counter = base.document_frequency_counter()
+    counter.update(scraped)
+    updated = CorpusModel.from_counter(counter, STOPWORDS, 'v1')
+    refitted = CorpusModel.fit(CORPUS + SCRAPED, STOPWORDS, 'v1')
+    assert list(updated.TERMS) == list(refitted.TERMS)
+    assert list(updated.DOCUMENT_FREQUENCIES) == list(refitted.DOCUMENT_FREQUENCIES)
+    assert updated.NO_DOCUMENTS == refitted.NO_DOCUMENTS
+
+
+def test_frequencies_added_to_loaded_model_stay_shared(tmp_path):
+    model_dir = str(tmp_path / 'model')
+    save_model(CorpusModel.fit(CORPUS, STOPWORDS, 'v1'), CORPUS, model_dir)
+    base = load_model(model_dir, 'v1')
+    scraped = DocumentFrequencyCounter()
+    for document in SCRAPED:
+        scraped.add(base.term_counts(document))
+
+    updated = base.with_frequencies(scraped)
+    refitted = CorpusModel.fit(CORPUS + SCRAPED, STOPWORDS, 'v1')
+    assert isinstance(updated.TERMS, np.memmap)
+    assert isinstance(updated.DOCUMENT_FREQUENCIES, np.memmap)
+    assert updated.NO_DOCUMENTS == refitted.NO_DOCUMENTS
+    terms = list(refitted.TERMS) + ['unknown']
+    assert list(updated.corpus_frequencies(terms)) == \
+        list(refitted.corpus_frequencies(terms))
+    assert updated.document_frequency_counter().snapshot() == \
+        refitted.document_frequency_counter().snapshot()
+
+
+def test_scoring_service_with_scraped_frequencies(tmp_path):
+    corpus_file = tmp_path / 'corpus.txt'
+    corpus_file.write_text('\n'.join(CORPUS))
+    corpus = FileCorpusSource(str(corpus_file))
+    model_dir = str(tmp_path / 'model')
+
+    scraped = DocumentFrequencyCounter()
+    base_scorer = ScoringService(
+        mode=PRECOMPUTED_MODE, model_dir=model_dir, corpus=corpus)
+    for document in SCRAPED:
+        scraped.add(base_scorer.get_model().term_counts(document))
+    scorer = ScoringService(mode=PRECOMPUTED_MODE, model_dir=model_dir,
+                            corpus=corpus, scraped_frequencies=scraped)
+    model = scorer.get_model()
+    assert model.NO_DOCUMENTS == len(CORPUS) + len(SCRAPED)
+    assert list(model.corpus_frequencies(['social', 'report', 'unknown'])) == \
+        [2, 2, 0]
+
+    article = Article(id='a-id', url='a-url', title='Social network',
+                      body='Apple builds a social network', keywords=[],
+                      date=datetime.utcnow())
+    subjects = [Subject(id='s-id', symbol='AAPL', name='Apple',
+                        score=0.0, article_id='a-id')]
+    assert 0 < scorer.score(article, subjects)[0] < 1
@@ -0,0 +1,65 @@
+# Standard library
+import asyncio
+import socket
+
+# 3rd party modules
+import aiohttp
+import pika
+from newspaper.article import ArticleException
+
+# Internal modules
+from app.serialization import DecodeError
+from app.service.failures import PARSE_ERROR, PERMANENT, TRANSIENT
+from app.service.failures import attempt_of, classify_failure, failure_properties
+
+
+def new_response_error(status: int) -> aiohttp.ClientResponseError:
+    return aiohttp.ClientResponseError(None, (), status=status)
+
+
+def test_classify_failure():
+    assert classify_failure(asyncio.TimeoutError()) == TRANSIENT
+    assert classify_failure(socket.gaierror(-2, 'Name or service not known')) == TRANSIENT
+    assert classify_failure(ConnectionRefusedError()) == TRANSIENT
+    assert classify_failure(aiohttp.ServerDisconnectedError()) == TRANSIENT
+    assert classify_failure(new_response_error(503)) == TRANSIENT
+    assert classify_failure(new_response_error(429)) == TRANSIENT
+    assert classify_failure(new_response_error(404)) == PERMANENT
+    assert classify_failure(new_response_error(410)) == PERMANENT
+    assert classify_failure(ArticleException(
+        'Article `download()` failed with 404 Client Error: Not Found for url: '
+        'https://example.com/a on URL https://example.com/a')) == PERMANENT
+    assert classify_failure(ArticleException(
+        'Article `download()` failed with 502 Server Error: Bad Gateway for url: '
+        'https://example.com/a on URL https://example.com/a')) == TRANSIENT
+    assert classify_failure(ArticleException(
+        'Article `download()` failed with HTTPSConnectionPool(host=\'example.com\', '
+        'port=443): Read timed out. (read timeout=7) on URL https://example.com/a')) == TRANSIENT
+    assert classify_failure(ArticleException(
+        'Article `download()` failed with HTTPConnectionPool(host=\'example.com\', '
+        'port=80): Max retries exceeded with url: /a on URL http://example.com/a')) == TRANSIENT
+    assert classify_failure(DecodeError('Expecting value')) == PARSE_ERROR
+
+
+def test_classify_unexpected_failures_as_permanent():
+    assert classify_failure(ValueError('array must not contain infs or NaNs')) == PERMANENT
+    assert classify_failure(KeyError('title')) == PERMANENT
+    assert classify_failure(RuntimeError('bug')) == PERMANENT
+    assert classify_failure(ArticleException(
+        'You must `download()` an article first!')) == PERMANENT
+    assert classify_failure(ArticleException(
+        'Article `download()` failed with Exceeded 30 redirects. '
+        'on URL https://example.com/a')) == PERMANENT
+
+
+def test_attempt_of():
+    assert attempt_of(None) == 0
+    assert attempt_of(pika.BasicProperties()) == 0
+    assert attempt_of(pika.BasicProperties(headers={'x-attempt': 2})) == 2
+    assert attempt_of(pika.BasicProperties(headers={'x-attempt': 'two'})) == 0
+
+    properties = failure_properties(TRANSIENT, 'x' * 1000, 3)
+    assert properties.delivery_mode == 2
+    assert attempt_of(properties) == 3
+    assert properties.headers['x-failure'] == TRANSIENT
+    assert len(properties.headers['x-error']) == 500
@@ -0,0 +1,79 @@
+# Standard library
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+# 3rd party modules
+import numpy as np
+import pytest
+
+# Internal modules
+from app.models import Article, Subject
+from app.service import ScoringService
+from app.service.scoring_service import HASHING_MODE, PRECOMPUTED_MODE
+from app.service.scoring_model import CorpusModel, HashingCorpusModel
+
+
+STOPWORDS = ['the', 'and', 'for', 'of', 'in', 'its', 'as', 'on', 'by', 'a']
+
+
+def read_fixtures() -> Dict[str, Any]:
+    with open('./testdata/scoring_fixtures.json', 'r') as f:
+        return json.load(f)
+
+
+def score_fixtures(model: CorpusModel,
+                   articles: List[Dict[str, Any]]) -> List[np.ndarray]:
+    scores = []
+    for article in articles:
+        documents = [f'{symbol} {name}' for symbol, name in article['subjects']]
+        documents.append(f"{article['title']} {article['body']}")
+        matrix = model.tfidf_matrix(documents)
+        scores.append((matrix[:-1] @ matrix[-1].T).toarray().ravel())
+    return scores
+
+
+def test_hashing_model_accuracy():
+    fixtures = read_fixtures()
+    exact_model = CorpusModel.fit(fixtures['corpus'], STOPWORDS, 'v1')
+    exact = score_fixtures(exact_model, fixtures['articles'])
+
+    hashed_model = HashingCorpusModel.fit(
+        fixtures['corpus'], STOPWORDS, 'v1', no_features=2 ** 18)
+    hashed = score_fixtures(hashed_model, fixtures['articles'])
+    for exact_scores, hashed_scores in zip(exact, hashed):
+        assert hashed_scores == pytest.approx(exact_scores, abs=1e-9)
+
+    small_model = HashingCorpusModel.fit(
+        fixtures['corpus'], STOPWORDS, 'v1', no_features=2 ** 10)
+    assert small_model.DOCUMENT_FREQUENCIES.shape == (2 ** 10,)
+    small = score_fixtures(small_model, fixtures['articles'])
+    errors = np.concatenate([s - e for s, e in zip(small, exact)])
+    assert 0 < np.abs(errors).mean() < 0.02
+
+
+def test_hashing_model_corpus_frequencies():
+    fixtures = read_fixtures()
+    exact_model = CorpusModel.fit(fixtures['corpus'], STOPWORDS, 'v1')
+    hashed_model = HashingCorpusModel.fit(fixtures['corpus'], STOPWORDS, 'v1')
+    terms = ['apple', 'reported', 'millions', 'unknown']
+    assert list(hashed_model.corpus_frequencies(terms)) == \
+        list(exact_model.corpus_frequencies(terms))
+    assert len(hashed_model.corpus_frequencies([])) == 0
+
+
+def test_hashing_scoring_service():
+    fixtures = read_fixtures()
+    pairs: List[Tuple[Article, List[Subject]]] = []
+    for i, raw in enumerate(fixtures['articles']):
+        article = Article(id=f'a-{i}', url='a-url', title=raw['title'],
+                          body=raw['body'], keywords=[], date=datetime.utcnow())
+        subjects = [Subject(id=f's-{i}-{j}', symbol=symbol, name=name,
+                            score=0.0, article_id=article.id)
+                    for j, (symbol, name) in enumerate(raw['subjects'])]
+        pairs.append((article, subjects))
+
+    exact = ScoringService(mode=PRECOMPUTED_MODE).score_batch(pairs)
+    hashed = ScoringService(mode=HASHING_MODE).score_batch(pairs)
+    for exact_scores, hashed_scores in zip(exact, hashed):
+        assert hashed_scores == pytest.approx(exact_scores, abs=1e-9)
@@ -0,0 +1,101 @@
+# Standard library
+import json
+import os
+from typing import Optional
+
+# Internal modules
+from app.config import HealthCheckConfig
+from app.service import DeliveryTracker, HealthMonitor
+from app.service.heartbeat import emit_heartbeat
+from app.service.mq_clients import MQConnectionChecker
+
+
+class FakeChecker(MQConnectionChecker):
+
+    def __init__(self) -> None:
+        self.alive_at: Optional[float] = None
+        self.connected = True
+        self.stopping = False
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    def is_stopping(self) -> bool:
+        return self.stopping
+
+    def ping(self) -> None:
+        pass
+
+    def last_alive_at(self) -> Optional[float]:
+        return self.alive_at
+
+
+class FakeClock:
+
+    def __init__(self, now: float) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def new_monitor(checker: FakeChecker, tracker: DeliveryTracker, clock: FakeClock) -> HealthMonitor:
+    config = HealthCheckConfig()
+    config.LIVENESS_SECONDS = 60
+    config.STALL_SECONDS = 300
+    return HealthMonitor(config, checker, tracker, workers=2, clock=clock)
+
+
+def test_health_monitor():
+    checker = FakeChecker()
+    tracker = DeliveryTracker()
+    clock = FakeClock(tracker.last_settled_at())
+    monitor = new_monitor(checker, tracker, clock)
+
+    status = monitor.check()
+    assert not status['live'] and not status['ready']
+    assert status['problems'] == ['connection thread is not responding']
+    assert status['loopSecondsAgo'] is None
+    assert status['lastDeliverySecondsAgo'] is None
+
+    checker.alive_at = clock.now
+    for delivery_tag in [1, 2, 3]:
+        tracker.delivered(None, delivery_tag)
+    tracker.started(None, 1)
+    tracker.started(None, 2)
+    clock.now += 10
+    status = monitor.check()
+    assert status['live'] and status['ready']
+    assert status['problems'] == []
+    assert status['loopSecondsAgo'] == 10
+    assert (status['inFlight'], status['busyWorkers'], status['queued']) == (3, 2, 1)
+    assert json.loads(json.dumps(status)) == status
+
+    checker.alive_at = clock.now
+    clock.now += 301
+    status = monitor.check()
+    assert not status['live']
+    assert status['problems'] == ['connection thread is not responding',
+                                  'all workers are stuck']
+
+    tracker.settled(None, 1)
+    clock.now = tracker.last_settled_at()
+    checker.alive_at = clock.now
+    checker.connected = False
+    checker.stopping = True
+    status = monitor.check()
+    assert status['live'] and not status['ready']
+    assert status['problems'] == ['not connected to MQ', 'shutting down']
+    assert status['busyWorkers'] == 1
+
+
+def test_emit_heartbeat_only_when_live(tmpdir):
+    filename = str(tmpdir.join('health.txt'))
+    emit_heartbeat(filename, {'live': False, 'ready': False, 'problems': ['stuck']})
+    assert not os.path.exists(filename)
+
+    status = {'live': True, 'ready': True, 'problems': []}
+    emit_heartbeat(filename, status)
+    with open(filename) as f:
+        assert json.load(f) == status
+    assert os.listdir(str(tmpdir)) == ['health.txt']
@@ -0,0 +1,22 @@
+# Internal modules
+from app.service.keywords import KeywordExtractor
+from app.service.scoring_model import CorpusModel
+
+
+CORPUS = [
+    'Apple reports record revenue for the quarter',
+    'Shares of Apple fell after the report',
+    'Apple and the central bank kept rates unchanged'
+]
+STOPWORDS = ['the', 'of', 'for', 'after', 'and', 'is']
+
+
+def test_keyword_extractor():
+    model = CorpusModel.fit(CORPUS, STOPWORDS, 'v1')
+    extractor = KeywordExtractor(model, max_keywords=3)
+
+    keywords = extractor.extract(model.term_counts(
+        'Apple is building a social network',
+        'Apple is building a social network for music. The network is social.'))
+    assert keywords == ['network', 'social', 'building']
+    assert extractor.extract(model.term_counts('The', 'of the')) == []
@@ -0,0 +1,128 @@
+# Standard library
+import json
+import time
+from urllib.request import urlopen
+
+# 3rd party modules
+import pytest
+from urllib.error import HTTPError
+
+# Internal modules
+from app.service.metrics import Counter, Gauge, Histogram, LabeledGauge
+from app.service.metrics import Registry
+from app.service.metrics import MetricsHandler, serve_metrics
+
+
+def test_histogram():
+    histogram = Histogram('stage_seconds', 'Stage time.', labels=['stage'],
+                          buckets=[0.1, 1.0])
+    histogram.observe(0.05, 'parse')
+    histogram.observe(0.1, 'parse')
+    histogram.observe(5.0, 'parse')
+    with histogram.time('score'):
+        time.sleep(0.001)
+    assert histogram.count('parse') == 3
+    assert histogram.count('score') == 1
+    assert histogram.count('missing') == 0
+    assert histogram.means()[('parse',)] == pytest.approx(5.15 / 3)
+
+    lines = histogram.render()
+    assert lines[:2] == ['# HELP stage_seconds Stage time.',
+                         '# TYPE stage_seconds histogram']
+    assert lines[2:7] == [
+        'stage_seconds_bucket{stage="parse",le="0.1"} 2',
+        'stage_seconds_bucket{stage="parse",le="1"} 2',
+        'stage_seconds_bucket{stage="parse",le="+Inf"} 3',
+        'stage_seconds_sum{stage="parse"} 5.15',
+        'stage_seconds_count{stage="parse"} 3'
+    ]
+
+
+def test_counter_and_gauge():
+    counter = Counter('errors_total', 'Errors.', labels=['type'])
+    counter.inc('ValueError')
+    counter.inc('ValueError')
+    counter.inc('Key"Error')
+    assert counter.value('ValueError') == 2
+    assert counter.render()[2:] == [
+        'errors_total{type="Key\\"Error"} 1',
+        'errors_total{type="ValueError"} 2'
+    ]
+
+    gauge = Gauge('queued', 'Queued.', lambda: 7)
+    assert gauge.render()[2:] == ['queued 7']
+    broken = Gauge('broken', 'Broken.', lambda: 1 / 0)
+    assert broken.render()[2:] == []
+
+    by_domain = LabeledGauge('queued_by_domain', 'Queued.', ['domain'],
+                             lambda: {('b.com',): 2, ('a.com',): 1})
+    assert by_domain.render()[2:] == [
+        'queued_by_domain{domain="a.com"} 1',
+        'queued_by_domain{domain="b.com"} 2'
+    ]
+
+
+def test_metrics_endpoint():
+    registry = Registry()
+    registry.register(Counter('requests_total', 'Requests.')).inc()
+
+    class Handler(MetricsHandler):
+        pass
+
+    Handler.registry = registry
+    server = serve_metrics(0, host='127.0.0.1')
+    server.RequestHandlerClass = Handler
+    try:
+        url = f'http://127.0.0.1:{server.server_port}'
+        with urlopen(f'{url}/metrics') as response:
+            body = response.read().decode('utf-8')
+        assert 'requests_total 1\n' in body
+        with pytest.raises(HTTPError):
+            urlopen(f'{url}/other')
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_disabled_metrics(monkeypatch):
+    registry = Registry()
+    counter = registry.register(Counter('requests_total', 'Requests.'))
+    histogram = registry.register(Histogram('duration_seconds', 'Duration.'))
+    monkeypatch.setattr(MetricsHandler, 'registry', registry)
+    assert serve_metrics(-1) is None
+
+    counter.inc()
+    histogram.observe(0.1)
+    with histogram.time():
+        pass
+    late = registry.register(Counter('late_total', 'Late.'))
+    late.inc()
+    assert counter.value() == 0
+    assert histogram.count() == 0
+    assert late.value() == 0
+
+
+def test_health_endpoints():
+    status = {'live': True, 'ready': False, 'problems': ['shutting down']}
+    server = serve_metrics(0, host='127.0.0.1', health_check=lambda: status)
+    try:
+        url = f'http://127.0.0.1:{server.server_port}'
+        with urlopen(f'{url}/healthz') as response:
+            assert response.status == 200
+            assert json.loads(response.read()) == status
+        with pytest.raises(HTTPError) as error:
+            urlopen(f'{url}/readyz')
+        assert error.value.code == 503
+        assert json.loads(error.value.read()) == status
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    server = serve_metrics(0, host='127.0.0.1')
+    try:
+        with pytest.raises(HTTPError) as error:
+            urlopen(f'http://127.0.0.1:{server.server_port}/healthz')
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
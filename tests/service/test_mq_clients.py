@@ -0,0 +1,322 @@
+# Standard library
+import threading
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+# 3rd party modules
+import pika
+import pytest
+from newspaper.article import ArticleException
+from pika.frame import Method
+from pika.spec import Basic as MQ
+
+# Internal modules
+from app.config import MQConfig
+from app.models import Article, Referer, ScrapedArticle
+from app.service import MQClient, MQConsumer, DeliveryTracker
+from app.service.failures import ATTEMPT_HEADER, FAILURE_HEADER
+from app.service.mq_clients import FlowController, PrefetchController
+from app.service.scheduler import DomainScheduler
+
+
+class FakeDelivery:
+
+    def __init__(self, delivery_tag: int) -> None:
+        self.delivery_tag = delivery_tag
+
+
+class FakeChannel:
+
+    def __init__(self, owner: threading.Thread) -> None:
+        self.owner = owner
+        self.calls: List[Tuple[str, Any]] = []
+        self.on_confirm: Optional[Callable[[Method], None]] = None
+        self.properties: List[Any] = []
+        self.declared: List[str] = []
+
+    def queue_declare(self, queue: str, durable: bool, arguments: Any = None) -> None:
+        assert threading.current_thread() is self.owner
+        self.declared.append(queue)
+
+    def basic_publish(self, exchange: str, routing_key: str, body: str,
+                      properties: Any = None) -> None:
+        self._record('publish', routing_key)
+        self.properties.append(properties)
+
+    def basic_ack(self, delivery_tag: int) -> None:
+        self._record('ack', delivery_tag)
+
+    def basic_reject(self, delivery_tag: int, requeue: bool) -> None:
+        self._record('requeue' if requeue else 'reject', delivery_tag)
+
+    def confirm_delivery(self, callback: Callable[[Method], None]) -> None:
+        self.on_confirm = callback
+
+    def confirm(self, confirm: Any) -> None:
+        self.on_confirm(Method(1, confirm))
+
+    def _record(self, name: str, arg: Any) -> None:
+        assert threading.current_thread() is self.owner
+        self.calls.append((name, arg))
+
+
+class FakeConnection:
+
+    def __init__(self) -> None:
+        self.callbacks: List[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def add_callback_threadsafe(self, callback: Callable[[], None]) -> None:
+        with self._lock:
+            self.callbacks.append(callback)
+
+    def process_callbacks(self) -> int:
+        with self._lock:
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+        return len(callbacks)
+
+
+def test_mq_client_operations_run_in_connection_thread():
+    config = MQConfig()
+    config.PUBLISHER_CONFIRMS = False
+    channel = FakeChannel(owner=threading.current_thread())
+    connection = FakeConnection()
+    client = MQClient(config, channel, connection)
+
+    def handle(tag: int) -> None:
+        if tag % 2 == 0:
+            client.send(new_scraped_article(str(tag)), channel, FakeDelivery(tag))
+        else:
+            client.reject(channel, FakeDelivery(tag))
+
+    threads = [threading.Thread(target=handle, args=(tag,))
+               for tag in range(50)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert channel.calls == []
+    assert 1 <= connection.process_callbacks() <= 50
+    assert connection.process_callbacks() <= 1
+
+    acked = [arg for name, arg in channel.calls if name == 'ack']
+    rejected = [arg for name, arg in channel.calls if name == 'reject']
+    published = [i for i, (name, _) in enumerate(channel.calls)
+                 if name == 'publish']
+    assert sorted(acked) == list(range(0, 50, 2))
+    assert sorted(rejected) == list(range(1, 50, 2))
+    assert len(published) == 25
+    for tag in acked:
+        ack_index = channel.calls.index(('ack', tag))
+        assert any(i < ack_index for i in published)
+
+
+def test_mq_client_without_connection_runs_directly():
+    config = MQConfig()
+    channel = FakeChannel(owner=threading.current_thread())
+    client = MQClient(config, channel)
+    client.send(new_scraped_article('a-id'), channel, FakeDelivery(1))
+    assert channel.calls == [
+        ('publish', config.SCRAPED_QUEUE),
+        ('ack', 1)
+    ]
+
+
+def test_mq_client_acks_once_publish_is_confirmed():
+    config = MQConfig()
+    channel = FakeChannel(owner=threading.current_thread())
+    connection = FakeConnection()
+    tracker = DeliveryTracker()
+    client = MQClient(config, channel, connection, tracker)
+    assert channel.on_confirm is not None
+
+    for tag in range(10, 15):
+        tracker.delivered(channel, tag)
+        client.send(new_scraped_article(str(tag)), channel, FakeDelivery(tag))
+    connection.process_callbacks()
+    assert [name for name, _ in channel.calls] == ['publish'] * 5
+    assert client.unconfirmed() == 5
+
+    channel.confirm(MQ.Ack(delivery_tag=3, multiple=True))
+    channel.confirm(MQ.Nack(delivery_tag=4, multiple=False))
+    assert client.unconfirmed() == 1
+    connection.process_callbacks()
+    assert channel.calls[5:] == [
+        ('ack', 10), ('ack', 11), ('ack', 12), ('requeue', 13)]
+    assert tracker.in_flight() == 1
+
+    channel.confirm(MQ.Ack(delivery_tag=5, multiple=False))
+    channel.confirm(MQ.Ack(delivery_tag=5, multiple=True))
+    connection.process_callbacks()
+    assert channel.calls[9:] == [('ack', 14)]
+    assert client.unconfirmed() == 0
+    assert tracker.in_flight() == 0
+
+
+def test_delivery_tracker_settles_through_mq_client():
+    config = MQConfig()
+    channel = FakeChannel(owner=threading.current_thread())
+    connection = FakeConnection()
+    tracker = DeliveryTracker()
+    client = MQClient(config, channel, connection, tracker)
+
+    for tag in range(3):
+        tracker.delivered(channel, tag)
+    tracker.started(channel, 0)
+    tracker.started(channel, 1)
+    assert tracker.in_flight() == 3
+    assert tracker.average_latency() is None
+
+    client.ack(channel, FakeDelivery(0))
+    client.reject(channel, FakeDelivery(2))
+    assert tracker.in_flight() == 3
+
+    connection.process_callbacks()
+    assert tracker.in_flight() == 1
+    assert tracker.average_latency() is not None
+
+
+def test_prefetch_controller():
+    config = MQConfig()
+    config.NUM_WORKERS = 10
+    config.PREFETCH_COUNT = 10
+    config.MAX_PREFETCH_COUNT = 40
+    config.PREFETCH_HEADROOM_SECONDS = 1.0
+    controller = PrefetchController(config)
+
+    assert controller.adapt(None) is None
+    assert controller.adapt(2.0) == 15
+    assert controller.adapt(2.1) is None
+    assert controller.adapt(0.1) == 40
+    assert controller.adapt(100.0) == 11
+    assert controller.prefetch_count == 11
+
+
+def new_scraped_article(article_id: str) -> ScrapedArticle:
+    return ScrapedArticle(
+        article=Article(
+            id=article_id,
+            url='a-url',
+            title='a-title',
+            body='a-body',
+            keywords=[],
+            date=datetime.utcnow()),
+        subjects=[],
+        referer=Referer(
+            id='r-id',
+            external_id='e-id',
+            follower_count=100,
+            article_id=article_id),
+        scores=[])
+
+
+def test_flow_controller():
+    config = MQConfig()
+    config.QUEUE_HIGH_WATER = 10
+    config.QUEUE_LOW_WATER = 4
+    flow = FlowController(config)
+    assert not flow.should_resume(0)
+    assert not flow.should_pause(9)
+    assert flow.should_pause(10)
+    assert flow.paused
+    assert not flow.should_pause(12)
+    assert not flow.should_resume(5)
+    assert flow.should_resume(4)
+    assert not flow.paused
+
+    config.QUEUE_HIGH_WATER = 0
+    assert not FlowController(config).should_pause(1000)
+    config.QUEUE_HIGH_WATER = 3
+    config.QUEUE_LOW_WATER = 5
+    assert FlowController(config).LOW_WATER == 2
+
+
+def test_mq_client_routes_failures():
+    config = MQConfig()
+    config.RETRY_DELAYS = [1.0, 5.0]
+    channel = FakeChannel(owner=threading.current_thread())
+    tracker = DeliveryTracker()
+    client = MQClient(config, channel, tracker=tracker)
+    tracker.delivered(channel, 1, b'first', 0)
+    tracker.delivered(channel, 2, b'last', 2)
+    tracker.delivered(channel, 3, b'gone', 0)
+    tracker.delivered(channel, 4)
+
+    client.fail(channel, FakeDelivery(1), TimeoutError('timed out'))
+    client.fail(channel, FakeDelivery(2), ConnectionResetError('reset'))
+    client.fail(channel, FakeDelivery(3), ArticleException(
+        'Article `download()` failed with 404 Client Error: Not Found'))
+    client.fail(channel, FakeDelivery(4), TimeoutError('timed out'))
+
+    assert channel.calls == [
+        ('publish', f'{config.SCRAPE_QUEUE}.retry.1'), ('ack', 1),
+        ('publish', f'{config.SCRAPE_QUEUE}.dead'), ('ack', 2),
+        ('publish', f'{config.SCRAPE_QUEUE}.dead'), ('ack', 3),
+        ('reject', 4)
+    ]
+    headers = [(p.headers[ATTEMPT_HEADER], p.headers[FAILURE_HEADER])
+               for p in channel.properties]
+    assert headers == [(1, 'transient'), (2, 'transient'), (0, 'permanent')]
+    assert tracker.in_flight() == 0
+
+
+def test_mq_client_ignores_deliveries_of_replaced_channel():
+    config = MQConfig()
+    old_channel = FakeChannel(owner=threading.current_thread())
+    new_channel = FakeChannel(owner=threading.current_thread())
+    tracker = DeliveryTracker()
+    client = MQClient(config, old_channel, tracker=tracker)
+    tracker.delivered(old_channel, 1, b'old', 0)
+    tracker.reset()
+    client.bind(new_channel)
+    tracker.delivered(new_channel, 1, b'new', 0)
+
+    # A worker still handling the delivery of the old channel fails it.
+    client.fail(old_channel, FakeDelivery(1), TimeoutError('timed out'))
+    client.ack(old_channel, FakeDelivery(1))
+
+    assert old_channel.calls == [('reject', 1), ('ack', 1)]
+    assert new_channel.calls == []
+    assert tracker.in_flight() == 1
+    assert tracker.message(new_channel, 1) == (b'new', 0)
+
+
+def test_mq_client_requires_pika_with_pipelined_confirms(monkeypatch):
+    config = MQConfig()
+    monkeypatch.setattr(pika, '__version__', '1.3.2')
+    with pytest.raises(RuntimeError):
+        MQClient(config)
+
+    config.PUBLISHER_CONFIRMS = False
+    MQClient(config)
+
+
+def test_consumer_only_hands_ready_jobs_to_workers():
+    config = MQConfig()
+    config.NUM_WORKERS = 1
+    scheduler = DomainScheduler(rate=0.001, burst=1.0)
+    consumer = MQConsumer(config, None, None, scheduler=scheduler)
+    ran: List[str] = []
+    done = threading.Event()
+
+    def job(name: str) -> Callable[[], None]:
+        def run() -> None:
+            ran.append(name)
+            if name == 'ready-0':
+                done.set()
+        return run
+
+    scheduler.submit('throttled.com', job('throttled-0'))
+    scheduler.submit('throttled.com', job('throttled-1'))
+    scheduler.submit('ready.com', job('ready-0'))
+    assert done.wait(timeout=5)
+    assert ran == ['throttled-0', 'ready-0']
+    assert scheduler.queue_depths() == {'throttled.com': 1}
+
+    consumer.stop()
+    assert ran == ['throttled-0', 'ready-0', 'throttled-1']
+    assert scheduler.qsize() == 0
+    consumer.shutdown()
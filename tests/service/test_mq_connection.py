@@ -0,0 +1,520 @@
+# Standard library
+import json
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+# 3rd party modules
+from pika.exceptions import AMQPConnectionError, ChannelClosed, ConnectionClosed
+from pika.frame import Method
+from pika.spec import Basic as MQ, BasicProperties
+
+# Internal modules
+from app.config import MQConfig
+from app.models import ScrapedArticle
+from app.service import DeliveryTracker, MessageHandler, MQClient, MQConsumer
+from app.service import MQConnectionManager
+from app.service.metrics import REGISTRY
+
+
+class StandInBroker:
+    """Broker with a single queue, enough to exercise the connection manager
+    without RabbitMQ. Connections can be refused and dropped on cue.
+    """
+
+    def __init__(self, bodies: List[bytes], refused_connects: int) -> None:
+        self.ready: Deque[bytes] = deque(bodies)
+        self.acked: List[bytes] = []
+        self.published: List[bytes] = []
+        self.dead_lettered: List[Tuple[bytes, Dict]] = []
+        self.declared: List[str] = []
+        self.connections: List['StandInConnection'] = []
+        self.refused_connects = refused_connects
+        self.drop_when: Callable[['StandInBroker'], bool] = lambda broker: False
+        self.on_drop: Callable[[], None] = lambda: None
+        self.on_all_acked: Callable[[], None] = lambda: None
+        self.on_callback_added: Callable[[], None] = lambda: None
+        self.expected_acks = len(bodies)
+
+    def connect(self) -> 'StandInConnection':
+        if self.refused_connects > 0:
+            self.refused_connects -= 1
+            raise AMQPConnectionError('Connection refused')
+        connection = StandInConnection(self)
+        self.connections.append(connection)
+        return connection
+
+
+class StandInConnection:
+
+    def __init__(self, broker: StandInBroker) -> None:
+        self.broker = broker
+        self.channels: List['StandInChannel'] = []
+        self.is_open = True
+        self._callbacks: List[Callable[[], None]] = []
+        self._timers: List[Tuple[float, Callable[[], None]]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def is_closed(self) -> bool:
+        return not self.is_open
+
+    def channel(self) -> 'StandInChannel':
+        channel = StandInChannel(self)
+        self.channels.append(channel)
+        return channel
+
+    def add_callback_threadsafe(self, callback: Callable[[], None]) -> None:
+        # Like pika, the lock is not reentrant.
+        assert self._lock.acquire(timeout=1), 'add_callback_threadsafe deadlocked'
+        try:
+            self.broker.on_callback_added()
+            self._callbacks.append(callback)
+        finally:
+            self._lock.release()
+
+    def add_timeout(self, deadline: float, callback: Callable[[], None]) -> None:
+        self._timers.append((time.monotonic() + deadline, callback))
+
+    def close(self) -> None:
+        self.drop()
+
+    def drop(self) -> None:
+        self.is_open = False
+        for channel in self.channels:
+            self.broker.ready.extendleft(reversed(list(channel.unacked.values())))
+            channel.unacked.clear()
+
+    def process_data_events(self, time_limit: float) -> None:
+        self.process_events()
+        time.sleep(min(time_limit, 0.001))
+
+    def process_events(self) -> None:
+        with self._lock:
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+        now = time.monotonic()
+        due = [callback for at, callback in self._timers if at <= now]
+        self._timers = [(at, callback) for at, callback in self._timers if at > now]
+        for callback in due:
+            callback()
+        for channel in self.channels:
+            channel.send_confirms()
+
+
+class StandInChannel:
+
+    def __init__(self, connection: StandInConnection) -> None:
+        self.connection = connection
+        self.unacked: Dict[int, bytes] = {}
+        self.consumer: Optional[Callable] = None
+        self.on_confirm: Optional[Callable[[Method], None]] = None
+        self._delivery_tag = 0
+        self._published = 0
+        self._confirmed = 0
+        self.consuming = False
+        self.cancels = 0
+        # Prefetch counts like RabbitMQ, zero means unlimited. A per consumer
+        # count only applies to consumers declared after it is set.
+        self.channel_prefetch = 0
+        self.next_consumer_prefetch = 0
+        self.consumer_prefetch = 0
+
+    def basic_qos(self, prefetch_count: int, all_channels: bool = False) -> None:
+        self._check_open()
+        if all_channels:
+            self.channel_prefetch = prefetch_count
+        else:
+            self.next_consumer_prefetch = prefetch_count
+
+    def basic_consume(self, callback: Callable, queue: str) -> str:
+        self._check_open()
+        self.consumer = callback
+        self.consumer_prefetch = self.next_consumer_prefetch
+        return 'ctag'
+
+    def basic_cancel(self, consumer_tag: str) -> None:
+        self._check_open()
+        assert consumer_tag == 'ctag'
+        self.cancels += 1
+        self.consuming = False
+
+    def confirm_delivery(self, callback: Callable[[Method], None]) -> None:
+        self.on_confirm = callback
+
+    def queue_declare(self, queue: str, durable: bool, arguments: Dict = None) -> None:
+        self._check_open()
+        self.connection.broker.declared.append(queue)
+
+    def basic_publish(self, exchange: str, routing_key: str, body: bytes,
+                      properties: BasicProperties = None) -> None:
+        self._check_open()
+        if routing_key.endswith('.dead'):
+            self.connection.broker.dead_lettered.append((body, properties.headers))
+        else:
+            self.connection.broker.published.append(body)
+        self._published += 1
+
+    def basic_ack(self, delivery_tag: int) -> None:
+        self._check_open()
+        self.connection.broker.acked.append(self.unacked.pop(delivery_tag))
+
+    def basic_reject(self, delivery_tag: int, requeue: bool = True) -> None:
+        self._check_open()
+        self.connection.broker.ready.append(self.unacked.pop(delivery_tag))
+
+    def send_confirms(self) -> None:
+        if self.on_confirm is not None and self._published > self._confirmed:
+            self._confirmed = self._published
+            self.on_confirm(Method(1, MQ.Ack(self._confirmed, multiple=True)))
+
+    def stop_consuming(self) -> None:
+        self.consuming = False
+
+    def start_consuming(self) -> None:
+        broker = self.connection.broker
+        deadline = time.monotonic() + 10
+        self.consuming = True
+        while self.consuming:
+            assert time.monotonic() < deadline, 'Consumer was not stopped in time'
+            while broker.ready and self.consuming and self._may_deliver():
+                self._delivery_tag += 1
+                body = broker.ready.popleft()
+                self.unacked[self._delivery_tag] = body
+                self.consumer(self, MQ.Deliver(delivery_tag=self._delivery_tag),
+                              None, body)
+            self.connection.process_events()
+            if broker.drop_when(broker):
+                broker.drop_when = lambda broker: False
+                self.connection.drop()
+                broker.on_drop()
+                raise ConnectionClosed(320, 'Connection forced')
+            if len(broker.acked) >= broker.expected_acks:
+                broker.expected_acks = -1
+                broker.on_all_acked()
+            time.sleep(0.001)
+
+    def _may_deliver(self) -> bool:
+        return all(limit == 0 or len(self.unacked) < limit
+                   for limit in (self.channel_prefetch, self.consumer_prefetch))
+
+    def _check_open(self) -> None:
+        if not self.connection.is_open:
+            raise ChannelClosed(504, 'Channel closed')
+
+
+class ForwardingHandler(MessageHandler):
+    """Publishes scrape targets as they are, holding on to the first
+    delivery of the target with a held id until it is released.
+    """
+
+    def __init__(self, client: MQClient, held_id: str) -> None:
+        self.client = client
+        self.held_id = held_id
+        self.held = threading.Event()
+        self.release = threading.Event()
+
+    def handle_scrape_target(self, target, channel, mq_method) -> None:
+        if target.article_id == self.held_id and not self.held.is_set():
+            self.held.set()
+            self.release.wait(timeout=10)
+        scraped_article = ScrapedArticle(
+            article=target.article(),
+            subjects=target.subjects,
+            referer=target.referer,
+            scores=[0.0] * len(target.subjects))
+        self.client.send(scraped_article, channel, mq_method)
+
+
+def new_body(article_id: str) -> bytes:
+    return json.dumps({
+        'url': f'https://example.com/{article_id}',
+        'subjects': [{'id': 's-0', 'symbol': 'AAPL', 'name': 'Apple',
+                      'score': 0.0, 'articleId': article_id}],
+        'referer': {'id': 'r-id', 'externalId': 'e-id',
+                    'followerCount': 10, 'articleId': article_id},
+        'title': 'Title',
+        'body': 'Body',
+        'articleId': article_id
+    }).encode('utf-8')
+
+
+def test_connection_manager_reconnects_without_losing_messages():
+    config = MQConfig()
+    config.TEST_MODE = False
+    config.NUM_WORKERS = 2
+    config.RECONNECT_MIN_SECONDS = 1.0
+    config.RECONNECT_MAX_SECONDS = 30.0
+    bodies = [new_body(f'a-{i}') for i in range(3)]
+    broker = StandInBroker(bodies, refused_connects=2)
+    tracker = DeliveryTracker()
+    client = MQClient(config, tracker=tracker)
+    handler = ForwardingHandler(client, held_id='a-0')
+    consumer = MQConsumer(config, None, handler, tracker)
+
+    # Drop the connection while the first target is still being handled.
+    broker.drop_when = lambda broker: handler.held.is_set() and len(broker.acked) == 2
+    broker.on_drop = handler.release.set
+    sleeps: List[float] = []
+    manager = MQConnectionManager(config, connect=broker.connect, sleep=sleeps.append)
+    broker.on_all_acked = manager.stop
+    assert not manager.is_connected()
+    manager.run(consumer, client)
+
+    assert len(sleeps) == 3
+    assert 0.5 <= sleeps[0] <= 1.0
+    assert 1.0 <= sleeps[1] <= 2.0
+    assert 0.5 <= sleeps[2] <= 1.0
+
+    assert len(broker.connections) == 2
+    for connection in broker.connections:
+        consume_channel, publish_channel = connection.channels
+        assert consume_channel.consumer is not None
+        assert publish_channel.consumer is None
+        assert publish_channel.on_confirm is not None
+    assert sorted(broker.acked) == sorted(bodies)
+    published_ids = {json.loads(body)['article']['id'] for body in broker.published}
+    assert published_ids == {'a-0', 'a-1', 'a-2'}
+    assert tracker.in_flight() == 0
+    assert not manager.is_connected()
+
+
+def test_connection_manager_does_not_connect_in_test_mode():
+    config = MQConfig()
+    config.TEST_MODE = True
+
+    def connect():
+        raise AssertionError('Connected in test mode')
+
+    manager = MQConnectionManager(config, connect=connect)
+    manager.run(None, None)
+    assert manager.is_connected()
+
+
+def test_connection_manager_drains_in_flight_deliveries_when_stopped():
+    config = MQConfig()
+    config.TEST_MODE = False
+    config.NUM_WORKERS = 1
+    config.DRAIN_SECONDS = 10.0
+    bodies = [new_body(f'a-{i}') for i in range(3)]
+    broker = StandInBroker(bodies, refused_connects=0)
+    tracker = DeliveryTracker()
+    client = MQClient(config, tracker=tracker)
+    handler = ForwardingHandler(client, held_id='a-0')
+    consumer = MQConsumer(config, None, handler, tracker)
+    manager = MQConnectionManager(config, connect=broker.connect)
+
+    def stop_while_handling() -> None:
+        assert handler.held.wait(timeout=10)
+        manager.stop()
+        time.sleep(3 * MQConnectionManager.STOP_CHECK_SECONDS)
+        handler.release.set()
+
+    stopper = threading.Thread(target=stop_while_handling)
+    stopper.start()
+    manager.run(consumer, client)
+    stopper.join()
+    consumer.shutdown()
+
+    # The target being handled is finished, the ones waiting for the only
+    # worker are left to be redelivered.
+    assert broker.acked == [bodies[0]]
+    assert len(broker.published) == 1
+    assert sorted(broker.ready) == sorted(bodies[1:])
+    assert tracker.in_flight() == 0
+    assert client.is_idle()
+    assert not broker.connections[0].is_open
+
+
+def test_connection_manager_closes_after_drain_deadline():
+    config = MQConfig()
+    config.TEST_MODE = False
+    config.NUM_WORKERS = 1
+    config.DRAIN_SECONDS = 0.1
+    body = new_body('a-0')
+    broker = StandInBroker([body], refused_connects=0)
+    tracker = DeliveryTracker()
+    client = MQClient(config, tracker=tracker)
+    handler = ForwardingHandler(client, held_id='a-0')
+    consumer = MQConsumer(config, None, handler, tracker)
+    manager = MQConnectionManager(config, connect=broker.connect)
+
+    stopper = threading.Thread(
+        target=lambda: handler.held.wait(timeout=10) and manager.stop())
+    stopper.start()
+    started_at = time.monotonic()
+    manager.run(consumer, client)
+    assert time.monotonic() - started_at < 5
+    assert tracker.in_flight() == 1
+    assert list(broker.ready) == [body]
+    handler.release.set()
+    stopper.join()
+    consumer.shutdown()
+
+
+def test_consumer_pauses_while_workers_are_saturated():
+    config = MQConfig()
+    config.TEST_MODE = False
+    config.NUM_WORKERS = 1
+    config.QUEUE_HIGH_WATER = 2
+    config.QUEUE_LOW_WATER = 0
+    config.PREFETCH_COUNT = 100
+    bodies = [new_body(f'a-{i}') for i in range(6)]
+    broker = StandInBroker(bodies, refused_connects=0)
+    tracker = DeliveryTracker()
+    client = MQClient(config, tracker=tracker)
+    handler = ForwardingHandler(client, held_id='a-0')
+    consumer = MQConsumer(config, None, handler, tracker)
+    manager = MQConnectionManager(config, connect=broker.connect)
+    broker.on_all_acked = manager.stop
+    paused_with: List[int] = []
+    domain_gauge: List[str] = []
+
+    def release_once_paused() -> None:
+        assert handler.held.wait(timeout=10)
+        consume_channel = broker.connections[0].channels[0]
+        deadline = time.monotonic() + 10
+        while consume_channel.cancels == 0 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        paused_with.extend([len(broker.ready), tracker.in_flight()])
+        domain_gauge.extend(
+            line for line in REGISTRY.render().splitlines()
+            if line.startswith('newsscraper_domain_queued_messages{'))
+        handler.release.set()
+
+    releaser = threading.Thread(target=release_once_paused)
+    releaser.start()
+    manager.run(consumer, client)
+    releaser.join()
+    consumer.shutdown()
+
+    # One delivery handled and two waiting for the only worker, or both
+    # waiting if the first was not yet handed to the worker when the next
+    # one arrived.
+    assert paused_with in ([3, 3], [4, 2])
+    # Targets with a title and body are not throttled by domain.
+    assert domain_gauge == [
+        f'newsscraper_domain_queued_messages{{domain=""}} {paused_with[1] - 1}']
+    assert broker.connections[0].channels[0].cancels >= 1
+    assert sorted(broker.acked) == sorted(bodies)
+    assert len(broker.connections) == 1
+
+
+def test_consumer_dead_letters_messages_it_can_not_decode():
+    config = MQConfig()
+    config.TEST_MODE = False
+    config.NUM_WORKERS = 1
+    config.RETRY_DELAYS = [1.0]
+    bodies = [b'not json', new_body('a-0')]
+    broker = StandInBroker(bodies, refused_connects=0)
+    tracker = DeliveryTracker()
+    client = MQClient(config, tracker=tracker)
+    handler = ForwardingHandler(client, held_id='')
+    consumer = MQConsumer(config, None, handler, tracker, client=client)
+    manager = MQConnectionManager(config, connect=broker.connect)
+    broker.on_all_acked = manager.stop
+    manager.run(consumer, client)
+    consumer.shutdown()
+
+    consume_channel, publish_channel = broker.connections[0].channels
+    assert publish_channel._published == publish_channel._confirmed == 2
+    assert broker.declared == [f'{config.SCRAPE_QUEUE}.retry.1',
+                               f'{config.SCRAPE_QUEUE}.dead']
+    assert sorted(broker.acked) == sorted(bodies)
+    assert len(broker.published) == 1
+    assert len(broker.dead_lettered) == 1
+    body, headers = broker.dead_lettered[0]
+    assert body == b'not json'
+    assert headers['x-attempt'] == 0
+    assert headers['x-failure'] == 'parse-error'
+
+
+def test_connection_manager_stops_when_requested_while_connecting():
+    config = MQConfig()
+    config.TEST_MODE = False
+    broker = StandInBroker([new_body('a-0')], refused_connects=0)
+    tracker = DeliveryTracker()
+    client = MQClient(config, tracker=tracker)
+    consumer = MQConsumer(config, None, ForwardingHandler(client, held_id=''), tracker)
+    manager = MQConnectionManager(config, connect=lambda: connect_and_stop())
+
+    def connect_and_stop() -> StandInConnection:
+        connection = broker.connect()
+        manager.stop()
+        return connection
+
+    manager.run(consumer, client)
+    consumer.shutdown()
+    assert broker.connections[0].channels[0].consumer is None
+    assert broker.acked == []
+    assert len(broker.ready) == 1
+    assert not broker.connections[0].is_open
+
+
+def test_connection_manager_stop_does_not_reenter_connection():
+    config = MQConfig()
+    config.TEST_MODE = False
+    config.NUM_WORKERS = 2
+    bodies = [new_body(f'a-{i}') for i in range(4)]
+    broker = StandInBroker(bodies, refused_connects=0)
+    tracker = DeliveryTracker()
+    client = MQClient(config, tracker=tracker)
+    consumer = MQConsumer(config, None, ForwardingHandler(client, held_id=''), tracker)
+    manager = MQConnectionManager(config, connect=broker.connect)
+    connection_thread = threading.current_thread()
+
+    # A signal handler runs in the connection thread, possibly while the
+    # thread is queueing a callback itself, as it does when a confirm acks.
+    def stop_like_signal_handler() -> None:
+        if threading.current_thread() is connection_thread:
+            manager.stop()
+
+    broker.on_callback_added = stop_like_signal_handler
+    manager.run(consumer, client)
+    consumer.shutdown()
+    assert manager.is_stopping()
+    assert len(broker.acked) + len(broker.ready) == len(bodies)
+    assert len(broker.acked) >= 1
+    assert tracker.in_flight() == 0
+
+
+def test_adapted_prefetch_applies_to_running_consumer():
+    config = MQConfig()
+    config.TEST_MODE = False
+    config.NUM_WORKERS = 1
+    config.PREFETCH_COUNT = 1
+    config.ADAPTIVE_PREFETCH = True
+    config.MAX_PREFETCH_COUNT = 4
+    config.QUEUE_HIGH_WATER = 0
+    bodies = [new_body(f'a-{i}') for i in range(6)]
+    broker = StandInBroker(bodies, refused_connects=0)
+    tracker = DeliveryTracker()
+    client = MQClient(config, tracker=tracker)
+    handler = ForwardingHandler(client, held_id='a-1')
+    consumer = MQConsumer(config, None, handler, tracker)
+    manager = MQConnectionManager(config, connect=broker.connect)
+    broker.on_all_acked = manager.stop
+    unacked_while_held: List[int] = []
+
+    def release_once_prefetched() -> None:
+        assert handler.held.wait(timeout=10)
+        consume_channel = broker.connections[0].channels[0]
+        deadline = time.monotonic() + 10
+        while len(consume_channel.unacked) < 4 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        unacked_while_held.append(len(consume_channel.unacked))
+        handler.release.set()
+
+    releaser = threading.Thread(target=release_once_prefetched)
+    releaser.start()
+    manager.run(consumer, client)
+    releaser.join()
+    consumer.shutdown()
+
+    # The first delivery settles with a prefetch count of 1, after which the
+    # window grows to the maximum for the consumer already running.
+    assert unacked_while_held == [4]
+    assert broker.connections[0].channels[0].channel_prefetch == 4
+    assert sorted(broker.acked) == sorted(bodies)
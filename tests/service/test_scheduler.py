@@ -0,0 +1,91 @@
+# Standard library
+import threading
+from typing import List
+
+# Internal modules
+from app.service.scheduler import DomainScheduler, TokenBucket, domain_of
+
+
+class FakeClock:
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=2.0, burst=2.0, now=0.0)
+    assert bucket.delay(0.0) == 0.0
+    bucket.take(0.0)
+    bucket.take(0.0)
+    assert bucket.delay(0.0) == 0.5
+    assert bucket.delay(0.25) == 0.25
+    assert bucket.delay(0.5) == 0.0
+    assert not bucket.is_full(0.5)
+    assert bucket.is_full(10.0)
+
+
+def test_domain_scheduler_is_fair_and_throttles():
+    clock = FakeClock()
+    scheduler = DomainScheduler(rate=1.0, burst=2.0, clock=clock)
+    ran: List[str] = []
+
+    def job(name: str):
+        return lambda: ran.append(name)
+
+    for i in range(4):
+        scheduler.submit('busy.com', job(f'busy-{i}'))
+    scheduler.submit('quiet.com', job('quiet-0'))
+    scheduler.submit(None, job('scraped-0'))
+    assert scheduler.queue_depths() == {'busy.com': 4, 'quiet.com': 1, '': 1}
+    assert scheduler.qsize() == 6
+
+    while True:
+        next_job = scheduler.next_job(timeout=0)
+        if next_job is None:
+            break
+        next_job()
+    assert ran == ['busy-0', 'quiet-0', 'scraped-0', 'busy-1']
+    assert scheduler.queue_depths() == {'busy.com': 2}
+
+    clock.now = 1.0
+    scheduler.next_job(timeout=0)()
+    assert scheduler.next_job(timeout=0) is None
+    assert ran[-1] == 'busy-2'
+
+    clock.now = 2.0
+    scheduler.next_job(timeout=0)()
+    assert ran[-1] == 'busy-3'
+    assert scheduler.qsize() == 0
+
+
+def test_domain_scheduler_wakes_waiting_workers():
+    scheduler = DomainScheduler(rate=0.001, burst=1.0)
+    scheduler.submit('throttled.com', lambda: None)
+    scheduler.next_job(timeout=0)
+    scheduler.submit('throttled.com', lambda: None)
+
+    picked = []
+    worker = threading.Thread(
+        target=lambda: picked.append(scheduler.next_job(timeout=5)))
+    worker.start()
+    ready_job = lambda: None
+    scheduler.submit('ready.com', ready_job)
+    worker.join(timeout=5)
+    assert picked == [ready_job]
+    assert scheduler.queue_depths() == {'throttled.com': 1}
+
+
+def test_unlimited_domain_scheduler():
+    scheduler = DomainScheduler(rate=0, burst=0)
+    for _ in range(10):
+        scheduler.submit('a.com', lambda: None)
+    for _ in range(10):
+        assert scheduler.next_job(timeout=0) is not None
+
+
+def test_domain_of():
+    assert domain_of('https://WWW.Example.com:8080/a?b=c') == 'www.example.com'
+    assert domain_of('not a url') == ''
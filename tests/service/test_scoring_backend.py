@@ -0,0 +1,176 @@
+# Standard library
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Callable, Dict, List, Tuple
+
+# 3rd party modules
+import pytest
+
+# Internal modules
+from app.models import Article, Subject
+from app.service import ScoringBackend, ScoringService, new_scoring_backend
+from app.service.scoring_backend import BatchingScoringBackend
+from app.service.scoring_backend import InlineScoringBackend
+from app.service.scoring_backend import ProcessPoolScoringBackend
+
+
+def test_process_pool_scoring_backend():
+    article = Article(
+        id='a-id',
+        url='a-url',
+        title='Apple’s Social Network',
+        body='Apple inc. is building a social network. AAPL fell.',
+        keywords=[],
+        date=datetime.utcnow())
+
+    def new_subjects():
+        return [
+            Subject(id='s-0', symbol='AAPL', name='Apple inc.',
+                    score=0.0, article_id='a-id'),
+            Subject(id='s-1', symbol='GOOG', name='Alphabet inc.',
+                    score=0.0, article_id='a-id')
+        ]
+
+    scorer = ScoringService()
+    inline = new_scoring_backend(scorer, 0)
+    assert isinstance(inline, InlineScoringBackend)
+    expected = inline.score(article, new_subjects())
+
+    pool = new_scoring_backend(scorer, 2)
+    assert isinstance(pool, ProcessPoolScoringBackend)
+    try:
+        scores = pool.score(article, new_subjects())
+        assert scores == pytest.approx(expected)
+        assert scores[0] > scores[1]
+    finally:
+        pool.shutdown()
+
+    batching = new_scoring_backend(scorer, 2, 4)
+    assert isinstance(batching, BatchingScoringBackend)
+    try:
+        assert batching.score(article, new_subjects()) == pytest.approx(expected)
+    finally:
+        batching.shutdown()
+
+
+class RecordingScoringBackend(ScoringBackend):
+
+    def __init__(self) -> None:
+        self.batches: List[List[str]] = []
+        self.scoring = threading.Event()
+        self.release = threading.Event()
+
+    def score(self, article: Article, subjects: List[Subject]) -> List[float]:
+        raise AssertionError('Articles should be scored in batches')
+
+    def score_batch(self, pairs) -> List[List[float]]:
+        self.scoring.set()
+        self.release.wait(timeout=5)
+        self.batches.append([article.id for article, _ in pairs])
+        return [[float(len(subjects))] for _, subjects in pairs]
+
+
+def test_batching_scoring_backend():
+    def new_article(id: str) -> Article:
+        return Article(id=id, url='url', title='title', body='body',
+                       keywords=[], date=datetime.utcnow())
+
+    def new_subjects(count: int) -> List[Subject]:
+        return [Subject(id=f's-{i}', symbol='S', name='Subject',
+                        score=0.0, article_id='a') for i in range(count)]
+
+    recorder = RecordingScoringBackend()
+    batching = BatchingScoringBackend(recorder, max_batch_size=3)
+    results: Dict[str, List[float]] = {}
+
+    def score(id: str, count: int) -> None:
+        results[id] = batching.score(new_article(id), new_subjects(count))
+
+    threads = [threading.Thread(target=score, args=(f'a-{i}', i))
+               for i in range(4)]
+    threads[0].start()
+    assert recorder.scoring.wait(timeout=5)
+    for t in threads[1:]:
+        t.start()
+    while batching._queue.qsize() < 3:
+        time.sleep(0.01)
+    recorder.release.set()
+    for t in threads:
+        t.join(timeout=5)
+    batching.shutdown()
+
+    assert results == {f'a-{i}': [float(i)] for i in range(4)}
+    assert recorder.batches[0] == ['a-0']
+    assert sorted(recorder.batches[1]) == ['a-1', 'a-2', 'a-3']
+
+
+class PendingScoringBackend(ScoringBackend):
+
+    def __init__(self) -> None:
+        self.submitted: List[Tuple[List[str], Future]] = []
+        self.fail_next = False
+
+    def score(self, article: Article, subjects: List[Subject]) -> List[float]:
+        raise AssertionError('Articles should be scored in batches')
+
+    def submit_batch(self, pairs) -> Future:
+        if self.fail_next:
+            self.fail_next = False
+            raise RuntimeError('Could not submit')
+        future: Future = Future()
+        self.submitted.append(([article.id for article, _ in pairs], future))
+        return future
+
+
+def test_batching_scoring_backend_keeps_batches_in_flight():
+    backend = PendingScoringBackend()
+    batching = BatchingScoringBackend(backend, max_batch_size=4, max_in_flight=2)
+    results: Dict[str, object] = {}
+
+    def score(id: str) -> None:
+        article = Article(id=id, url='url', title='title', body='body',
+                          keywords=[], date=datetime.utcnow())
+        try:
+            results[id] = batching.score(article, [])
+        except RuntimeError as e:
+            results[id] = str(e)
+
+    def start(id: str) -> threading.Thread:
+        thread = threading.Thread(target=score, args=(id, ))
+        thread.start()
+        return thread
+
+    def wait_for(condition: Callable[[], bool]) -> None:
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.001)
+        assert condition()
+
+    threads = [start('a-0')]
+    wait_for(lambda: len(backend.submitted) == 1)
+    threads.append(start('a-1'))
+    wait_for(lambda: len(backend.submitted) == 2)
+    # Both slots are taken, so the next articles wait for one to free up.
+    threads.extend(start(f'a-{i}') for i in range(2, 4))
+    wait_for(lambda: batching._queue.qsize() == 2)
+    assert len(backend.submitted) == 2
+
+    backend.submitted[1][1].set_result([[1.0]])
+    wait_for(lambda: len(backend.submitted) == 3)
+    assert sorted(backend.submitted[2][0]) == ['a-2', 'a-3']
+    backend.submitted[0][1].set_exception(RuntimeError('Scoring failed'))
+    backend.submitted[2][1].set_result([[2.0], [3.0]])
+
+    backend.fail_next = True
+    threads.append(start('a-4'))
+    for thread in threads:
+        thread.join(timeout=5)
+    batching.shutdown()
+
+    assert results == {'a-0': 'Scoring failed', 'a-1': [1.0],
+                       'a-2': [2.0], 'a-3': [3.0], 'a-4': 'Could not submit'}
+    with pytest.raises(RuntimeError):
+        batching.score(Article(id='a-5', url='url', title='title', body='body',
+                               keywords=[], date=datetime.utcnow()), [])
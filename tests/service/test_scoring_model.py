@@ -0,0 +1,114 @@
+# Standard library
+import json
+import os
+from collections import Counter
+
+# 3rd party modules
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+# Internal modules
+from app.service.scoring_model import CorpusModel, HashingCorpusModel
+from app.service.scoring_model import load_corpus, load_model, save_model
+from app.service.scoring_model import load_hashing_model
+from app.service.scoring_model import model_version
+
+
+CORPUS = [
+    'Apple reports record revenue for the quarter',
+    'Shares of Alphabet fell after the report',
+    'The central bank kept rates unchanged'
+]
+STOPWORDS = ['the', 'of', 'for', 'after']
+
+
+def test_fit_corpus_model():
+    model = CorpusModel.fit(CORPUS, STOPWORDS, 'v1')
+    assert model.NO_DOCUMENTS == 3
+    assert list(model.TERMS) == sorted(model.TERMS)
+    assert 'the' not in model.TERMS
+
+    frequencies = model.corpus_frequencies(['report', 'apple', 'unknown'])
+    assert list(frequencies) == [1, 1, 0]
+
+
+def test_save_and_load_model(tmp_path):
+    model_dir = str(tmp_path / 'model')
+    model = CorpusModel.fit(CORPUS, STOPWORDS, 'v1')
+    save_model(model, CORPUS, model_dir)
+
+    loaded = load_model(model_dir, 'v1')
+    assert loaded is not None
+    assert isinstance(loaded.TERMS, np.memmap)
+    assert isinstance(loaded.DOCUMENT_FREQUENCIES, np.memmap)
+    assert loaded.NO_DOCUMENTS == model.NO_DOCUMENTS
+    assert loaded.STOPWORDS == STOPWORDS
+    assert list(loaded.TERMS) == list(model.TERMS)
+
+    documents = ['apple revenue', 'alphabet shares report']
+    expected = model.tfidf_matrix(documents).toarray()
+    actual = loaded.tfidf_matrix(documents).toarray()
+    assert np.allclose(expected, actual)
+
+    assert load_corpus(model_dir, 'v1') == CORPUS
+
+
+def test_save_and_load_hashing_model(tmp_path):
+    model_dir = str(tmp_path / 'model')
+    model = CorpusModel.fit(CORPUS, STOPWORDS, 'v1')
+    save_model(model, CORPUS, model_dir)
+    assert load_hashing_model(model_dir, 'v1', 2 ** 10) is None
+
+    hashing_model = HashingCorpusModel.fit(
+        CORPUS, STOPWORDS, 'v1', no_features=2 ** 10)
+    save_model(model, CORPUS, model_dir, hashing_model)
+    assert load_hashing_model(model_dir, 'v1', 2 ** 12) is None
+    assert load_hashing_model(model_dir, 'v2', 2 ** 10) is None
+
+    loaded = load_hashing_model(model_dir, 'v1', 2 ** 10)
+    assert loaded is not None
+    assert isinstance(loaded.DOCUMENT_FREQUENCIES, np.memmap)
+    assert loaded.NO_FEATURES == 2 ** 10
+    assert loaded.NO_DOCUMENTS == hashing_model.NO_DOCUMENTS
+
+    documents = ['apple revenue', 'alphabet shares report']
+    expected = hashing_model.tfidf_matrix(documents).toarray()
+    actual = loaded.tfidf_matrix(documents).toarray()
+    assert np.allclose(expected, actual)
+
+
+def test_missing_or_stale_model(tmp_path):
+    model_dir = str(tmp_path / 'model')
+    assert load_model(model_dir, 'v1') is None
+    assert load_corpus(model_dir, 'v1') is None
+
+    save_model(CorpusModel.fit(CORPUS, STOPWORDS, 'v1'), CORPUS, model_dir)
+    assert load_model(model_dir, 'v2') is None
+
+    meta_path = os.path.join(model_dir, 'meta.json')
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+    meta['formatVersion'] = -1
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    assert load_model(model_dir, 'v1') is None
+
+
+def test_model_version():
+    version = model_version(['news'], STOPWORDS)
+    assert version == model_version(['news'], list(reversed(STOPWORDS)))
+    assert version != model_version(['news', 'editorial'], STOPWORDS)
+    assert version != model_version(['news'], STOPWORDS + ['a'])
+
+
+def test_analyzer_matches_vectorizer():
+    text = "Apple's Q3 revenue beat ÅÄÖ estimates; the CEO said-so. " \
+        "The iPhone 11 sold 2x, e.g. in the U.S. and in Göteborg"
+    vectorizer_analyzer = CountVectorizer(stop_words=STOPWORDS).build_analyzer()
+    model = CorpusModel.fit(CORPUS, STOPWORDS, 'v1')
+    assert model.analyze(text) == vectorizer_analyzer(text)
+
+    title, body = 'Apple of the year', 'The apple fell. Apple for sale'
+    assert model.term_counts(title, body) == \
+        Counter(vectorizer_analyzer(f'{title} {body}'))
+    assert model.term_counts('') == {}
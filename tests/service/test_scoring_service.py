@@ -1,9 +1,30 @@
 # Standard library
+from dataclasses import replace
 from datetime import datetime
+from typing import List
+
+# 3rd party modules
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
 
 # Internal modules
 from app.models import Article, Subject
 from app.service import ScoringService
+from app.service.scoring_service import REFIT_MODE, PRECOMPUTED_MODE
+from app.service.scoring_service import CorpusReader
+from app.service.corpus import FileCorpusSource
+from app.service.scoring_model import CorpusModel, model_version, save_model
+
+
+WORD_CORPUS = [
+    'Apple reported record revenue as iPhone sales rose in the quarter',
+    'Shares of Alphabet fell after Google reported lower advertising revenue',
+    'Facebook is building a new social network feature for its users',
+    'Exxon Mobil raised its dividend as oil prices climbed',
+    'The central bank kept interest rates unchanged',
+    'Analysts expect Apple shares to rise after the network launch'
+]
 
 
 def test_scoring_service():
@@ -26,16 +47,184 @@ def test_scoring_service():
         ('s-1', 0.004385360758615228)
     ]
 
-    scorer = ScoringService()
-    scored_subjects = scorer.score(article, subjects)
+    scorer = ScoringService(mode=REFIT_MODE)
+    scores = scorer.score(article, subjects)
+
+    assert len(scores) == len(expected_scores)
+    for subject, score, (expected_id, expected_score) in zip(
+            subjects, scores, expected_scores):
+        assert subject.id == expected_id
+        assert subject.score == 0.0
+        assert score == expected_score
+
+    precomputed_scores = ScoringService(mode=PRECOMPUTED_MODE).score(
+        article, subjects)
+    assert precomputed_scores == pytest.approx(
+        [score for _, score in expected_scores], abs=1e-12)
+
+
+def test_scoring_parity_with_word_corpus(tmp_path):
+    corpus_file = tmp_path / 'corpus.txt'
+    corpus_file.write_text('\n'.join(WORD_CORPUS))
+    corpus = FileCorpusSource(str(corpus_file))
+    article = Article(
+        id='a-id',
+        url='a-url',
+        title='Apple’s Social Network',
+        body=read_article_body(),
+        keywords=[],
+        date=datetime.utcnow())
+
+    def new_subjects():
+        return [
+            Subject(id='s-0', symbol='AAPL', name='Apple inc.',
+                    score=0.0, article_id='a-id'),
+            Subject(id='s-1', symbol='GOOG', name='Alphabet inc.',
+                    score=0.0, article_id='a-id'),
+            Subject(id='s-2', symbol='XOM', name='Exxon Mobil',
+                    score=0.0, article_id='a-id')
+        ]
+
+    stopwords = CorpusReader().get_stopwords()
+    expected = vectorizer_scores(article, new_subjects(), WORD_CORPUS, stopwords)
+    for mode in [REFIT_MODE, PRECOMPUTED_MODE]:
+        scorer = ScoringService(
+            mode=mode, model_dir=str(tmp_path / 'model'), corpus=corpus)
+        assert scorer.score(article, new_subjects()) == \
+            pytest.approx(expected, abs=1e-12)
+
+    model = ScoringService(mode=PRECOMPUTED_MODE, corpus=corpus,
+                           model_dir=str(tmp_path / 'model')).get_model()
+    assert {'apple', 'shares', 'network'} <= set(model.TERMS.tolist())
+
+
+def test_precomputed_scoring_parity():
+    article = Article(
+        id='a-id',
+        url='a-url',
+        title='Apple’s Social Network',
+        body=read_article_body(),
+        keywords=[],
+        date=datetime.utcnow())
+
+    def new_subjects():
+        return [
+            Subject(id='s-0', symbol='AAPL', name='Apple inc.',
+                    score=0.0, article_id='a-id'),
+            Subject(id='s-1', symbol='GOOG', name='Alphabet inc.',
+                    score=0.0, article_id='a-id'),
+            Subject(id='s-2', symbol='FB', name='Facebook',
+                    score=0.0, article_id='a-id'),
+            Subject(id='s-3', symbol='A', name='the',
+                    score=0.0, article_id='a-id')
+        ]
 
-    assert len(scored_subjects) == len(expected_scores)
-    for i, ssub in enumerate(scored_subjects):
-        expected_id, expected_score = expected_scores[i]
-        assert ssub.id == expected_id
-        assert ssub.score == expected_score
+    refit_scorer = ScoringService(mode=REFIT_MODE)
+    precomputed_scorer = ScoringService(mode=PRECOMPUTED_MODE)
+    expected = refit_scorer.score(article, new_subjects())
+    actual = precomputed_scorer.score(article, new_subjects())
+
+    assert len(actual) == len(expected)
+    assert actual == pytest.approx(expected, abs=1e-12)
+    assert actual[3] == 0.0
+
+    counted = replace(article, term_counts=precomputed_scorer.get_model()
+                      .term_counts(article.title, article.body))
+    assert precomputed_scorer.score(counted, new_subjects()) == \
+        pytest.approx(expected, abs=1e-12)
+
+    with pytest.raises(ValueError):
+        ScoringService(mode='unknown')
+
+
+def test_scoring_service_from_model_artifact(tmp_path):
+    reader = CorpusReader()
+    corpus = reader.read()
+    stopwords = reader.get_stopwords()
+    version = model_version(reader.CATEGORIES, stopwords)
+    model_dir = str(tmp_path / 'model')
+    save_model(CorpusModel.fit(corpus, stopwords, version), corpus, model_dir)
+
+    article = Article(
+        id='a-id',
+        url='a-url',
+        title='Apple’s Social Network',
+        body=read_article_body(),
+        keywords=[],
+        date=datetime.utcnow())
+
+    def new_subjects():
+        return [
+            Subject(id='s-0', symbol='AAPL', name='Apple inc.',
+                    score=0.0, article_id='a-id')
+        ]
+
+    fitted = ScoringService(mode=PRECOMPUTED_MODE, model_dir='/nonexistent')
+    loaded = ScoringService(mode=PRECOMPUTED_MODE, model_dir=model_dir)
+    refit = ScoringService(mode=REFIT_MODE, model_dir=model_dir)
+    assert refit.CORPUS == corpus
+
+    expected = fitted.score(article, new_subjects())[0]
+    assert loaded.score(article, new_subjects())[0] == expected
+    assert refit.score(article, new_subjects())[0] == \
+        pytest.approx(expected, abs=1e-12)
 
 
 def read_article_body() -> str:
     with open('./testdata/article_body.txt', 'r') as f:
         return f.read()
+
+
+def vectorizer_scores(article: Article,
+                      subjects: List[Subject],
+                      corpus: List[str],
+                      stopwords: List[str]) -> List[float]:
+    vectorizer = TfidfVectorizer(stop_words=stopwords)
+    documents = [s.describe() for s in subjects] + [article.describe()] + corpus
+    matrix = vectorizer.fit_transform(documents)
+    no_subjects = len(subjects)
+    similarities = cosine_similarity(
+        matrix[:no_subjects], matrix[no_subjects:no_subjects + 1])
+    return [float(s) for s in similarities[:, 0]]
+
+
+def test_score_batch():
+    body = read_article_body()
+    articles = [
+        Article(id='a-0', url='a-url', title='Apple’s Social Network',
+                body=body, keywords=[], date=datetime.utcnow()),
+        Article(id='a-1', url='a-url', title='Alphabet earnings',
+                body='Alphabet inc. reported earnings. GOOG rose.',
+                keywords=[], date=datetime.utcnow()),
+        Article(id='a-2', url='a-url', title='No subjects',
+                body='Nothing to see here.', keywords=[],
+                date=datetime.utcnow())
+    ]
+
+    def new_subjects(article_id):
+        return [
+            Subject(id='s-0', symbol='AAPL', name='Apple inc.',
+                    score=0.0, article_id=article_id),
+            Subject(id='s-1', symbol='GOOG', name='Alphabet inc.',
+                    score=0.0, article_id=article_id)
+        ]
+
+    pairs = [
+        (articles[0], new_subjects('a-0')),
+        (articles[1], new_subjects('a-1')),
+        (articles[2], [])
+    ]
+
+    for mode in [REFIT_MODE, PRECOMPUTED_MODE]:
+        scorer = ScoringService(mode=mode)
+        batch_scores = scorer.score_batch(pairs)
+        assert len(batch_scores) == len(pairs)
+        assert len(batch_scores[2]) == 0
+        for (article, subjects), scores in zip(pairs[:2], batch_scores):
+            expected = scorer.score(article, subjects)
+            assert len(scores) == len(expected)
+            assert list(scores) == pytest.approx(expected, abs=1e-12)
+        assert batch_scores[0][0] > batch_scores[0][1]
+        assert batch_scores[1][1] > batch_scores[1][0]
+
+    assert ScoringService().score_batch([]) == []
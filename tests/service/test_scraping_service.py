@@ -0,0 +1,150 @@
+# Standard library
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from typing import Iterator
+
+# 3rd party modules
+import pytest
+
+# Internal modules
+from app.models import ScrapeTarget, Referer
+from app.service import ScrapingService, AsyncHtmlFetcher, ArticleCache
+from app.service import DocumentFrequencyCounter, FixtureHtmlFetcher
+from app.service.scoring_model import CorpusModel
+from app.service.scraping_service import KEYWORDS_OFF, KEYWORDS_TFIDF
+
+
+class ArticleHandler(BaseHTTPRequestHandler):
+
+    requests = 0
+
+    def do_GET(self) -> None:
+        ArticleHandler.requests += 1
+        if self.path.split('?')[0] != '/article':
+            self.send_error(404)
+            return
+        with open('./testdata/article.html', 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server_url() -> Iterator[str]:
+    server = HTTPServer(('127.0.0.1', 0), ArticleHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def fetcher() -> Iterator[AsyncHtmlFetcher]:
+    fetcher = AsyncHtmlFetcher(
+        max_connections=10,
+        max_connections_per_host=2,
+        keepalive_seconds=5,
+        timeout_seconds=5)
+    yield fetcher
+    fetcher.close()
+
+
+def test_async_html_fetcher(server_url, fetcher):
+    html = fetcher.fetch(f'{server_url}/article')
+    assert 'Apple is building a social network' in html
+
+    futures = [fetcher.submit(fetcher.fetch_async(f'{server_url}/article'))
+               for _ in range(10)]
+    assert all(f.result() == html for f in futures)
+
+    with pytest.raises(Exception):
+        fetcher.fetch(f'{server_url}/missing')
+
+
+def test_scraping_service_with_fetcher(server_url, fetcher):
+    scraper = ScrapingService(fetcher)
+    assert scraper.is_async()
+    assert not ScrapingService().is_async()
+
+    target = new_target(f'{server_url}/article')
+    article = scraper.get_article(target)
+    assert article.id == 'a-id'
+    assert article.title == 'Apple is building a social network'
+    assert 'Ping' in article.body
+    assert len(article.keywords) > 0
+
+    async_article = scraper.run_async(scraper.get_article_async(target)).result()
+    assert async_article.title == article.title
+    assert async_article.body == article.body
+
+
+def test_scraping_service_keyword_modes(server_url, fetcher):
+    url = f'{server_url}/article'
+    off = ScrapingService(fetcher, keyword_mode=KEYWORDS_OFF)
+    assert off.get_article(new_target(url)).keywords == []
+
+    model = CorpusModel.fit(['Apple reports record revenue'], ['the'], 'v1')
+    scraped_frequencies = DocumentFrequencyCounter()
+    tfidf = ScrapingService(
+        fetcher,
+        keyword_mode=KEYWORDS_TFIDF,
+        corpus_model=model,
+        max_keywords=5,
+        scraped_frequencies=scraped_frequencies)
+    article = tfidf.get_article(new_target(url))
+    assert len(article.keywords) == 5
+    assert 'network' in article.keywords
+    assert article.term_counts == model.term_counts(article.describe())
+    assert scraped_frequencies.snapshot() == \
+        ({term: 1 for term in article.term_counts}, 1)
+
+    with pytest.raises(ValueError):
+        ScrapingService(fetcher, keyword_mode=KEYWORDS_TFIDF)
+    with pytest.raises(ValueError):
+        ScrapingService(fetcher, keyword_mode='summary')
+
+
+def test_scraping_service_with_cache(server_url, fetcher):
+    scraper = ScrapingService(fetcher, ArticleCache(ttl=60, maxsize=10))
+    requests_before = ArticleHandler.requests
+    article = scraper.get_article(new_target(f'{server_url}/article'))
+
+    tracked_url = f'{server_url}/article?utm_source=twitter#comments'
+    tracked_target = new_target(tracked_url, article_id='other-id')
+    cached = scraper.run_async(
+        scraper.get_article_async(tracked_target)).result()
+    assert ArticleHandler.requests - requests_before == 1
+    assert cached.id == 'other-id'
+    assert cached.url == tracked_url
+    assert cached.title == article.title
+    assert cached.body == article.body
+
+
+def test_fixture_html_fetcher():
+    fetcher = FixtureHtmlFetcher('./testdata')
+    try:
+        article = ScrapingService(fetcher).get_article(
+            new_target('http://fixtures.local/news/article?utm_source=feed'))
+        assert article.title == 'Apple is building a social network'
+        with pytest.raises(FileNotFoundError):
+            fetcher.fetch('http://fixtures.local/missing')
+    finally:
+        fetcher.close()
+
+
+def new_target(url: str, article_id: str = 'a-id') -> ScrapeTarget:
+    return ScrapeTarget(
+        url=url,
+        subjects=[],
+        referer=Referer(id='r-id', external_id='e-id',
+                        follower_count=100, article_id='a-id'),
+        title=None,
+        body=None,
+        article_id=article_id)
@@ -0,0 +1,29 @@
+# Internal modules
+from app.service.urls import canonicalize_url
+
+
+def test_canonicalize_url():
+    canonical = 'https://example.com/news/story?a=1&b=2'
+    variants = [
+        'https://example.com/news/story?a=1&b=2',
+        'https://example.com/news/story?b=2&a=1',
+        'https://example.com/news/story/?a=1&b=2#comments',
+        'https://EXAMPLE.com:443/news/story?a=1&b=2',
+        'https://example.com/news/story?utm_source=twitter&a=1&utm_medium=social&b=2',
+        'https://example.com/news/story?a=1&b=2&fbclid=abc123',
+        'https://m.example.com/news/story?a=1&b=2',
+        'https://amp.example.com/news/story?a=1&b=2',
+        'https://example.com/news/story/amp?a=1&b=2',
+        'https://example.com/amp/news/story?a=1&b=2',
+        'https://example.com/news/story?a=1&b=2&amp=1',
+    ]
+    for url in variants:
+        assert canonicalize_url(url) == canonical, url
+
+    assert canonicalize_url('https://example.com/story.amp.html') == \
+        'https://example.com/story.html'
+    assert canonicalize_url('http://example.com:8080') == 'http://example.com:8080/'
+    assert canonicalize_url('https://example.com/news/example') != \
+        canonicalize_url('https://example.com/news/other')
+    assert canonicalize_url('https://example.com/campaign') == \
+        'https://example.com/campaign'
@@ -1,5 +1,7 @@
 # 3rd party modules
+import pickle
 import pytest
+from dataclasses import FrozenInstanceError, replace
 from datetime import datetime
 
 # Internal modules
@@ -180,10 +182,16 @@ def test_scraped_article_serialization():
             id='r-id',
             external_id='e-id',
             follower_count=100,
-            article_id='a-id')
+            article_id='a-id'),
+        scores=[0.5]
     )
     sa_dict = scraped_article.asdict()
     sa_dict['article']['id'] == 'a-id'
+    assert sa_dict['subjects'][0]['score'] == 0.5
+    assert list(ScrapedArticle.fromdict(sa_dict).scores) == [0.5]
+
+    with pytest.raises(ValueError):
+        replace(scraped_article, scores=[0.5, 0.5])
 
 
 def test_failing_scraped_article_serialization():
@@ -209,7 +217,8 @@ def test_failing_scraped_article_serialization():
             id='r-id',
             external_id='e-id',
             follower_count=100,
-            article_id='a-id')
+            article_id='a-id'),
+        scores=[0.5]
     )
     with pytest.raises(AttributeError):
         missing_date_article.asdict()
@@ -226,3 +235,17 @@ def test_failing_scraped_article_serialization():
                 ],
                 date=datetime.utcnow())
         )
+
+
+def test_models_are_slotted_and_immutable():
+    subject = Subject(id='s-id', symbol='symbol', name='name',
+                      score=0.0, article_id='a-id')
+    article = Article(id='a-id', url='a-url', title='a-title', body='a-body',
+                      keywords=[], date=datetime.utcnow())
+    for model in [subject, article]:
+        assert not hasattr(model, '__dict__')
+        assert pickle.loads(pickle.dumps(model)) == model
+    with pytest.raises(FrozenInstanceError):
+        subject.score = 1.0
+    assert article.term_counts is None
+    assert replace(article, term_counts={'a': 1}).term_counts == {'a': 1}
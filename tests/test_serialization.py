@@ -0,0 +1,70 @@
+# Standard library
+import json
+from datetime import datetime
+
+# 3rd party modules
+import pytest
+
+# Internal modules
+from app import serialization
+from app.models import Article, Referer, ScrapedArticle, ScrapeTarget, Subject
+from app.serialization import DecodeError, decode_scrape_target, encode_scraped_article
+
+
+def new_scraped_article(subjects, scores) -> ScrapedArticle:
+    article = Article(
+        id='a-id',
+        url='https://example.com/nyheter?q="åäö"&x=1',
+        title='Apple’s “Social” Network 🍎',
+        body='Line one\nLine two\ttabbed \\ backslash   \x00 end',
+        keywords=['apple', 'network', 'göteborg'],
+        date=datetime(2018, 7, 1, 12, 30, 15))
+    referer = Referer(id='r-id', external_id='e-id',
+                      follower_count=1234567, article_id='a-id')
+    return ScrapedArticle(article=article, subjects=subjects,
+                          referer=referer, scores=scores)
+
+
+def test_encode_scraped_article_is_identical_to_json_dumps():
+    subjects = [
+        Subject(id='s-0', symbol='AAPL', name='Apple inc.',
+                score=0.0, article_id='a-id'),
+        Subject(id='s-1', symbol='ÅÄÖ', name='Svenska "Bolaget"',
+                score=0.0, article_id='a-id'),
+        Subject(id='s-2', symbol='X', name='Big', score=0.0, article_id='a-id'),
+        Subject(id='s-3', symbol='N', name='NaN', score=0.0, article_id='a-id'),
+        Subject(id='s-4', symbol='I', name='Inf', score=0.0, article_id='a-id'),
+    ]
+    scores = [0.1 + 0.2, 0, 1e-300, float('nan'), float('-inf')]
+    for no_subjects in [5, 1, 0]:
+        scraped_article = new_scraped_article(
+            subjects[:no_subjects], scores[:no_subjects])
+        expected = json.dumps(scraped_article.asdict()).encode('utf-8')
+        assert encode_scraped_article(scraped_article) == expected
+
+
+def test_decode_scrape_target(monkeypatch):
+    raw = {
+        'url': 'https://example.com/a',
+        'subjects': [{'id': 's-0', 'symbol': 'AAPL', 'name': 'Apple',
+                      'score': 0.0, 'articleId': 'a-id'}],
+        'referer': {'id': 'r-id', 'externalId': 'e-id',
+                    'followerCount': 10, 'articleId': 'a-id'},
+        'title': 'Titel på svenska',
+        'body': None,
+        'articleId': 'a-id'
+    }
+    body = json.dumps(raw).encode('utf-8')
+    expected = ScrapeTarget.fromdict(json.loads(body))
+    assert decode_scrape_target(body) == expected
+    monkeypatch.setattr(serialization, '_loads', json.loads)
+    assert decode_scrape_target(body) == expected
+
+    missing_referer = dict(raw)
+    del missing_referer['referer']
+    with pytest.raises(DecodeError):
+        decode_scrape_target(json.dumps(missing_referer))
+    with pytest.raises(DecodeError):
+        decode_scrape_target(b'{"url": ')
+    with pytest.raises(DecodeError):
+        decode_scrape_target(b'[]')
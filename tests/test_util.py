@@ -0,0 +1,38 @@
+# Standard library
+import random
+from datetime import datetime, timedelta, timezone
+
+# 3rd party modules
+import pytest
+
+# Internal modules
+from app.config import DATE_FORMAT
+from app.util import date_to_str, str_to_date
+
+
+def test_dates_match_strftime_and_strptime():
+    rand = random.Random(19)
+    start = datetime(1970, 1, 1)
+    for _ in range(1000):
+        date = start + timedelta(seconds=rand.randrange(100 * 365 * 24 * 3600))
+        date_str = date.strftime(DATE_FORMAT)
+        assert date_to_str(date) == date_str
+        assert str_to_date(date_str) == datetime.strptime(date_str, DATE_FORMAT)
+    assert date_to_str(datetime(2018, 7, 1, 9, 5, 3, 999999)) == '2018-07-01T09:05:03Z'
+
+
+def test_date_to_str_converts_aware_dates_to_utc():
+    stockholm = timezone(timedelta(hours=2))
+    assert date_to_str(datetime(2018, 7, 1, 1, 30, tzinfo=stockholm)) == \
+        '2018-06-30T23:30:00Z'
+    assert date_to_str(datetime(2018, 7, 1, 1, 30, tzinfo=timezone.utc)) == \
+        '2018-07-01T01:30:00Z'
+
+
+def test_str_to_date_rejects_other_formats():
+    for date_str in ['2018-11-14 10:10:10', '18-11-14T10:10:10Z',
+                     '2018-11-14T10:10:10', '2018-11-14T10:10:10Z ',
+                     '2018-1-14T10:10:10Z', '2018-13-14T10:10:10Z',
+                     '2018-02-30T10:10:10Z', '２018-11-14T10:10:10Z']:
+        with pytest.raises(ValueError):
+            str_to_date(date_str)
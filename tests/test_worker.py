@@ -0,0 +1,91 @@
+# Standard library
+import threading
+from typing import List, Tuple
+
+# Internal modules
+from app.config import MQConfig
+from app.models import ScrapeTarget, ScrapedArticle, Subject, Referer
+from app.service import MQClient, ScrapingService, ScoringService
+from app.service import AsyncHtmlFetcher, classify_failure, new_scoring_backend
+from app.worker import Worker
+
+
+class FakeDelivery:
+
+    def __init__(self, delivery_tag: int) -> None:
+        self.delivery_tag = delivery_tag
+
+
+class RecordingMQClient(MQClient):
+
+    def __init__(self, expected_calls: int) -> None:
+        super().__init__(MQConfig(), None)
+        self.calls: List[Tuple[str, object]] = []
+        self._expected_calls = expected_calls
+        self.done = threading.Event()
+
+    def send(self, scraped_article: ScrapedArticle, channel, method) -> None:
+        self._record('send', scraped_article)
+        self._record('ack', method.delivery_tag)
+
+    def ack(self, channel, method) -> None:
+        self._record('ack', method.delivery_tag)
+
+    def reject(self, channel, method) -> None:
+        self._record('reject', method.delivery_tag)
+
+    def fail(self, channel, method, error: Exception) -> None:
+        self._record('fail', (method.delivery_tag, classify_failure(error)))
+
+    def _record(self, name: str, arg: object) -> None:
+        self.calls.append((name, arg))
+        if len(self.calls) >= self._expected_calls:
+            self.done.set()
+
+
+def test_worker_async_pipeline():
+    fetcher = AsyncHtmlFetcher(
+        max_connections=10,
+        max_connections_per_host=2,
+        keepalive_seconds=5,
+        timeout_seconds=1)
+    mq_client = RecordingMQClient(expected_calls=3)
+    worker = Worker(
+        ScrapingService(fetcher),
+        new_scoring_backend(ScoringService(), 0),
+        mq_client)
+    try:
+        worker.handle_scrape_target(new_target('a-0'), None, FakeDelivery(1))
+        worker.handle_scrape_target(
+            new_target('a-1', url='http://127.0.0.1:1/closed', scraped=False),
+            None, FakeDelivery(2))
+        assert mq_client.done.wait(timeout=10)
+    finally:
+        fetcher.close()
+
+    names = [name for name, _ in mq_client.calls]
+    assert sorted(names) == ['ack', 'fail', 'send']
+    assert ('ack', 1) in mq_client.calls
+    assert ('fail', (2, 'transient')) in mq_client.calls
+    assert names.index('send') < names.index('ack')
+
+    scraped_article = [arg for name, arg in mq_client.calls if name == 'send'][0]
+    assert scraped_article.article.id == 'a-0'
+    assert scraped_article.subjects[0].score == 0.0
+    assert scraped_article.scores[0] > 0
+
+
+def new_target(article_id: str,
+               url: str = 'a-url',
+               scraped: bool = True) -> ScrapeTarget:
+    return ScrapeTarget(
+        url=url,
+        subjects=[
+            Subject(id='s-0', symbol='AAPL', name='Apple inc.',
+                    score=0.0, article_id=article_id)
+        ],
+        referer=Referer(id='r-id', external_id='e-id',
+                        follower_count=100, article_id=article_id),
+        title='Apple builds a social network' if scraped else None,
+        body='Apple inc. is building a social network.' if scraped else None,
+        article_id=article_id)